@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+Prints each benchmark's median time in both files and the speedup. Exits
+with status 1 when any benchmark is slower than the baseline by more than
+the threshold, so it can gate a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float) -> Tuple[List[Tuple[str, float, float, float]], List[str]]:
+    """(name, baseline ms, current ms, speedup) of benchmarks in both files, and the regressions"""
+    rows = []
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None or not base["median_ms"] or not result["median_ms"]:
+            continue
+        speedup = base["median_ms"] / result["median_ms"]
+        rows.append((name, base["median_ms"], result["median_ms"], speedup))
+        if result["median_ms"] > base["median_ms"] * (1 + threshold):
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown that counts as a regression (default 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline, current = load(args.baseline), load(args.current)
+    rows, regressions = compare(baseline, current, args.threshold)
+    print(f"baseline {baseline['environment'].get('commit')}  current {current['environment'].get('commit')}")
+    print(f"{'benchmark':48s} {'baseline ms':>12s} {'current ms':>12s} {'speedup':>8s}")
+    for name, base_ms, current_ms, speedup in rows:
+        marker = "  SLOWER" if name in regressions else ""
+        print(f"{name:48s} {base_ms:12.3f} {current_ms:12.3f} {speedup:7.2f}x{marker}")
+
+    missing = sorted(set(baseline["benchmarks"]) ^ set(current["benchmarks"]))
+    if missing:
+        print(f"Only in one file: {', '.join(missing)}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
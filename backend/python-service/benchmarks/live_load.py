@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load generator for the live pipeline, with no audio hardware needed.
+
+    python -m benchmarks.live_load --sessions 32 --seconds 30
+    python -m benchmarks.live_load --sessions 8 --source file --file-path song.wav --speed 4
+
+Starts N live sessions fed by generated signals or an audio file through the
+same input-source path as microphone sessions. Each frame is serialized as in
+production, but not sent to Redis. Reports the sustained frames per second
+and percentiles of per-frame latency (analysis to publish) and of input
+backlog (audio captured but not yet analyzed), as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.run import environment
+from src.services.frame_codec import FRAME_FORMATS, encode_frame
+from src.services.live_pipeline import DSPWorkerPool
+from src.services.live_sessions import LiveSessionManager
+from src.services.live_sources import LIVE_SIGNALS
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    summary = {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary["max"] = round(float(max(values)), 3)
+    return summary
+
+
+class LoadRecorder:
+    """Publish callback that serializes frames and records their latency once measuring"""
+
+    def __init__(self, frame_format: str):
+        self.frame_format = frame_format
+        self.measuring = False
+        self.latencies_ms: List[float] = []
+        self.frames: Dict[str, int] = {}
+        self.payload_bytes = 0
+
+    async def publish(self, session_id: str, frame: Dict[str, Any]):
+        payload = encode_frame(frame, self.frame_format)
+        if self.measuring:
+            self.latencies_ms.append((time.time() - frame["timestamp"]) * 1000)
+            self.frames[session_id] = self.frames.get(session_id, 0) + 1
+            self.payload_bytes += len(payload)
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = LoadRecorder(args.format)
+    manager = LiveSessionManager(recorder.publish, pool=DSPWorkerPool(args.workers),
+                                 max_sessions=args.sessions)
+    source_options = {"file_path": args.file_path, "signal": args.signal, "speed": args.speed}
+    for index in range(args.sessions):
+        manager.start_session(
+            f"load-{index}", source=args.source, sample_rate=args.sample_rate,
+            chunk_size=args.chunk_size, spectrum_bands=args.bands, publish_fps=args.publish_fps,
+            source_options=source_options
+        )
+
+    try:
+        await asyncio.sleep(args.warmup)
+        before = {session_id: session.pipeline.stats() for session_id, session in manager.sessions.items()}
+        recorder.measuring = True
+        started = time.monotonic()
+        backlog_ms: List[float] = []
+        while time.monotonic() - started < args.seconds:
+            await asyncio.sleep(0.1)
+            backlog_ms.extend(
+                session.pipeline.ring.available() / args.sample_rate * 1000
+                for session in manager.sessions.values()
+            )
+        elapsed = time.monotonic() - started
+        recorder.measuring = False
+        after = {session_id: session.pipeline.stats() for session_id, session in manager.sessions.items()}
+    finally:
+        manager.shutdown()
+
+    def total(counter: str) -> int:
+        return sum(after[session_id][counter] - before[session_id][counter] for session_id in after)
+
+    session_fps = [recorder.frames.get(session_id, 0) / elapsed for session_id in after]
+    frames = sum(recorder.frames.values())
+    return {
+        "sessions": args.sessions,
+        "seconds": round(elapsed, 2),
+        "hop_fps_per_session": round(args.sample_rate / args.chunk_size * args.speed, 2),
+        "frames_per_second": round(frames / elapsed, 1),
+        "session_fps": {
+            "mean": round(float(np.mean(session_fps)), 2),
+            "min": round(float(np.min(session_fps)), 2)
+        },
+        "latency_ms": percentiles(recorder.latencies_ms),
+        "input_backlog_ms": percentiles(backlog_ms),
+        "payload_bytes_per_second": round(recorder.payload_bytes / elapsed),
+        "frames_processed": total("frames_processed"),
+        "frames_published": frames,
+        "frames_aggregated": total("frames_aggregated"),
+        "results_dropped": total("results_dropped"),
+        "skipped_samples": total("skipped_samples"),
+        "overruns": total("overruns"),
+        "step_errors": total("step_errors"),
+        "publish_rate_decreases": total("publish_rate_decreases")
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive N simulated live sessions and measure them")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=20.0, help="Measured duration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds first")
+    parser.add_argument("--source", choices=("signal", "file"), default="signal")
+    parser.add_argument("--signal", choices=LIVE_SIGNALS, default="clicks")
+    parser.add_argument("--file-path", help="Audio file for --source file (looped)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed (1 = real time)")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--bands", type=int, default=0, help="Spectrum bands per session (0 = raw)")
+    parser.add_argument("--publish-fps", type=float, default=None)
+    parser.add_argument("--format", choices=FRAME_FORMATS, default="uint8")
+    parser.add_argument("--workers", type=int, default=None, help="DSP threads (default: LIVE_DSP_WORKERS)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.source == "file" and not args.file_path:
+        parser.error("--source file needs --file-path")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = asyncio.run(run_load(args))
+    print(f"{results['sessions']} sessions: {results['frames_per_second']} frames/s, "
+          f"latency {results['latency_ms']}, input backlog {results['input_backlog_ms']}",
+          file=sys.stderr)
+
+    output = json.dumps({
+        "environment": environment(),
+        "config": {name: value for name, value in vars(args).items() if name != "output"},
+        "results": results
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
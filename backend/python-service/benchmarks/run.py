@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the analysis and live DSP hot paths.
+
+Run from backend/python-service:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Every benchmark runs on deterministic synthetic audio (plus any --fixture
+files) and needs no microphone. The redis group runs against --redis-url,
+or an in-process fakeredis server when that package is installed.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import librosa
+import numpy as np
+from loguru import logger
+
+from benchmarks.synthetic import synthetic_track, write_wav
+from src.services.analysis_codec import decode_analysis, encode_analysis
+from src.services.audio_analyzer import AudioAnalyzer
+from src.services.beat_tracker import StreamingBeatTracker
+from src.services.compact_response import compact_analysis
+from src.services.feature_engine import RHYTHM_FEATURES, FeatureEngine
+from src.services.frame_codec import FRAME_FORMATS, decode_frame, encode_frame
+from src.services.realtime_processor import RealtimeFrameProcessor, aggregate_frames
+from src.services.redis_client import RedisClient
+
+SAMPLE_RATE = 44100
+CHUNK_SIZE = 1024
+
+# (group, features timed, features computed beforehand) of FeatureEngine
+FEATURE_GROUPS = (
+    ("stft", ("magnitude",), ()),
+    ("mel", ("log_mel",), ("magnitude",)),
+    ("spectral", ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth",
+                  "zero_crossing_rate"), ("magnitude",)),
+    ("mfcc", ("mfcc",), ("log_mel",)),
+    ("chroma", ("chroma",), ("power",)),
+    ("rms", ("rms",), ()),
+    ("rhythm", RHYTHM_FEATURES, ()),
+)
+
+BENCHMARK_GROUPS = ("features", "analyze", "live", "serialization", "redis")
+
+
+def timing(samples: List[float], **extra) -> Dict[str, Any]:
+    """Summary of per-call durations in seconds, in milliseconds"""
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "mean_ms": round(statistics.mean(samples) * 1000, 4),
+        "stdev_ms": round(statistics.stdev(samples) * 1000, 4) if len(samples) > 1 else 0.0,
+        "runs": len(samples),
+        **extra
+    }
+
+
+def measure(fn: Callable[[Any], Any], repeat: int, setup: Optional[Callable[[], Any]] = None,
+            number: int = 1, warmup: int = 1) -> List[float]:
+    """Per-call seconds of fn(setup()) over repeat samples of number calls; setup is not timed"""
+    samples = []
+    for index in range(warmup + repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        elapsed = (time.perf_counter() - start) / number
+        if index >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+async def measure_async(fn: Callable[[], Awaitable[Any]], repeat: int, number: int = 1,
+                        warmup: int = 1, setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    samples = []
+    for index in range(warmup + repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        elapsed = (time.perf_counter() - start) / number
+        if index >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+class BenchmarkSuite:
+    """Runs benchmark groups and collects their results by name"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.analyzer = AudioAnalyzer(sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE)
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.skipped: Dict[str, str] = {}
+        self._track = synthetic_track(args.feature_seconds, SAMPLE_RATE)
+        self._analysis: Optional[Dict[str, Any]] = None
+
+    def warm_up(self):
+        """Compile librosa's numba kernels so no benchmark pays for them"""
+        self.analyzer.extract_features_sync(synthetic_track(2.0, SAMPLE_RATE), SAMPLE_RATE)
+
+    def record(self, group: str, name: str, result: Dict[str, Any]):
+        self.results[name] = {"group": group, **result}
+        print(f"  {name:48s} {result['median_ms']:12.3f} ms", file=sys.stderr)
+
+    @property
+    def analysis(self) -> Dict[str, Any]:
+        """Full analysis result of the synthetic track, shared by later groups"""
+        if self._analysis is None:
+            self._analysis = self.analyzer.extract_features_sync(self._track, SAMPLE_RATE)
+        return self._analysis
+
+    def engine(self, features=()) -> FeatureEngine:
+        engine = FeatureEngine(self._track, SAMPLE_RATE, n_fft=self.analyzer.n_fft,
+                               hop_length=self.analyzer.hop_length, n_mfcc=self.analyzer.n_mfcc,
+                               rhythm_sr=self.analyzer.rhythm_sample_rate)
+        engine.compute(features)
+        return engine
+
+    def run_features(self):
+        """FeatureEngine groups on top of their precomputed inputs, then whole extractions"""
+        repeat = self.args.repeat
+        seconds = self.args.feature_seconds
+        for group, features, prerequisites in FEATURE_GROUPS:
+            samples = measure(lambda engine: engine.compute(features), repeat,
+                              setup=lambda: self.engine(prerequisites), warmup=0)
+            self.record("features", f"features.{group}", timing(samples, audio_seconds=seconds))
+
+        for analysis_type in ("full", "basic", "tempo_only"):
+            samples = measure(
+                lambda _: self.analyzer.extract_features_sync(self._track, SAMPLE_RATE, analysis_type),
+                repeat
+            )
+            self.record("features", f"extract_features.{analysis_type}",
+                        timing(samples, audio_seconds=seconds))
+
+    def run_analyze(self):
+        """analyze_file on WAV files of several lengths, from decode to result"""
+        repeat = max(min(self.args.repeat, 3), 1)
+        with tempfile.TemporaryDirectory() as directory:
+            files = []
+            for seconds in self.args.lengths:
+                path = os.path.join(directory, f"synthetic_{seconds:g}s.wav")
+                write_wav(path, synthetic_track(seconds, SAMPLE_RATE), SAMPLE_RATE)
+                files.append((f"analyze_file.{seconds:g}s", path, seconds))
+            for path in self.args.fixture:
+                files.append((f"analyze_file.fixture.{os.path.basename(path)}", path,
+                              librosa.get_duration(path=path)))
+
+            for name, path, seconds in files:
+                samples = measure(lambda _: self.analyzer.analyze_file_sync(path), repeat, warmup=0)
+                self.record("analyze", name, timing(
+                    samples, audio_seconds=round(seconds, 3),
+                    realtime_factor=round(seconds / statistics.median(samples), 1)
+                ))
+
+    def run_live(self):
+        """Per-hop live frame processing, as frames per second of one DSP thread"""
+        repeat = self.args.repeat
+        y = self._track[:10 * SAMPLE_RATE]
+        frames = [y[i:i + CHUNK_SIZE] for i in range(0, len(y) - CHUNK_SIZE + 1, CHUNK_SIZE)]
+        hop_rate = SAMPLE_RATE / CHUNK_SIZE
+
+        def frame_rate(name: str, step: Callable[[Any, np.ndarray], Any], setup: Callable[[], Any]):
+            samples = measure(lambda state: [step(state, frame) for frame in frames], repeat,
+                              setup=setup)
+            per_frame = [sample / len(frames) for sample in samples]
+            fps = 1 / statistics.median(per_frame)
+            self.record("live", name, timing(
+                per_frame, frames_per_second=round(fps), sessions_per_thread=round(fps / hop_rate, 1)
+            ))
+
+        for bands in (0, 64):
+            frame_rate(
+                f"live.process.bands_{bands}",
+                lambda processor, frame: processor.process(frame),
+                lambda: RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE, hop_length=CHUNK_SIZE,
+                                               spectrum_bands=bands)
+            )
+
+        processor = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE)
+        spectra = [processor.process(frame)["frequency_data"] for frame in frames]
+        samples = measure(lambda tracker: [tracker.update(spectrum) for spectrum in spectra], repeat,
+                          setup=lambda: StreamingBeatTracker(hop_rate, CHUNK_SIZE // 2))
+        self.record("live", "live.beat_tracker", timing([sample / len(spectra) for sample in samples]))
+
+        batch = [processor.process(frame) for frame in frames[:4]]
+        self.record("live", "live.aggregate_frames.4",
+                    timing(measure(lambda _: aggregate_frames(batch), repeat, number=100)))
+
+    def run_serialization(self):
+        """Live frame and analysis payload encoding, with payload sizes"""
+        repeat = self.args.repeat
+        frame = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE).process(self._track[:CHUNK_SIZE])
+        banded = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE, spectrum_bands=64).process(
+            self._track[:CHUNK_SIZE]
+        )
+        for label, live_frame in (("raw", frame), ("bands_64", banded)):
+            for frame_format in FRAME_FORMATS:
+                payload = encode_frame(live_frame, frame_format)
+                self.record("serialization", f"encode_frame.{frame_format}.{label}", timing(
+                    measure(lambda _: encode_frame(live_frame, frame_format), repeat, number=200),
+                    payload_bytes=len(payload)
+                ))
+                self.record("serialization", f"decode_frame.{frame_format}.{label}", timing(
+                    measure(lambda _: decode_frame(payload), repeat, number=200)
+                ))
+
+        analysis = self.analysis
+        payload = encode_analysis(analysis)
+        self.record("serialization", "encode_analysis", timing(
+            measure(lambda _: encode_analysis(analysis), repeat), payload_bytes=len(payload),
+            audio_seconds=self.args.feature_seconds
+        ))
+        self.record("serialization", "decode_analysis",
+                    timing(measure(lambda _: decode_analysis(payload), repeat)))
+        self.record("serialization", "json_analysis", timing(
+            measure(lambda _: json.dumps(analysis), repeat), payload_bytes=len(json.dumps(analysis))
+        ))
+        compact = compact_analysis(analysis, "beat", encoding="base64")
+        self.record("serialization", "compact_analysis.beat_base64", timing(
+            measure(lambda _: json.dumps(compact_analysis(analysis, "beat", encoding="base64")), repeat),
+            payload_bytes=len(json.dumps(compact))
+        ))
+
+    def run_redis(self):
+        asyncio.run(self._run_redis())
+
+    async def _run_redis(self):
+        """RedisClient operations, including payload encoding, against a local server"""
+        client = await redis_client(self.args.redis_url)
+        if client is None:
+            self.skipped["redis"] = "no --redis-url given and fakeredis is not installed"
+            print("  redis: skipped (no --redis-url and no fakeredis)", file=sys.stderr)
+            return
+
+        repeat = self.args.repeat
+        analysis = self.analysis
+        frame = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE).process(self._track[:CHUNK_SIZE])
+        payload = encode_frame(frame, "uint8")
+        try:
+            self.record("redis", "redis.set_analysis_result", timing(await measure_async(
+                lambda: client.set_analysis_result("benchmark", analysis, 60), repeat
+            )))
+            self.record("redis", "redis.get_analysis_result.remote", timing(await measure_async(
+                lambda: client.get_analysis_result("benchmark"), repeat,
+                setup=client.local_cache.clear
+            )))
+            self.record("redis", "redis.get_analysis_result.local", timing(await measure_async(
+                lambda: client.get_analysis_result("benchmark"), repeat, number=100
+            )))
+            self.record("redis", "redis.set_realtime_audio_data", timing(await measure_async(
+                lambda: client.set_realtime_audio_data("benchmark", frame, payload=payload),
+                repeat, number=50
+            )))
+            self.record("redis", "redis.get_realtime_audio_data.remote", timing(await measure_async(
+                lambda: client.get_realtime_audio_data("benchmark"), repeat,
+                setup=client.local_cache.clear
+            )))
+
+            # Each frame written in its own round trip, then batched per flush
+            client.live_flush_interval = 0
+            self.record("redis", "redis.write_live_frame.unbatched", timing(await measure_async(
+                lambda: client.write_live_frame("audio:realtime:benchmark", "benchmark", frame,
+                                                payload),
+                repeat, number=50
+            )))
+
+            async def write_batch():
+                for _ in range(64):
+                    client._pending_frames.append(("audio:realtime:benchmark",
+                                                   "audio:benchmark:latest", payload, 5))
+                await client._flush_live_frames()
+
+            samples = await measure_async(write_batch, repeat)
+            self.record("redis", "redis.write_live_frame.batched_64",
+                        timing([sample / 64 for sample in samples]))
+        finally:
+            await client.disconnect()
+
+
+async def redis_client(url: Optional[str]) -> Optional[RedisClient]:
+    """RedisClient on url, or on an in-process fakeredis server when url is None"""
+    client = RedisClient()
+    if url:
+        client.redis_url = url
+        await client.connect()
+        return client
+
+    try:
+        from fakeredis import FakeServer, aioredis
+    except ImportError:
+        return None
+    server = FakeServer()
+    client.client = aioredis.FakeRedis(server=server, decode_responses=True)
+    client.binary_client = aioredis.FakeRedis(server=server)
+    client.queue_client = aioredis.FakeRedis(server=server, decode_responses=True)
+    return client
+
+
+def environment() -> Dict[str, Any]:
+    """Where the results came from, for comparing like with like"""
+    def git(*command: str) -> Optional[str]:
+        try:
+            return subprocess.run(("git",) + command, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except Exception:
+            return None
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "librosa": librosa.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis and live DSP hot paths")
+    parser.add_argument("--groups", default=",".join(BENCHMARK_GROUPS),
+                        help=f"Comma-separated groups to run ({', '.join(BENCHMARK_GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--feature-seconds", type=float, default=30.0,
+                        help="Length of the synthetic track used by most benchmarks")
+    parser.add_argument("--lengths", type=lambda value: [float(v) for v in value.split(",")],
+                        default=[10.0, 60.0, 240.0], help="Comma-separated analyze_file track lengths")
+    parser.add_argument("--fixture", action="append", default=[],
+                        help="Audio file to include in the analyze group (repeatable)")
+    parser.add_argument("--redis-url", default=os.getenv("BENCHMARK_REDIS_URL"),
+                        help="Redis server for the redis group (default: in-process fakeredis)")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+    args.groups = [group for group in args.groups.split(",") if group]
+    unknown = set(args.groups) - set(BENCHMARK_GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    # Keep per-call info logs out of the timings
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    suite = BenchmarkSuite(args)
+    suite.warm_up()
+    for group in args.groups:
+        print(f"{group}:", file=sys.stderr)
+        getattr(suite, f"run_{group}")()
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "groups": args.groups,
+            "repeat": args.repeat,
+            "feature_seconds": args.feature_seconds,
+            "lengths": args.lengths,
+            "fixtures": args.fixture,
+            "redis": (args.redis_url or "fakeredis")
+            if "redis" in args.groups and "redis" not in suite.skipped else None
+        },
+        "skipped": suite.skipped,
+        "benchmarks": suite.results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
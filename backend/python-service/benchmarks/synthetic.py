@@ -0,0 +1,44 @@
+import numpy as np
+import soundfile as sf
+
+# Root frequencies (Hz) of the chords the synthetic track cycles through, one per two bars
+CHORD_ROOTS = (220.0, 174.61, 261.63, 196.0)
+
+
+def synthetic_track(seconds: float, sr: int = 44100, bpm: float = 120.0, seed: int = 0) -> np.ndarray:
+    """Deterministic music-like test signal: kick on beats, hi-hat off-beats, chords and noise.
+
+    Gives the rhythm, spectral and pitch features real structure to find,
+    so timings are representative of music rather than of silence or a sine.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    beat = 60.0 / bpm
+
+    # Chords: root, major third and fifth, changing every 8 beats
+    chord = (t // (8 * beat)).astype(np.int64) % len(CHORD_ROOTS)
+    root = np.asarray(CHORD_ROOTS)[chord]
+    y = sum(0.08 * np.sin(2 * np.pi * root * ratio * t) for ratio in (1.0, 1.26, 1.5))
+    y += 0.01 * rng.standard_normal(n)
+
+    kick_length = int(0.12 * sr)
+    kick_t = np.arange(kick_length) / sr
+    kick = 0.8 * np.sin(2 * np.pi * (50 + 100 * np.exp(-kick_t * 30)) * kick_t) * np.exp(-kick_t * 25)
+    hat_length = int(0.03 * sr)
+    hat = 0.2 * rng.standard_normal(hat_length) * np.exp(-np.arange(hat_length) / sr * 150)
+
+    for start in np.arange(0, seconds, beat):
+        index = int(start * sr)
+        length = min(kick_length, n - index)
+        y[index:index + length] += kick[:length]
+        off = index + int(beat * sr / 2)
+        length = min(hat_length, n - off)
+        if length > 0:
+            y[off:off + length] += hat[:length]
+    return np.clip(y, -1, 1).astype(np.float32)
+
+
+def write_wav(path: str, y: np.ndarray, sr: int):
+    """Write a mono 16-bit WAV fixture"""
+    sf.write(path, y, sr, subtype="PCM_16")
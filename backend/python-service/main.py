@@ -1,13 +1,36 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
+import asyncio
+import json
 import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, List, Literal, Optional, Tuple
 from dotenv import load_dotenv
 from loguru import logger
 
+from src.services.analysis_cache import AnalysisCache, SharedTempFile
+from src.services.analysis_executor import (
+    AnalysisExecutor, AnalysisQueueFullError, AnalysisTimeoutError, StageProgress
+)
+from src.services.analysis_jobs import AnalysisJobManager, MemoryJobBackend
+from src.services.analysis_codec import encode_analysis
 from src.services.audio_analyzer import AudioAnalyzer
+from src.services.audio_io import UploadTooLargeError, spool_to_temp
+from src.services.compact_response import compact_analysis
+from src.services.feature_store import FeatureStore
+from src.services.frame_codec import FRAME_FORMATS, encode_frame
+from src.services.live_broadcast import FrameSubscriber, LiveBroadcaster
+from src.services.live_sessions import LiveSessionLimitError, LiveSessionManager
 from src.services.redis_client import RedisClient
-from src.models.audio_analysis import AudioAnalysisRequest, AudioAnalysisResponse, RealtimeAudioData
+from src.services.result_events import DONE_FIELDS, format_event, result_events
+from src.services.visual_timeline import decode_timeline, pack_timeline_header
+from src.models.audio_analysis import (
+    AnalysisType, ArrayEncoding, AudioAnalysisRequest, AudioAnalysisResponse, AudioBatchAnalysisRequest,
+    RealtimeAudioData, ResponseAggregate
+)
 
 # Load environment variables
 load_dotenv()
@@ -27,21 +50,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Live frame wire format: "uint8" (default), "float16" or "json"
+LIVE_FRAME_FORMAT = os.getenv('LIVE_FRAME_FORMAT', 'uint8')
+if LIVE_FRAME_FORMAT not in FRAME_FORMATS:
+    raise ValueError(f"LIVE_FRAME_FORMAT must be one of {FRAME_FORMATS}")
+
+# Directory live file sessions may play from; "" keeps source=file off the HTTP API
+LIVE_MEDIA_DIR = os.getenv('LIVE_MEDIA_DIR', '')
+
+# Largest number of files accepted by one batch analysis request
+ANALYSIS_BATCH_MAX_ITEMS = int(os.getenv('ANALYSIS_BATCH_MAX_ITEMS', 500))
+
+# Largest upload accepted, enforced while it is received
+ANALYSIS_UPLOAD_MAX_BYTES = int(os.getenv('ANALYSIS_UPLOAD_MAX_BYTES', 512 * 1024 * 1024))
+
+# Bytes read at a time when spooling uploads to disk
+ANALYSIS_UPLOAD_CHUNK_BYTES = int(os.getenv('ANALYSIS_UPLOAD_CHUNK_BYTES', 1024 * 1024))
+
+# Seconds between checks for stage events while streaming an analysis
+STREAM_POLL_INTERVAL = float(os.getenv('ANALYSIS_STREAM_POLL_INTERVAL', 0.05))
+
+# Local feature store directory ("" disables the on-disk tier)
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', 'data/features')
+
+# Analysis job queue: "redis" (shared by all instances) or "memory" (this instance only)
+ANALYSIS_JOB_BACKEND = os.getenv('ANALYSIS_JOB_BACKEND', 'redis')
+if ANALYSIS_JOB_BACKEND not in ("redis", "memory"):
+    raise ValueError("ANALYSIS_JOB_BACKEND must be one of ('redis', 'memory')")
+
 # Initialize services
-audio_analyzer = AudioAnalyzer()
+analysis_executor = AnalysisExecutor()
+audio_analyzer = AudioAnalyzer(executor=analysis_executor)
 redis_client = RedisClient()
+feature_store = FeatureStore(FEATURE_STORE_DIR) if FEATURE_STORE_DIR else None
+analysis_cache = AnalysisCache(redis_client, feature_store=feature_store)
+analysis_jobs = AnalysisJobManager(
+    MemoryJobBackend() if ANALYSIS_JOB_BACKEND == "memory" else redis_client,
+    analysis_cache, audio_analyzer
+)
+
+# Real-time audio data processing callback
+async def process_realtime_audio(session_id: str, audio_data: dict):
+    """Process real-time audio data of a live session and publish it to subscribers and Redis"""
+    try:
+        # Serialize once and reuse the payload for pub/sub and the latest-value key
+        payload = encode_frame(audio_data, LIVE_FRAME_FORMAT)
+        
+        # Stream straight to this node's websocket subscribers
+        live_broadcaster.publish(session_id, audio_data, (LIVE_FRAME_FORMAT, payload))
+        
+        # Redis fan-out for other nodes: publish on the session's channel and
+        # store as its latest audio data, pipelined in micro-batches
+        await redis_client.write_live_frame(
+            f"audio:realtime:{session_id}", session_id, audio_data, payload
+        )
+        
+    except Exception as e:
+        logger.error(f"Error processing real-time audio: {str(e)}")
+
+def live_downstream(session_id: str) -> Tuple[float, int]:
+    """(delay in ms, queued frames) of a live session's consumers, for its publish rate"""
+    return redis_client.live_write_delay_ms(), live_broadcaster.backlog(session_id)
+
+live_sessions = LiveSessionManager(process_realtime_audio, downstream=live_downstream)
+live_broadcaster = LiveBroadcaster()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting Audio Analysis Service...")
     await redis_client.connect()
+    if feature_store:
+        await asyncio.to_thread(feature_store.load)
+    analysis_executor.start()
+    analysis_jobs.start()
     logger.info("✅ Audio Analysis Service started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    live_sessions.shutdown()
+    await analysis_jobs.stop()
     await redis_client.disconnect()
+    if feature_store:
+        feature_store.flush()
+    analysis_executor.shutdown()
     logger.info("Audio Analysis Service shutdown complete")
 
 @app.get("/health")
@@ -50,83 +143,400 @@ async def health_check():
     return {
         "status": "OK",
         "service": "audio-analysis",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "analysis_pool": analysis_executor.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "redis_cache": redis_client.cache_stats(),
+        "feature_store": feature_store.stats() if feature_store else None,
+        "analysis_jobs": await analysis_jobs.stats()
     }
 
-@app.post("/analyze", response_model=AudioAnalysisResponse)
+def analysis_busy_error(e: AnalysisQueueFullError) -> HTTPException:
+    """503 response telling clients when to retry a rejected analysis"""
+    return HTTPException(
+        status_code=503,
+        detail="Analysis queue is full, retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def compact_response(result: dict, aggregate: Optional[str], resolution: Optional[float],
+                     encoding: str) -> Optional[Response]:
+    """Compact encoding of an analysis result, or None when the full response was asked for.
+    
+    Built directly rather than through response models: validating per-frame
+    nested lists dominates the cost of large responses.
+    """
+    if aggregate is None and encoding == "json":
+        return None
+    compact = compact_analysis(result, aggregate or "frame", resolution, encoding)
+    if encoding == "binary":
+        return Response(content=encode_analysis(compact), media_type="application/octet-stream")
+    return Response(content=json.dumps(compact), media_type="application/json")
+
+@app.post("/analyze", response_model=AudioAnalysisResponse, response_model_exclude_none=True)
 async def analyze_audio(request: AudioAnalysisRequest):
     """Analyze audio file and return features"""
     try:
         logger.info(f"Analyzing audio file: {request.file_url}")
         
-        # Download and analyze audio
-        analysis_result = await audio_analyzer.analyze_file(request.file_url)
+        # Download and analyze audio, reusing any cached result for the same content
+        file_url = str(request.file_url)
+        analysis_result = await analysis_cache.analyze(
+            audio_analyzer, file_url, source=file_url, cache_result=request.cache_result,
+            analysis_type=request.analysis_type, timeline=request.timeline
+        )
         
-        # Store result in Redis for caching
-        await redis_client.set_analysis_result(request.file_url, analysis_result)
-        
-        return AudioAnalysisResponse(**analysis_result)
+        compact = compact_response(analysis_result, request.aggregate, request.resolution,
+                                   request.encoding)
+        return compact or AudioAnalysisResponse(**analysis_result)
         
+    except AnalysisQueueFullError as e:
+        raise analysis_busy_error(e)
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error analyzing audio: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Audio analysis failed: {str(e)}")
 
-@app.post("/analyze-upload")
-async def analyze_uploaded_file(file: UploadFile = File(...)):
-    """Analyze uploaded audio file"""
+@app.post("/analyze/stream")
+async def analyze_audio_stream(request: AudioAnalysisRequest):
+    """Analyze audio file, streaming each feature group as a server-sent event once it is ready"""
+    logger.info(f"Analyzing audio file (streaming): {request.file_url}")
+    return StreamingResponse(
+        stream_analysis_events(str(request.file_url), request.analysis_type,
+                               request.cache_result, request.timeline),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def upload_too_large_error() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Uploads are limited to {ANALYSIS_UPLOAD_MAX_BYTES} bytes")
+
+async def iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read a multipart upload in fixed-size chunks"""
+    while True:
+        chunk = await file.read(ANALYSIS_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+async def save_upload(chunks: AsyncIterator[bytes], filename: Optional[str]) -> Tuple[str, str]:
+    """Spool an upload to a unique temp file; returns (path, cache source from the upload bytes)"""
+    path, digest = await spool_to_temp(chunks, os.path.splitext(filename or "")[1],
+                                       ANALYSIS_UPLOAD_MAX_BYTES)
+    return path, f"upload:{digest}"
+
+async def analyze_upload(chunks: AsyncIterator[bytes], filename: Optional[str], analysis_type: str,
+                         timeline: bool, aggregate: Optional[str], resolution: Optional[float],
+                         encoding: str):
+    """Spool and analyze one upload; byte-identical uploads are served from cache without decoding"""
+    temp = None
     try:
-        # Save uploaded file temporarily
-        temp_path = f"/tmp/{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Analyze the file
-        analysis_result = await audio_analyzer.analyze_file(temp_path)
+        temp_path, source = await save_upload(chunks, filename)
+        temp = SharedTempFile(temp_path)
         
-        # Clean up temp file
-        os.remove(temp_path)
+        # Analyze the file, reusing any cached result for the same content
+        analysis_result = await analysis_cache.analyze(
+            audio_analyzer, temp_path, source=source, analysis_type=analysis_type, timeline=timeline,
+            temp=temp
+        )
         
-        return analysis_result
+        return compact_response(analysis_result, aggregate, resolution, encoding) or analysis_result
         
+    except UploadTooLargeError:
+        raise upload_too_large_error()
+    except AnalysisQueueFullError as e:
+        raise analysis_busy_error(e)
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error analyzing uploaded file: {str(e)}")
         raise HTTPException(status_code=500, detail=f"File analysis failed: {str(e)}")
+    finally:
+        # Clean up the temp file once no analysis reads it
+        if temp is not None:
+            temp.release()
+
+@app.post("/analyze-upload")
+async def analyze_uploaded_file(file: UploadFile = File(...), analysis_type: AnalysisType = "full",
+                                timeline: bool = False, aggregate: Optional[ResponseAggregate] = None,
+                                resolution: Optional[float] = None, encoding: ArrayEncoding = "json"):
+    """Analyze uploaded audio file"""
+    if file.size is not None and file.size > ANALYSIS_UPLOAD_MAX_BYTES:
+        raise upload_too_large_error()
+    return await analyze_upload(iter_upload(file), file.filename, analysis_type, timeline,
+                                aggregate, resolution, encoding)
+
+@app.post("/analyze-upload/raw")
+async def analyze_raw_upload(request: Request, filename: Optional[str] = None,
+                             analysis_type: AnalysisType = "full", timeline: bool = False,
+                             aggregate: Optional[ResponseAggregate] = None,
+                             resolution: Optional[float] = None, encoding: ArrayEncoding = "json"):
+    """Analyze audio sent as the request body, written to disk as it is received"""
+    content_length = request.headers.get("content-length")
+    if content_length:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if declared > ANALYSIS_UPLOAD_MAX_BYTES:
+            raise upload_too_large_error()
+    return await analyze_upload(request.stream(), filename, analysis_type, timeline,
+                                aggregate, resolution, encoding)
+
+async def stream_analysis_events(file_url: str, analysis_type: str, cache_result: bool,
+                                 timeline: bool):
+    """Server-sent events of one analysis: stage starts, then result fields as they are ready"""
+    stream_id = uuid.uuid4().hex
+    pending = deque()
+    analysis_executor.add_progress_listener(
+        stream_id, lambda stage, timestamp, values: pending.append((stage, values))
+    )
+    # Not cancelled if the client goes away, so the result still reaches the cache
+    task = asyncio.create_task(analysis_cache.analyze(
+        audio_analyzer, file_url, source=file_url, cache_result=cache_result,
+        analysis_type=analysis_type, timeline=timeline, progress=StageProgress(stream_id)
+    ))
+    sent = set()
+    try:
+        while True:
+            analysis_executor.dispatch_progress()
+            while pending:
+                stage, values = pending.popleft()
+                if values is None:
+                    yield format_event("stage", {"stage": stage})
+                    continue
+                for event, data in result_events(values, sent):
+                    yield format_event(event, data)
+            if task.done():
+                break
+            await asyncio.wait({task}, timeout=STREAM_POLL_INTERVAL)
+        
+        try:
+            result = task.result()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"Error analyzing audio: {error}")
+            yield format_event("error", {"detail": f"Audio analysis failed: {error}"})
+            return
+        for event, data in result_events(result, sent):
+            yield format_event(event, data)
+        yield format_event("done", {field: result[field] for field in DONE_FIELDS if field in result})
+    finally:
+        analysis_executor.remove_progress_listener(stream_id)
+
+async def stream_batch_results(items: List[Tuple[str, Optional[str]]], labels: List[str],
+                               analysis_type: str, cache_result: bool, temp_files: bool = False):
+    """NDJSON lines of batch results in completion order"""
+    async for index, result in analysis_cache.analyze_batch(
+        audio_analyzer, items, cache_result=cache_result, analysis_type=analysis_type,
+        concurrency=max(analysis_executor.max_workers, 1), temp_files=temp_files
+    ):
+        line = {"index": index, "source": labels[index]}
+        if isinstance(result, Exception):
+            error = str(result) or type(result).__name__
+            logger.error(f"Error analyzing batch item {labels[index]}: {error}")
+            line.update(status="error", error=error)
+        else:
+            line.update(status="ok", result=result)
+        yield json.dumps(line) + "\n"
+
+@app.post("/analyze/batch")
+async def analyze_audio_batch(request: AudioBatchAnalysisRequest):
+    """Analyze many audio files from URLs, streaming each result as it finishes"""
+    if len(request.file_urls) > ANALYSIS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {ANALYSIS_BATCH_MAX_ITEMS} files per batch")
+    
+    file_urls = [str(file_url) for file_url in request.file_urls]
+    logger.info(f"Analyzing batch of {len(file_urls)} audio files")
+    return StreamingResponse(
+        stream_batch_results([(file_url, file_url) for file_url in file_urls], file_urls,
+                             request.analysis_type, request.cache_result),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/analyze-upload/batch")
+async def analyze_uploaded_batch(files: List[UploadFile] = File(...), analysis_type: AnalysisType = "full"):
+    """Analyze many uploaded audio files, streaming each result as it finishes"""
+    if len(files) > ANALYSIS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {ANALYSIS_BATCH_MAX_ITEMS} files per batch")
+    
+    # Save uploads before streaming starts; they are removed once the batch is done
+    items = []
+    try:
+        for file in files:
+            items.append(await save_upload(iter_upload(file), file.filename))
+    except Exception as e:
+        for path, _ in items:
+            os.remove(path)
+        if isinstance(e, UploadTooLargeError):
+            raise upload_too_large_error()
+        logger.error(f"Error saving uploaded batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"File analysis failed: {str(e)}")
+    
+    return StreamingResponse(
+        stream_batch_results(items, [file.filename for file in files], analysis_type, True,
+                             temp_files=True),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(request: AudioAnalysisRequest):
+    """Queue an audio file for analysis and return its job for polling"""
+    try:
+        return await analysis_jobs.submit(
+            str(request.file_url), analysis_type=request.analysis_type,
+            cache_result=request.cache_result, timeline=request.timeline
+        )
+    except Exception as e:
+        logger.error(f"Error submitting analysis job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to submit analysis job")
+
+@app.get("/jobs/stats")
+async def get_analysis_job_stats():
+    """Queue depth, job counters and per-stage timings"""
+    return await analysis_jobs.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Get an analysis job's status, current stage and stage timings"""
+    job = await analysis_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str, response: Response,
+                                  aggregate: Optional[ResponseAggregate] = None,
+                                  resolution: Optional[float] = None, encoding: ArrayEncoding = "json"):
+    """Get a finished job's analysis result; returns the job with 202 while it is pending"""
+    try:
+        job, result = await analysis_jobs.result(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Analysis job not found")
+        if job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"Audio analysis failed: {job['error']}")
+        if job["status"] != "done":
+            response.status_code = 202
+            return job
+        if not result:
+            raise HTTPException(status_code=404, detail="Analysis result expired")
+        return compact_response(result, aggregate, resolution, encoding) or result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving analysis job result: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve analysis job result")
 
 @app.get("/analysis/{file_hash}")
-async def get_analysis_result(file_hash: str):
-    """Get cached analysis result"""
+async def get_analysis_result(file_hash: str, fields: Optional[str] = None,
+                              start: Optional[float] = None, duration: Optional[float] = None,
+                              aggregate: Optional[ResponseAggregate] = None,
+                              resolution: Optional[float] = None, encoding: ArrayEncoding = "json"):
+    """Get cached analysis result by content hash, optionally only some fields and a time window"""
     try:
-        result = await redis_client.get_analysis_result(file_hash)
+        end = None if duration is None else (start or 0) + duration
+        selected = fields.split(",") if fields else None
+        if selected is not None and aggregate in ("segment", "beat"):
+            # Needed to place the aggregated segments in time
+            selected += ["frame_rate", "beat_times"] if aggregate == "beat" else ["frame_rate"]
+        result = await analysis_cache.get(file_hash, fields=selected, start=start, end=end)
         if not result:
             raise HTTPException(status_code=404, detail="Analysis result not found")
-        return result
+        return compact_response(result, aggregate, resolution, encoding) or result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving analysis: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve analysis")
 
+@app.get("/analysis/{file_hash}/timeline")
+async def get_analysis_timeline(file_hash: str, start: float = 0, duration: Optional[float] = None,
+                                format: Literal["binary", "json"] = "binary"):
+    """Get a window of a track's precomputed visualization timeline by seek offset"""
+    try:
+        # Fixed-stride records: the window is one contiguous byte range
+        window = await analysis_cache.get_timeline_window(file_hash, start, duration)
+        if not window:
+            raise HTTPException(status_code=404, detail="Visualization timeline not found")
+        
+        info, start_frame, frames = window
+        payload = pack_timeline_header(info, start_frame, len(frames) // info["record_size"]) + frames
+        
+        if format == "json":
+            return {
+                "fps": info["fps"],
+                "start_frame": start_frame,
+                "frames": decode_timeline(payload)
+            }
+        return Response(content=payload, media_type="application/octet-stream")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving visualization timeline: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve visualization timeline")
+
 # Live audio analysis endpoints
+def live_media_path(file_path: Optional[str]) -> str:
+    """Resolve a client-supplied file path inside LIVE_MEDIA_DIR, rejecting anything outside it"""
+    if not LIVE_MEDIA_DIR:
+        raise HTTPException(status_code=403, detail="File sources are disabled (LIVE_MEDIA_DIR is not set)")
+    if not file_path:
+        raise HTTPException(status_code=400, detail="File sources need a file_path")
+    media_dir = os.path.realpath(LIVE_MEDIA_DIR)
+    path = os.path.realpath(os.path.join(media_dir, file_path))
+    if os.path.commonpath((media_dir, path)) != media_dir or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Media file not found")
+    return path
+
 @app.post("/live/start")
-async def start_live_analysis():
-    """Start live audio analysis from microphone"""
+async def start_live_analysis(session_id: str = "default_user", device: Optional[int] = None,
+                              bands: Optional[int] = None, band_scale: Optional[str] = None,
+                              publish_fps: Optional[float] = None, source: str = "device",
+                              file_path: Optional[str] = None, signal: str = "clicks",
+                              speed: float = 1.0, loop: bool = True):
+    """Start live audio analysis from the microphone, a media file or a generated signal"""
     try:
-        if audio_analyzer.is_recording:
+        if session_id in live_sessions:
             return {"message": "Live analysis already running"}
+        if source == "websocket":
+            raise ValueError("Websocket sessions are started by connecting to /live/ws")
+        if source == "file":
+            file_path = live_media_path(file_path)
         
         # Start live analysis
-        audio_analyzer.start_live_analysis(process_realtime_audio)
+        try:
+            live_sessions.start_session(
+                session_id, source=source, sample_rate=audio_analyzer.sample_rate,
+                chunk_size=audio_analyzer.chunk_size, device=device, spectrum_bands=bands,
+                band_scale=band_scale, publish_fps=publish_fps,
+                source_options={"file_path": file_path, "signal": signal, "speed": speed, "loop": loop}
+            )
+        except Exception as e:
+            if source != "file" or isinstance(e, LiveSessionLimitError):
+                raise
+            # Decoder errors name the resolved path; keep them in the log
+            logger.error(f"Error opening live media file {file_path}: {str(e)}")
+            raise HTTPException(status_code=400, detail="Media file is not a readable audio file")
         
-        return {"message": "Live audio analysis started"}
+        return {"message": "Live audio analysis started", "session_id": session_id}
         
+    except HTTPException:
+        raise
+    except LiveSessionLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error starting live analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to start live analysis: {str(e)}")
 
 @app.post("/live/stop")
-async def stop_live_analysis():
+async def stop_live_analysis(session_id: str = "default_user"):
     """Stop live audio analysis"""
     try:
-        audio_analyzer.stop_live_analysis()
+        live_sessions.stop_session(session_id)
         return {"message": "Live audio analysis stopped"}
         
     except Exception as e:
@@ -134,14 +544,98 @@ async def stop_live_analysis():
         raise HTTPException(status_code=500, detail=f"Failed to stop live analysis: {str(e)}")
 
 @app.get("/live/status")
-async def get_live_status():
+async def get_live_status(session_id: str = "default_user"):
     """Get live analysis status"""
+    session = live_sessions.get(session_id)
+    return {
+        "is_recording": session is not None,
+        "sample_rate": session.sample_rate if session else audio_analyzer.sample_rate,
+        "chunk_size": session.chunk_size if session else audio_analyzer.chunk_size,
+        "pipeline": session.stats() if session else None,
+        "sessions": live_sessions.stats()
+    }
+
+@app.get("/live/sessions")
+async def get_live_sessions():
+    """Get per-session stats of all live sessions"""
     return {
-        "is_recording": audio_analyzer.is_recording,
-        "sample_rate": audio_analyzer.sample_rate,
-        "chunk_size": audio_analyzer.chunk_size
+        **live_sessions.stats(),
+        "session_stats": live_sessions.session_stats(),
+        "subscribers": live_broadcaster.stats()
     }
 
+@app.websocket("/live/ws/{session_id}")
+async def live_audio_websocket(websocket: WebSocket, session_id: str, sample_rate: int = 44100,
+                               chunk_size: int = 1024, format: str = "float32", channels: int = 1,
+                               bands: Optional[int] = None, band_scale: Optional[str] = None,
+                               publish_fps: Optional[float] = None):
+    """Live analysis of PCM audio pushed by a client as binary messages"""
+    await websocket.accept()
+    try:
+        session = live_sessions.start_session(
+            session_id, source="websocket", sample_rate=sample_rate, chunk_size=chunk_size,
+            sample_format=format, channels=channels, spectrum_bands=bands, band_scale=band_scale,
+            publish_fps=publish_fps
+        )
+    except LiveSessionLimitError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            session.push_pcm(data)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in live audio websocket {session_id}: {str(e)}")
+    finally:
+        live_sessions.stop_session(session_id)
+
+@app.websocket("/live/stream/{session_id}")
+async def live_frame_stream(websocket: WebSocket, session_id: str, format: str = "uint8",
+                            fields: Optional[str] = None, max_fps: float = 0, queue: int = 4):
+    """Stream a live session's frames to the client directly, without the Redis hop"""
+    await websocket.accept()
+    try:
+        subscriber = FrameSubscriber(
+            format, frozenset(fields.split(",")) if fields else None, max_fps=max_fps,
+            queue_size=max(queue, 1)
+        )
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    async def send_frames():
+        while True:
+            payload = await subscriber.next_payload()
+            if subscriber.frame_format == "json":
+                await websocket.send_text(payload.decode())
+            else:
+                await websocket.send_bytes(payload)
+    
+    async def wait_for_close():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    
+    live_broadcaster.subscribe(session_id, subscriber)
+    tasks = [asyncio.create_task(send_frames()), asyncio.create_task(wait_for_close())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() and \
+                    not isinstance(task.exception(), WebSocketDisconnect):
+                logger.error(f"Error streaming live frames {session_id}: {str(task.exception())}")
+    finally:
+        live_broadcaster.unsubscribe(session_id, subscriber)
+        for task in tasks:
+            task.cancel()
+
 @app.get("/devices")
 async def get_audio_devices():
     """Get available audio devices"""
@@ -164,19 +658,6 @@ async def set_audio_device(device_index: int):
         logger.error(f"Error setting audio device: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to set audio device: {str(e)}")
 
-# Real-time audio data processing callback
-async def process_realtime_audio(audio_data: dict):
-    """Process real-time audio data and publish to Redis"""
-    try:
-        # Publish to Redis for real-time distribution
-        await redis_client.publish_audio_data("audio:realtime", audio_data)
-        
-        # Store latest audio data for each user (you might want to add user_id)
-        await redis_client.set_realtime_audio_data("default_user", audio_data)
-        
-    except Exception as e:
-        logger.error(f"Error processing real-time audio: {str(e)}")
-
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -1,29 +1,52 @@
 from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
+AnalysisType = Literal["full", "basic", "tempo_only"]
+
+# Compact response options (see compact_response.compact_analysis)
+ResponseAggregate = Literal["frame", "segment", "beat"]
+ArrayEncoding = Literal["json", "base64", "binary"]
+
 class AudioAnalysisRequest(BaseModel):
     file_url: HttpUrl
-    analysis_type: str = "full"  # full, basic, tempo_only
+    analysis_type: AnalysisType = "full"
+    cache_result: bool = True
+    timeline: bool = False
+    # Set either to get a compact response instead of AudioAnalysisResponse
+    aggregate: Optional[ResponseAggregate] = None
+    resolution: Optional[float] = None
+    encoding: ArrayEncoding = "json"
+
+class AudioBatchAnalysisRequest(BaseModel):
+    file_urls: List[HttpUrl]
+    analysis_type: AnalysisType = "full"
     cache_result: bool = True
 
 class AudioAnalysisResponse(BaseModel):
+    # Fields other than bpm/tempo/duration/sample_rate are omitted by
+    # the "basic" and "tempo_only" analysis types
     bpm: float
-    key: str
-    energy: float
-    valence: float
-    danceability: float
+    key: Optional[str] = None
+    energy: Optional[float] = None
+    valence: Optional[float] = None
+    danceability: Optional[float] = None
     tempo: float
-    loudness: float
-    spectral_centroid: List[float]
-    mfcc: List[List[float]]
-    chroma: List[List[float]]
-    onset_times: List[float]
-    beat_times: List[float]
-    segment_timbre: List[List[float]]
-    segment_pitches: List[List[float]]
+    loudness: Optional[float] = None
+    spectral_centroid: Optional[List[float]] = None
+    mfcc: Optional[List[List[float]]] = None
+    chroma: Optional[List[List[float]]] = None
+    onset_times: Optional[List[float]] = None
+    beat_times: Optional[List[float]] = None
+    segment_timbre: Optional[List[List[float]]] = None
+    segment_pitches: Optional[List[List[float]]] = None
     duration: float
     sample_rate: int
+    frame_rate: Optional[float] = None
+    timeline_fps: Optional[float] = None
+    timeline_frames: Optional[int] = None
+    analysis_type: AnalysisType = "full"
+    content_hash: Optional[str] = None
     analysis_timestamp: datetime
     
     class Config:
@@ -33,7 +56,8 @@ class AudioAnalysisResponse(BaseModel):
 
 class RealtimeAudioData(BaseModel):
     timestamp: float
-    frequency_data: List[float]
+    frequency_data: Optional[List[float]] = None
+    band_data: Optional[List[float]] = None
     time_domain_data: List[float]
     bass_level: float
     mid_level: float
@@ -41,6 +65,9 @@ class RealtimeAudioData(BaseModel):
     overall_volume: float
     beat_detected: bool
     energy_level: float
+    bpm: float = 0.0
+    beat_phase: float = 0.0
+    beat_confidence: float = 0.0
 
 class BeatDetectionResult(BaseModel):
     beat_times: List[float]
@@ -81,3 +108,7 @@ class AudioAnalysisConfig(BaseModel):
     hop_length: int = 512
     n_fft: int = 2048
     n_mfcc: int = 13
+    min_native_rate: int = 22050
+    max_native_rate: int = 48000
+    rhythm_sample_rate: int = 22050
+    stream_min_seconds: float = 600.0
@@ -0,0 +1,376 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.models.audio_analysis import AudioAnalysisConfig
+from src.services.audio_io import download_to_temp, is_remote
+from src.services.feature_engine import ANALYSIS_FIELDS
+from src.services.feature_store import FeatureStore, analysis_window
+from src.services.visual_timeline import parse_timeline_header, timeline_window
+
+# Metadata attached to every cached result
+RESULT_METADATA = ("analysis_type", "content_hash", "analysis_timestamp")
+
+
+def content_digest(sr: int, config: AudioAnalysisConfig):
+    """Incremental content hash; feed it float32 sample bytes in order"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        f"{sr}:{config.sample_rate}:{config.n_fft}:{config.hop_length}:{config.n_mfcc}:"
+        f"{config.rhythm_sample_rate}".encode()
+    )
+    return digest
+
+
+def content_hash(y: np.ndarray, sr: int, config: AudioAnalysisConfig) -> str:
+    """Hash decoded audio samples together with the analysis parameters"""
+    digest = content_digest(sr, config)
+    digest.update(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def source_hash(source: str) -> str:
+    """Hash a source identifier such as a file URL"""
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight computation"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield so a disconnecting caller does not cancel the shared computation
+        return await asyncio.shield(call)
+
+
+class SharedTempFile:
+    """A downloaded temp file removed once its request and every flight reading it are done.
+
+    A flight started by one request can outlive it: flights are shielded from
+    cancellation and joined by other requests, and some reopen the file block
+    by block, so the request that downloaded the file cannot remove it alone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._holders = 1
+
+    def hold(self, func: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """Wrap a SingleFlight factory so the flight it starts holds the file until done"""
+        def start() -> asyncio.Future:
+            self._holders += 1
+            flight = asyncio.ensure_future(func())
+            flight.add_done_callback(lambda _: self.release())
+            return flight
+        return start
+
+    def release(self):
+        self._holders -= 1
+        if self._holders == 0:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logger.warning(f"Could not remove temp file {self.path}: {str(e)}")
+
+
+class AnalysisCache:
+    """Content-addressed cache for file analysis results.
+
+    Results are stored under ``analysis:{content_hash}`` (suffixed with the
+    analysis type for basic/tempo_only results), where the hash covers
+    the decoded samples and the analysis parameters, so the same song reached
+    through different URLs or filenames is analyzed once. URLs additionally get
+    an alias to their content hash so repeat requests skip decoding entirely.
+
+    With a FeatureStore, results and timelines are also persisted on local
+    disk, so they outlive the Redis TTL and restarts. Field subsets and time
+    windows are read from the store's memory maps when the track is there.
+    """
+
+    def __init__(self, redis_client, expire_seconds: int = 3600,
+                 feature_store: Optional[FeatureStore] = None):
+        self.redis_client = redis_client
+        self.expire_seconds = expire_seconds
+        self.feature_store = feature_store
+        self._decodes = SingleFlight()
+        self._analyses = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "in_flight": len(self._analyses),
+            "coalesced": self._decodes.coalesced + self._analyses.coalesced
+        }
+
+    @staticmethod
+    def result_key(file_hash: str, analysis_type: str = "full") -> str:
+        """Cache key for one analysis type of some content"""
+        return file_hash if analysis_type == "full" else f"{file_hash}:{analysis_type}"
+
+    async def get(self, file_hash: str, analysis_type: str = "full",
+                  fields: Optional[Iterable[str]] = None, start: Optional[float] = None,
+                  end: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Cached result for the analysis type, projected from a full analysis if needed.
+
+        ``fields`` and a ``start``/``end`` window in seconds select part of the
+        result (metadata fields are always included).
+        """
+        selected = tuple(fields) + RESULT_METADATA if fields is not None else None
+        result = await self._lookup(self.result_key(file_hash, analysis_type), selected, start, end)
+        if result or analysis_type == "full":
+            return result
+
+        full = await self._lookup(
+            file_hash, selected or ANALYSIS_FIELDS[analysis_type] + RESULT_METADATA, start, end
+        )
+        if not full:
+            return None
+        return {**full, "analysis_type": analysis_type}
+
+    async def _lookup(self, key: str, fields: Optional[Tuple[str, ...]], start: Optional[float],
+                      end: Optional[float]) -> Optional[Dict[str, Any]]:
+        """One result key from Redis or the feature store; selections prefer the store's memory maps"""
+        selection = fields is not None or start is not None or end is not None
+        store = self.feature_store
+        stored = store is not None and f"analysis:{key}" in store
+        if stored and selection:
+            result = await asyncio.to_thread(store.get_analysis, key, fields, start, end)
+            if result:
+                return result
+
+        result = await self.redis_client.get_analysis_result(key)
+        if result:
+            return analysis_window(result, fields, start, end) if selection else result
+        if stored and not selection:
+            return await asyncio.to_thread(store.get_analysis, key)
+        return None
+
+    async def has_timeline(self, file_hash: str) -> bool:
+        if self.feature_store is not None and f"timeline:{file_hash}" in self.feature_store:
+            return True
+        return await self.redis_client.has_timeline(file_hash)
+
+    async def get_timeline_window(self, file_hash: str, start: float = 0,
+                                  duration: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], int, bytes]]:
+        """(header info, first frame, records) of a window of a cached timeline.
+
+        Read from the feature store's memory map when stored locally, otherwise
+        with one Redis GETRANGE.
+        """
+        store = self.feature_store
+        info = await asyncio.to_thread(store.timeline_header, file_hash) if store is not None else None
+        if info is not None:
+            start_frame, end_frame = timeline_window(info, start, duration)
+            frames = await asyncio.to_thread(store.timeline_frames, file_hash, info, start_frame, end_frame)
+            if frames is not None:
+                return info, start_frame, frames
+
+        info = await self.redis_client.get_timeline_header(file_hash)
+        if not info:
+            return None
+        start_frame, end_frame = timeline_window(info, start, duration)
+        frames = await self.redis_client.get_timeline_frames(file_hash, info, start_frame, end_frame)
+        return info, start_frame, frames
+
+    async def analyze(self, analyzer, file_path: str, source: Optional[str] = None,
+                      cache_result: bool = True, analysis_type: str = "full",
+                      timeline: bool = False, summarize: bool = True,
+                      slots: Optional[asyncio.Semaphore] = None,
+                      progress: Optional[Callable[..., None]] = None,
+                      temp: Optional[SharedTempFile] = None) -> Dict[str, Any]:
+        """Return the analysis for file_path, computing it at most once per content.
+
+        With ``timeline``, a visualization timeline is also built and stored
+        under ``timeline:{content_hash}`` unless one is already cached.
+        With ``summarize=False`` a freshly computed result is returned with its
+        summary fields pending and is not cached yet; finish it with
+        AudioAnalyzer.summarize() and store_result(). ``slots`` bounds the
+        decode and analysis stages (not the download). ``progress`` is called
+        with the name of each stage as it starts. Pass a temp file the caller
+        will remove as ``temp``, so flights still reading it keep it alive;
+        downloaded remote files are handled the same way.
+        """
+        alias = source_hash(source) if source else None
+        if alias:
+            cached_hash = await self.redis_client.get_analysis_alias(alias)
+            if cached_hash:
+                result = await self._get_cached(cached_hash, analysis_type, timeline)
+                if result:
+                    self.hits += 1
+                    return result
+
+        if progress and is_remote(file_path):
+            progress("download")
+        local_path = await download_to_temp(file_path) if is_remote(file_path) else file_path
+        download = SharedTempFile(local_path) if local_path != file_path else None
+        reader = download or temp
+        hold = reader.hold if reader is not None else (lambda func: func)
+        if slots is not None:
+            await slots.acquire()
+        try:
+            decode_key = alias or local_path
+            file_hash = await self._decodes.do(
+                decode_key, hold(lambda: analyzer.hash_audio(local_path, progress))
+            )
+
+            # Unsummarized results must not be shared with callers expecting final ones
+            flight_key = self.result_key(file_hash, analysis_type) + \
+                (":timeline" if timeline else "") + ("" if summarize else ":unsummarized")
+            result = await self._analyses.do(
+                flight_key,
+                hold(lambda: self._compute(analyzer, local_path, file_hash, cache_result,
+                                           analysis_type, timeline, summarize, progress))
+            )
+        finally:
+            if slots is not None:
+                slots.release()
+            if download is not None:
+                download.release()
+
+        if alias and cache_result:
+            await self.redis_client.set_analysis_alias(alias, file_hash, self.expire_seconds)
+        return result
+
+    async def cached_source(self, source: str, analysis_type: str = "full",
+                            timeline: bool = False) -> Optional[str]:
+        """Content hash of a source whose analysis (and timeline, if requested) is already cached"""
+        file_hash = await self.redis_client.get_analysis_alias(source_hash(source))
+        if file_hash and await self._get_cached(file_hash, analysis_type, timeline):
+            return file_hash
+        return None
+
+    async def _get_cached(self, file_hash: str, analysis_type: str,
+                          timeline: bool) -> Optional[Dict[str, Any]]:
+        """Cached result, treated as missing when a requested timeline is not cached"""
+        result = await self.get(file_hash, analysis_type)
+        if result and timeline and not await self.has_timeline(file_hash):
+            return None
+        return result
+
+    async def analyze_batch(self, analyzer, items: List[Tuple[str, Optional[str]]],
+                            cache_result: bool = True, analysis_type: str = "full",
+                            concurrency: int = 1,
+                            temp_files: bool = False) -> AsyncIterator[Tuple[int, Any]]:
+        """Analyze many (file_path, source) items, yielding (index, result or exception) as they finish.
+
+        At most ``concurrency`` items are decoded and analyzed at once, with up
+        to as many more downloaded ahead. Summary fields of all results that
+        finish together are computed in one stacked summarize() call. With
+        ``temp_files`` the item paths are temp files, removed once the batch
+        and every flight reading them are done.
+        """
+        temps = [SharedTempFile(file_path) if temp_files else None for file_path, _ in items]
+        slots = asyncio.Semaphore(concurrency)
+        downloads = asyncio.Semaphore(2 * concurrency)
+
+        async def run(index: int, file_path: str, source: Optional[str]) -> Tuple[int, Any]:
+            try:
+                async with downloads:
+                    return index, await self.analyze(
+                        analyzer, file_path, source=source, cache_result=cache_result,
+                        analysis_type=analysis_type, summarize=False, slots=slots,
+                        temp=temps[index]
+                    )
+            except Exception as e:
+                return index, e
+
+        pending = {asyncio.ensure_future(run(index, *item)) for index, item in enumerate(items)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = [task.result() for task in done]
+                # Keyed by identity: items with the same content share one result
+                computed = list({
+                    id(result): result for _, result in finished
+                    if isinstance(result, dict) and "summary_inputs" in result
+                }.values())
+                analyzer.summarize(computed)
+                for result in computed:
+                    try:
+                        await self.store_result(result, cache_result)
+                    except Exception as e:
+                        logger.error(f"Error caching analysis {result['content_hash']}: {str(e)}")
+                for index, result in sorted(finished, key=lambda item: item[0]):
+                    yield index, result
+        finally:
+            for task in pending:
+                task.cancel()
+            for temp in temps:
+                if temp is not None:
+                    temp.release()
+
+    async def _compute(self, analyzer, file_path: str, file_hash: str, cache_result: bool,
+                       analysis_type: str, timeline: bool = False, summarize: bool = True,
+                       progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        cached = await self._get_cached(file_hash, analysis_type, timeline)
+        if cached:
+            # Samples hash_audio kept for the analysis are not needed
+            analyzer.discard_decoded(file_hash)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        # Long files are re-read in streaming mode; others reuse the samples
+        # hash_audio decoded when this runs in the same worker
+        result = await analyzer.analyze_file(file_path, analysis_type, timeline, summarize,
+                                             progress, content_hash=file_hash)
+
+        result["analysis_type"] = analysis_type
+        result["content_hash"] = file_hash
+        result["analysis_timestamp"] = datetime.utcnow().isoformat()
+        if summarize:
+            await self.store_result(result, cache_result)
+        return result
+
+    async def store_result(self, result: Dict[str, Any], cache_result: bool = True):
+        """Store a freshly computed result's timeline and, with cache_result, the result itself"""
+        file_hash = result["content_hash"]
+        analysis_type = result["analysis_type"]
+        if "timeline" in result:
+            # Stored even without cache_result: the seek endpoint serves it from Redis
+            payload = result.pop("timeline")
+            info = parse_timeline_header(payload)
+            await self.redis_client.set_timeline(file_hash, payload, self.expire_seconds)
+            await self._persist("put_timeline", file_hash, payload)
+            result["timeline_fps"] = info["fps"]
+            result["timeline_frames"] = info["n_frames"]
+
+        if cache_result:
+            try:
+                await self.redis_client.set_analysis_result(
+                    self.result_key(file_hash, analysis_type), result, self.expire_seconds
+                )
+            except Exception as e:
+                logger.error(f"Error caching analysis {file_hash}: {str(e)}")
+            await self._persist("put_analysis", self.result_key(file_hash, analysis_type), result)
+
+    async def _persist(self, method: str, *args):
+        """Write to the feature store off the event loop; failures only cost the local copy"""
+        if self.feature_store is None:
+            return
+        try:
+            await asyncio.to_thread(getattr(self.feature_store, method), *args)
+        except Exception as e:
+            logger.error(f"Error persisting to feature store: {str(e)}")
@@ -0,0 +1,97 @@
+import json
+import struct
+import zlib
+from typing import Any, Dict
+
+import numpy as np
+
+# Versioned magic prefix for binary analysis payloads
+ANALYSIS_MAGIC = b"MVA1"
+
+# Bounded [0, 1] features that survive float16 without visible loss
+FLOAT16_FIELDS = {"chroma", "segment_pitches"}
+
+# Fields that duplicate another field and are stored as a reference when equal
+FIELD_ALIASES = {"segment_timbre": "mfcc", "segment_pitches": "chroma"}
+
+
+def as_numeric_array(value: Any):
+    if not isinstance(value, (list, np.ndarray)):
+        return None
+    try:
+        array = np.asarray(value)
+    except ValueError:
+        # Ragged nested lists
+        return None
+    if array.dtype.kind not in "fiub":
+        return None
+    return array
+
+
+def encode_analysis(analysis: Dict[str, Any], level: int = 6) -> bytes:
+    """Encode an analysis dict as a zlib-compressed binary payload.
+
+    Numeric list fields are stored as raw float32 (float16 for FLOAT16_FIELDS)
+    arrays, int and bool fields as little-endian arrays of their own dtype,
+    duplicated fields as references, and everything else in a small JSON
+    header, which also records each array's dtype.
+    """
+    fields: Dict[str, Any] = {}
+    aliases: Dict[str, str] = {}
+    arrays = []
+    blobs = []
+    offset = 0
+
+    for name, value in analysis.items():
+        alias = FIELD_ALIASES.get(name)
+        if alias is not None and alias in analysis and value == analysis[alias]:
+            aliases[name] = alias
+            continue
+
+        array = as_numeric_array(value)
+        if array is None:
+            fields[name] = value
+            continue
+
+        if array.dtype.kind in "iub":
+            # Stored exactly, so decode gives back ints and bools
+            dtype = array.dtype.newbyteorder("<")
+        else:
+            dtype = np.dtype(np.float16 if name in FLOAT16_FIELDS else np.float32)
+        blob = np.ascontiguousarray(array, dtype=dtype).tobytes()
+        arrays.append({
+            "name": name,
+            "dtype": dtype.str,
+            "shape": list(array.shape),
+            "offset": offset
+        })
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({"fields": fields, "arrays": arrays, "aliases": aliases}).encode()
+    body = struct.pack("<I", len(header)) + header + b"".join(blobs)
+    return ANALYSIS_MAGIC + zlib.compress(body, level)
+
+
+def decode_analysis(payload: bytes) -> Dict[str, Any]:
+    """Decode a payload produced by encode_analysis (or a legacy JSON payload)"""
+    if not payload.startswith(ANALYSIS_MAGIC):
+        return json.loads(payload)
+
+    body = zlib.decompress(payload[len(ANALYSIS_MAGIC):])
+    (header_length,) = struct.unpack_from("<I", body)
+    header = json.loads(body[4:4 + header_length])
+    data = memoryview(body)[4 + header_length:]
+
+    analysis = dict(header["fields"])
+    for spec in header["arrays"]:
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=spec["offset"])
+        array = array.reshape(spec["shape"])
+        if dtype.kind == "f":
+            array = array.astype(np.float64)
+        analysis[spec["name"]] = array.tolist()
+    for name, target in header["aliases"].items():
+        analysis[name] = analysis[target]
+    return analysis
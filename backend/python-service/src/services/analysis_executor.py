@@ -0,0 +1,276 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.models.audio_analysis import AudioAnalysisConfig
+
+
+class AnalysisQueueFullError(Exception):
+    """Raised when the analysis pool has no free worker or queue slot"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Analysis queue is full")
+        self.retry_after = retry_after
+
+
+class AnalysisTimeoutError(Exception):
+    """Raised when an analysis job exceeds the per-job timeout"""
+
+
+# Per-process analyzer, built lazily inside each pool worker
+_worker_analyzers: Dict[str, Any] = {}
+
+# (job_id, stage, timestamp, values) events reported by running jobs; handed
+# to pool workers by their initializer and set in the serving process by start()
+_progress_events = None
+
+
+def _init_worker(progress_events):
+    global _progress_events
+    _progress_events = progress_events
+
+
+class StageProgress:
+    """Picklable progress callback reporting the stages of one job to the executor's event queue.
+
+    Called with a stage name when the stage starts, and with the stage name
+    and a dict of result fields when those fields are ready early.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def __call__(self, stage: str, values: Optional[Dict[str, Any]] = None):
+        if _progress_events is not None:
+            _progress_events.put((self.job_id, stage, time.time(), values))
+
+
+def _get_worker_analyzer(config: AudioAnalysisConfig):
+    from src.services.audio_analyzer import AudioAnalyzer
+
+    key = config.model_dump_json()
+    if key not in _worker_analyzers:
+        _worker_analyzers[key] = AudioAnalyzer.from_config(config)
+    return _worker_analyzers[key]
+
+
+def analyze_file_job(file_path: str, config: AudioAnalysisConfig, analysis_type: str = "full",
+                     timeline: bool = False, summarize: bool = True,
+                     progress: Optional[StageProgress] = None,
+                     content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Pool entry point for AudioAnalyzer.analyze_file"""
+    return _get_worker_analyzer(config).analyze_file_sync(file_path, analysis_type, timeline,
+                                                          summarize, progress, content_hash)
+
+
+def hash_audio_job(file_path: str, config: AudioAnalysisConfig,
+                   progress: Optional[StageProgress] = None) -> str:
+    """Pool entry point for AudioAnalyzer.hash_audio"""
+    return _get_worker_analyzer(config).hash_audio_sync(file_path, progress)
+
+
+def extract_features_job(y: np.ndarray, sr: int, config: AudioAnalysisConfig,
+                         analysis_type: str = "full", timeline: bool = False,
+                         summarize: bool = True,
+                         progress: Optional[StageProgress] = None) -> Dict[str, Any]:
+    """Pool entry point for AudioAnalyzer._extract_features"""
+    return _get_worker_analyzer(config).extract_features_sync(y, sr, analysis_type, timeline,
+                                                              summarize, progress)
+
+
+class AnalysisExecutor:
+    """Bounded process pool that runs CPU-bound analysis off the event loop.
+
+    Configured through ANALYSIS_WORKERS (0 runs jobs on the loop's default
+    thread pool instead of processes), ANALYSIS_MAX_QUEUED, ANALYSIS_JOB_TIMEOUT
+    and ANALYSIS_RETRY_AFTER.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queued: Optional[int] = None,
+                 job_timeout: Optional[float] = None, retry_after: Optional[int] = None):
+        self.max_workers = max_workers if max_workers is not None else \
+            int(os.getenv('ANALYSIS_WORKERS', os.cpu_count() or 1))
+        self.max_queued = max_queued if max_queued is not None else \
+            int(os.getenv('ANALYSIS_MAX_QUEUED', 16))
+        self.job_timeout = job_timeout if job_timeout is not None else \
+            float(os.getenv('ANALYSIS_JOB_TIMEOUT', 300))
+        self.retry_after = retry_after if retry_after is not None else \
+            int(os.getenv('ANALYSIS_RETRY_AFTER', 5))
+
+        self._pool: Optional[Executor] = None
+        # Used instead of the process pool when ANALYSIS_WORKERS=0
+        self._threads: Optional[ThreadPoolExecutor] = None
+        # Pools killed by _recycle(), whose jobs failed through no fault of their own
+        self._recycled: "weakref.WeakSet[Executor]" = weakref.WeakSet()
+        # Stage events from StageProgress callbacks, delivered to listeners by
+        # dispatch_progress()
+        self.progress_events = None
+        self._progress_listeners: Dict[str, Callable[[str, float, Optional[Dict[str, Any]]], None]] = {}
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the worker pool"""
+        global _progress_events
+        if self._pool is not None:
+            return
+        if self.max_workers <= 0:
+            if self.progress_events is None:
+                self.progress_events = _progress_events = queue.Queue()
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(thread_name_prefix="analysis")
+            return
+        context = multiprocessing.get_context('spawn')
+        self.progress_events = _progress_events = context.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.progress_events,)
+        )
+        logger.info(f"Analysis pool started with {self.max_workers} workers")
+
+    def shutdown(self):
+        """Shut down the worker pool, cancelling queued jobs and waiting for running ones"""
+        if self._threads is not None:
+            self._threads.shutdown(wait=True, cancel_futures=True)
+            self._threads = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("Analysis pool shut down")
+
+    def _recycle(self, pool: Executor, reason: str):
+        """Kill the worker processes of pool and start a fresh pool for later jobs.
+
+        Running jobs cannot be cancelled in a process pool, so a timed-out job
+        only gives its worker back once its process is gone. Other jobs of the
+        killed pool fail with BrokenProcessPool and are resubmitted by run().
+        Does not block the event loop.
+        """
+        if pool is not self._pool:
+            return
+        logger.warning(f"Recycling analysis pool: {reason}")
+        self._recycled.add(pool)
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        self._pool = None
+        pool.shutdown(wait=False)
+        for process in processes:
+            process.kill()
+        self.start()
+
+    def add_progress_listener(self, job_id: str,
+                              callback: Callable[[str, float, Optional[Dict[str, Any]]], None]):
+        """Call callback(stage, timestamp, values) for the events of StageProgress(job_id)"""
+        self._progress_listeners[job_id] = callback
+
+    def remove_progress_listener(self, job_id: str):
+        self._progress_listeners.pop(job_id, None)
+
+    def dispatch_progress(self):
+        """Deliver pending stage events to their listeners; events without a listener are dropped"""
+        while self.progress_events is not None:
+            try:
+                job_id, stage, timestamp, values = self.progress_events.get_nowait()
+            except queue.Empty:
+                break
+            callback = self._progress_listeners.get(job_id)
+            if callback is not None:
+                callback(stage, timestamp, values)
+
+    @property
+    def capacity(self) -> int:
+        return max(self.max_workers, 1) + self.max_queued
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_queued": self.max_queued,
+            "in_flight": self._in_flight,
+            "queued": max(self._in_flight - max(self.max_workers, 1), 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected
+        }
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run func(*args) in the pool, enforcing queue bounds and the job timeout.
+
+        A job still running at the timeout has its worker killed, so the slot
+        is free again once the caller gets AnalysisTimeoutError. With
+        ANALYSIS_WORKERS=0 jobs run in threads, which cannot be killed, and a
+        timed-out job holds its slot until it returns.
+        """
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise AnalysisQueueFullError(self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.job_timeout
+        while True:
+            pool, job = self._submit(loop, func, args)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(job),
+                                                timeout=max(deadline - loop.time(), 0))
+                self.completed += 1
+                return result
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                if not job.cancel() and pool is not None:
+                    self._recycle(pool, f"a job exceeded the {self.job_timeout:.0f}s timeout")
+                raise AnalysisTimeoutError(f"Analysis exceeded {self.job_timeout:.0f}s timeout")
+            except BrokenProcessPool:
+                if pool in self._recycled:
+                    # Killed with another job's worker, not by its own doing: run it again
+                    continue
+                self.failed += 1
+                logger.error("Analysis worker died, restarting pool")
+                self._recycle(pool, "a worker died")
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, func: Callable[..., Any],
+                args: Tuple[Any, ...]) -> Tuple[Optional[Executor], Any]:
+        """Submit one attempt of a job, holding a slot until it really finishes"""
+        if (self._pool if self.max_workers > 0 else self._threads) is None:
+            self.start()
+
+        # The slot is released when the job really finishes, not when the caller
+        # stops waiting, so a running job always counts against the queue bound.
+        # Both pools return concurrent futures, which cancelling the caller's
+        # asyncio wrapper only marks done while the job is still queued.
+        pool = self._pool
+        self._in_flight += 1
+        try:
+            if pool is not None:
+                job = pool.submit(func, *args)
+            else:
+                job = self._threads.submit(func, *args)
+        except BrokenProcessPool:
+            self._in_flight -= 1
+            logger.error("Analysis pool is broken, restarting")
+            self._recycle(pool, "the pool is broken")
+            raise
+        except Exception:
+            self._in_flight -= 1
+            raise
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return pool, job
+
+    def _release(self):
+        self._in_flight -= 1
@@ -0,0 +1,348 @@
+import asyncio
+import functools
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from src.services.analysis_cache import source_hash
+from src.services.analysis_executor import AnalysisQueueFullError, StageProgress
+from src.services.memory_cache import LRUCache
+
+# Stages a job moves through, in order; download only for remote files and
+# timeline only when requested
+JOB_STAGES = ("queued", "download", "decode", "rhythm", "spectral", "summary", "timeline", "done")
+
+# Jobs in these states can be joined by duplicate submissions
+LIVE_JOB_STATUSES = ("queued", "running")
+
+
+class MemoryJobBackend:
+    """In-process stand-in for the Redis job methods of RedisClient, for tests and single-node use"""
+
+    def __init__(self, max_jobs: int = 10000):
+        self._queue: deque = deque()
+        # Created on first use so it belongs to the serving event loop
+        self._ready: Optional[asyncio.Event] = None
+        self._jobs = LRUCache(max_entries=max_jobs)
+        self._claims: Dict[str, str] = {}
+        self._results = LRUCache(max_entries=max_jobs)
+
+    async def enqueue_analysis_job(self, job: Dict[str, Any], expire_seconds: int = 3600):
+        self._jobs.put(job["job_id"], dict(job), size=0, ttl=expire_seconds)
+        self._queue.appendleft(job["job_id"])
+        if self._ready is not None:
+            self._ready.set()
+
+    async def dequeue_analysis_job(self, timeout: int = 1) -> Optional[str]:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        if not self._queue:
+            self._ready.clear()
+            # Not wait_for: before Python 3.12 it swallows a cancellation that
+            # arrives as the event is set, and stop() would wait forever
+            ready = asyncio.ensure_future(self._ready.wait())
+            try:
+                await asyncio.wait((ready,), timeout=timeout)
+            finally:
+                ready.cancel()
+        return self._queue.pop() if self._queue else None
+
+    async def analysis_job_queue_length(self) -> int:
+        return len(self._queue)
+
+    async def set_analysis_job(self, job: Dict[str, Any], expire_seconds: int = 3600):
+        self._jobs.put(job["job_id"], dict(job), size=0, ttl=expire_seconds)
+
+    async def get_analysis_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def claim_analysis_job(self, dedup_key: str, job_id: str,
+                                 expire_seconds: int = 3600) -> Optional[str]:
+        existing = self._claims.get(dedup_key)
+        if existing is None:
+            self._claims[dedup_key] = job_id
+        return existing
+
+    async def release_analysis_job(self, dedup_key: str, job_id: str):
+        if self._claims.get(dedup_key) == job_id:
+            del self._claims[dedup_key]
+
+    async def set_analysis_job_result(self, job_id: str, result: Dict[str, Any],
+                                      expire_seconds: int = 3600):
+        self._results.put(job_id, result, ttl=expire_seconds)
+
+    async def get_analysis_job_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._results.get(job_id)
+
+
+class AnalysisJobManager:
+    """Asynchronous file analysis: submit a job, poll its progress, fetch its result.
+
+    Job ids are queued on a backend (RedisClient, or MemoryJobBackend). One
+    dispatcher task per instance pops them, on a single blocking connection,
+    whenever fewer than ANALYSIS_JOB_CONCURRENCY jobs are running, and runs
+    each through AnalysisCache so results land in the shared cache. Analysis
+    workers report each stage they start through StageProgress; the stage
+    durations are kept on the job and aggregated for stats(). A submission
+    whose source is already cached finishes immediately, one for a source
+    with a queued or running job returns that job, and concurrent jobs for
+    the same content share one computation through the cache's single flight.
+
+    Submissions are deduplicated by source URL, not content: the content hash
+    is only known once a worker has downloaded and decoded the file. The
+    same audio under two URLs gets two jobs, which share the analysis through
+    the single flight on one instance and the content-addressed result cache
+    across instances. A file replaced at the same URL joins a queued or
+    running job for the old file, and is served the old result until the
+    URL's cache alias expires.
+    """
+
+    def __init__(self, backend, analysis_cache, analyzer, concurrency: Optional[int] = None,
+                 expire_seconds: Optional[int] = None, poll_interval: float = 0.05):
+        self.backend = backend
+        self.analysis_cache = analysis_cache
+        self.analyzer = analyzer
+        self.concurrency = concurrency if concurrency is not None else \
+            int(os.getenv('ANALYSIS_JOB_CONCURRENCY', os.cpu_count() or 1))
+        self.expire_seconds = expire_seconds if expire_seconds is not None else \
+            int(os.getenv('ANALYSIS_JOB_TTL', 3600))
+        self.poll_interval = poll_interval
+
+        # Jobs running on this instance, updated by their stage events
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._changed: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._job_tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        # stage -> [count, total seconds, max seconds]
+        self._stage_timings: Dict[str, List[float]] = {}
+
+    def start(self):
+        """Start the job dispatcher and the stage event poller; call from the event loop"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._consume()),
+                       asyncio.create_task(self._poll_progress())]
+
+    async def stop(self):
+        """Cancel the dispatcher and running jobs; the jobs are queued again"""
+        tasks = self._tasks + list(self._job_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, file_url: str, analysis_type: str = "full", cache_result: bool = True,
+                     timeline: bool = False) -> Dict[str, Any]:
+        """Queue an analysis job, or return an equivalent finished or live one"""
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "file_url": file_url,
+            "analysis_type": analysis_type,
+            "cache_result": cache_result,
+            "timeline": timeline,
+            "content_hash": None,
+            "error": None,
+            "stages": {},
+            "submitted_at": now,
+            "started_at": None,
+            "finished_at": None
+        }
+        self.submitted += 1
+
+        cached_hash = await self.analysis_cache.cached_source(file_url, analysis_type, timeline)
+        if cached_hash:
+            job.update(status="done", stage="done", progress=1.0, content_hash=cached_hash,
+                       started_at=now, finished_at=now)
+            await self.backend.set_analysis_job(job, self.expire_seconds)
+            return job
+
+        dedup_key = self._dedup_key(job)
+        for _ in range(2):
+            existing_id = await self.backend.claim_analysis_job(dedup_key, job["job_id"],
+                                                                self.expire_seconds)
+            if existing_id is None:
+                break
+            existing = await self.backend.get_analysis_job(existing_id)
+            if existing and existing["status"] in LIVE_JOB_STATUSES:
+                self.deduplicated += 1
+                return existing
+            # Stale registration of a finished or expired job
+            await self.backend.release_analysis_job(dedup_key, existing_id)
+
+        await self.backend.enqueue_analysis_job(job, self.expire_seconds)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.backend.get_analysis_job(job_id)
+
+    async def result(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(job, result); the result is None until the job is done or once it has expired"""
+        job = await self.get(job_id)
+        if not job or job["status"] != "done":
+            return job, None
+        if job["cache_result"]:
+            return job, await self.analysis_cache.get(job["content_hash"], job["analysis_type"])
+        return job, await self.backend.get_analysis_job_result(job_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": await self.backend.analysis_job_queue_length(),
+            "running": len(self._running),
+            "concurrency": self.concurrency,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "stage_seconds": {
+                stage: {
+                    "count": int(count),
+                    "mean": round(total / count, 3),
+                    "max": round(longest, 3)
+                }
+                for stage, (count, total, longest) in self._stage_timings.items()
+            }
+        }
+
+    @staticmethod
+    def _dedup_key(job: Dict[str, Any]) -> str:
+        """Key of live jobs a submission joins: source URL and output, as content is not known yet"""
+        return f"{source_hash(job['file_url'])}:{job['analysis_type']}" + \
+            (":timeline" if job["timeline"] else "")
+
+    async def _consume(self):
+        # Only pop a job when a slot is free, so queued jobs stay on the shared
+        # queue for other instances instead of waiting here
+        slots = asyncio.Semaphore(max(self.concurrency, 1))
+        while True:
+            await slots.acquire()
+            try:
+                job_id = await self.backend.dequeue_analysis_job(timeout=1)
+            except asyncio.CancelledError:
+                slots.release()
+                raise
+            except Exception as e:
+                slots.release()
+                logger.error(f"Error consuming analysis jobs: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if not job_id:
+                slots.release()
+                continue
+            task = asyncio.create_task(self._run(job_id))
+            self._job_tasks.add(task)
+            task.add_done_callback(functools.partial(self._job_done, slots))
+
+    def _job_done(self, slots: asyncio.Semaphore, task: asyncio.Task):
+        self._job_tasks.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error running analysis job: {str(task.exception())}")
+
+    async def _run(self, job_id: str):
+        job = await self.backend.get_analysis_job(job_id)
+        if not job:
+            return
+
+        # Time spent waiting in the queue is recorded as the "queued" stage
+        job.update(status="running", started_at=time.time(), stage_started_at=job["submitted_at"])
+        self._running[job_id] = job
+        executor = self.analyzer.executor
+        if executor is not None:
+            executor.add_progress_listener(job_id, functools.partial(self._on_progress, job))
+        await self.backend.set_analysis_job(job, self.expire_seconds)
+        try:
+            result = await self.analysis_cache.analyze(
+                self.analyzer, job["file_url"], source=job["file_url"],
+                cache_result=job["cache_result"], analysis_type=job["analysis_type"],
+                timeline=job["timeline"], progress=StageProgress(job_id)
+            )
+            if not job["cache_result"]:
+                await self.backend.set_analysis_job_result(job_id, result, self.expire_seconds)
+            self._dispatch_progress()
+            self._finish_stage(job, "done", time.time())
+            job.update(status="done", content_hash=result["content_hash"])
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Shutting down: leave the job for another consumer
+            await self._requeue(job)
+            raise
+        except AnalysisQueueFullError as e:
+            # Pool busy with interactive work: try again later
+            await asyncio.sleep(e.retry_after)
+            await self._requeue(job)
+            return
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"Error running analysis job {job_id}: {error}")
+            job.update(status="failed", error=error)
+            self.failed += 1
+        finally:
+            self._running.pop(job_id, None)
+            self._changed.pop(job_id, None)
+            if executor is not None:
+                executor.remove_progress_listener(job_id)
+
+        job["finished_at"] = time.time()
+        job.pop("stage_started_at", None)
+        await self.backend.set_analysis_job(job, self.expire_seconds)
+        await self.backend.release_analysis_job(self._dedup_key(job), job_id)
+
+    async def _requeue(self, job: Dict[str, Any]):
+        job.update(status="queued", stage="queued", progress=0.0, started_at=None, stages={})
+        job.pop("stage_started_at", None)
+        await self.backend.enqueue_analysis_job(job, self.expire_seconds)
+
+    async def _poll_progress(self):
+        while True:
+            try:
+                for job in self._dispatch_progress():
+                    await self.backend.set_analysis_job(job, self.expire_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error updating analysis job progress: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _dispatch_progress(self) -> List[Dict[str, Any]]:
+        """Apply pending stage events to running jobs; returns the jobs that changed"""
+        if self.analyzer.executor is not None:
+            self.analyzer.executor.dispatch_progress()
+        changed = list(self._changed.values())
+        self._changed.clear()
+        return changed
+
+    def _on_progress(self, job: Dict[str, Any], stage: str, timestamp: float,
+                     values: Optional[Dict[str, Any]]):
+        # Early result fields are only of interest to streaming responses
+        if values is None and stage != job["stage"]:
+            self._finish_stage(job, stage, timestamp)
+            self._changed[job["job_id"]] = job
+
+    def _finish_stage(self, job: Dict[str, Any], next_stage: str, timestamp: float):
+        """Record the duration of the job's current stage and move it to next_stage"""
+        stage = job["stage"]
+        if "stage_started_at" in job:
+            seconds = max(timestamp - job["stage_started_at"], 0.0)
+            job["stages"][stage] = round(seconds, 4)
+            timing = self._stage_timings.setdefault(stage, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+        job["stage"] = next_stage
+        job["stage_started_at"] = timestamp
+        # Streaming analysis reports rhythm after spectral; progress never goes back
+        progress = round(JOB_STAGES.index(next_stage) / (len(JOB_STAGES) - 1), 3)
+        job["progress"] = max(job["progress"], progress)
@@ -1,45 +1,143 @@
 import numpy as np
 import librosa
-import sounddevice as sd
-from scipy import signal
-from scipy.fft import fft, fftfreq
 import asyncio
+import os
 import threading
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
 from loguru import logger
 import time
 
+from src.models.audio_analysis import AudioAnalysisConfig
+from src.services.analysis_cache import content_digest, content_hash
+from src.services.analysis_executor import (
+    AnalysisExecutor, analyze_file_job, extract_features_job, hash_audio_job
+)
+from src.services.audio_io import (
+    audio_duration, audio_sample_rate, download_to_temp_sync, is_remote, iter_audio_blocks
+)
+from src.services.feature_engine import (
+    ANALYSIS_FIELDS, FIELD_FEATURES, RHYTHM_FEATURES, FeatureEngine, StreamingFeatureEngine
+)
+from src.services.feature_store import FRAME_SERIES_FIELDS
+from src.services.track_summary import SUMMARY_FIELDS, summarize_tracks
+from src.services.visual_timeline import TimelineBuilder
+
+try:
+    import sounddevice as sd
+except OSError:
+    # PortAudio missing (headless hosts, CI): no devices to list or select
+    sd = None
+
+# Called with the name of each analysis stage as it starts, and with a stage
+# name and a dict of result fields as soon as those fields are computed
+ProgressCallback = Optional[Callable[..., None]]
+
+# Seconds the samples decoded by hash_audio are kept for the analysis that
+# follows a cache miss; after that the analysis decodes the file again
+DECODED_HANDOFF_SECONDS = 10.0
+
 class AudioAnalyzer:
     """Real-time audio analysis using sounddevice, librosa, and scipy"""
     
-    def __init__(self, sample_rate: int = 44100, chunk_size: int = 1024):
+    def __init__(self, sample_rate: int = 44100, chunk_size: int = 1024,
+                 executor: Optional[AnalysisExecutor] = None):
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
-        self.is_recording = False
-        self.audio_buffer = []
-        self.stream = None
+        
+        # Offline analysis runs here when set, otherwise inline
+        self.executor = executor
         
         # Audio analysis parameters
         self.hop_length = 512
         self.n_fft = 2048
         self.n_mfcc = 13
         
-        # Beat tracking parameters
-        self.tempo_history = []
-        self.beat_times = []
+        # Sources whose native rate falls in this range are analyzed without
+        # resampling; others are resampled to sample_rate
+        self.min_native_rate = int(os.getenv('ANALYSIS_MIN_NATIVE_RATE', 22050))
+        self.max_native_rate = int(os.getenv('ANALYSIS_MAX_NATIVE_RATE', 48000))
+        
+        # Rhythm features run on the signal decimated to this rate (0 disables)
+        self.rhythm_sample_rate = int(os.getenv('ANALYSIS_RHYTHM_SAMPLE_RATE', 22050))
+        
+        # Files at least this long are analyzed in bounded-memory streaming
+        # mode (negative disables streaming)
+        self.stream_min_seconds = float(os.getenv('ANALYSIS_STREAM_MIN_SECONDS', 600))
+        
+        # (file path, content hash, y, sr) of the last file decoded by hash_audio,
+        # so the analysis that follows a cache miss skips decoding again when it
+        # runs in the same process; dropped when taken, on a cache hit, by the
+        # next decode, or after DECODED_HANDOFF_SECONDS
+        self._last_decoded: Optional[Tuple[str, str, np.ndarray, int]] = None
+        self._decoded_expiry: Optional[threading.Timer] = None
         
         logger.info("AudioAnalyzer initialized")
     
-    async def analyze_file(self, file_path: str) -> Dict[str, Any]:
-        """Analyze an audio file and extract features"""
+    @classmethod
+    def from_config(cls, config: AudioAnalysisConfig) -> "AudioAnalyzer":
+        """Build an analyzer from an AudioAnalysisConfig"""
+        analyzer = cls(sample_rate=config.sample_rate, chunk_size=config.chunk_size)
+        analyzer.hop_length = config.hop_length
+        analyzer.n_fft = config.n_fft
+        analyzer.n_mfcc = config.n_mfcc
+        analyzer.min_native_rate = config.min_native_rate
+        analyzer.max_native_rate = config.max_native_rate
+        analyzer.rhythm_sample_rate = config.rhythm_sample_rate
+        analyzer.stream_min_seconds = config.stream_min_seconds
+        return analyzer
+    
+    @property
+    def config(self) -> AudioAnalysisConfig:
+        return AudioAnalysisConfig(
+            sample_rate=self.sample_rate,
+            chunk_size=self.chunk_size,
+            hop_length=self.hop_length,
+            n_fft=self.n_fft,
+            n_mfcc=self.n_mfcc,
+            min_native_rate=self.min_native_rate,
+            max_native_rate=self.max_native_rate,
+            rhythm_sample_rate=self.rhythm_sample_rate,
+            stream_min_seconds=self.stream_min_seconds
+        )
+    
+    async def analyze_file(self, file_path: str, analysis_type: str = "full",
+                           timeline: bool = False, summarize: bool = True,
+                           progress: ProgressCallback = None,
+                           content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze an audio file and extract features.
+        
+        ``content_hash`` is the file's hash from hash_audio; the samples that
+        call decoded are reused when this analysis runs in the same process.
+        """
+        if self.executor is None:
+            return self.analyze_file_sync(file_path, analysis_type, timeline, summarize, progress,
+                                          content_hash)
+        return await self.executor.run(analyze_file_job, file_path, self.config, analysis_type,
+                                       timeline, summarize, progress, content_hash)
+    
+    def analyze_file_sync(self, file_path: str, analysis_type: str = "full",
+                          timeline: bool = False, summarize: bool = True,
+                          progress: ProgressCallback = None,
+                          content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Blocking implementation of analyze_file"""
         try:
             logger.info(f"Analyzing audio file: {file_path}")
             
-            # Load audio file
-            y, sr = librosa.load(file_path, sr=self.sample_rate)
-            
-            # Extract features
-            features = await self._extract_features(y, sr)
+            if self.should_stream(file_path):
+                features = self.extract_features_streaming(file_path, analysis_type, timeline,
+                                                           summarize, progress)
+            else:
+                decoded = self._take_decoded(file_path, content_hash)
+                if decoded is None:
+                    # Load audio file
+                    if progress:
+                        progress("decode")
+                    decoded = self.load_audio_sync(file_path)
+                y, sr = decoded
+                
+                # Extract features
+                features = self.extract_features_sync(y, sr, analysis_type, timeline, summarize,
+                                                      progress)
             
             logger.info("Audio analysis completed successfully")
             return features
@@ -48,214 +146,258 @@ class AudioAnalyzer:
             logger.error(f"Error analyzing audio file: {str(e)}")
             raise e
     
-    async def _extract_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
-        """Extract comprehensive audio features"""
-        
-        # Basic audio properties
-        duration = len(y) / sr
-        
-        # Spectral features
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
-        zero_crossing_rate = librosa.feature.zero_crossing_rate(y)[0]
+    def _take_decoded(self, file_path: str,
+                      content_hash: Optional[str]) -> Optional[Tuple[np.ndarray, int]]:
+        """Samples hash_audio decoded for this file and hash, handed over only once"""
+        decoded = self._last_decoded
+        if content_hash is None or decoded is None or decoded[:2] != (file_path, content_hash):
+            return None
+        self._last_decoded = None
+        return decoded[2], decoded[3]
+    
+    def analysis_rate(self, native_rate: int) -> int:
+        """Sample rate a source with the given native rate is analyzed at"""
+        if self.min_native_rate <= native_rate <= self.max_native_rate:
+            return native_rate
+        return self.sample_rate
+    
+    def should_stream(self, file_path: str) -> bool:
+        """Whether a local file is long enough to analyze in streaming mode"""
+        if self.stream_min_seconds < 0 or is_remote(file_path):
+            return False
+        duration = audio_duration(file_path)
+        return duration is not None and duration >= self.stream_min_seconds
+    
+    async def hash_audio(self, file_path: str, progress: ProgressCallback = None) -> str:
+        """Content hash of an audio file's decoded samples.
         
-        # MFCC features
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=self.n_mfcc)
+        Only the hash leaves the worker: the samples stay there for
+        analyze_file(content_hash=...), and files analyzed in streaming mode
+        are hashed block by block without holding them.
+        """
+        if self.executor is None:
+            return self.hash_audio_sync(file_path, progress)
+        return await self.executor.run(hash_audio_job, file_path, self.config, progress)
+    
+    def hash_audio_sync(self, file_path: str, progress: ProgressCallback = None) -> str:
+        """Blocking implementation of hash_audio"""
+        if progress:
+            progress("decode")
+        if self.should_stream(file_path):
+            sr = self.analysis_rate(audio_sample_rate(file_path))
+            digest = content_digest(sr, self.config)
+            for block in iter_audio_blocks(file_path, sr):
+                digest.update(block.tobytes())
+            return digest.hexdigest()
         
-        # Chroma features
-        chroma = librosa.feature.chroma(y=y, sr=sr)
+        self.discard_decoded()
+        y, sr = self.load_audio_sync(file_path)
+        file_hash = content_hash(y, sr, self.config)
+        self._last_decoded = (file_path, file_hash, y, sr)
+        # Pool workers are not told about cache hits, so the samples expire
+        # instead of staying resident until the worker's next decode
+        self._decoded_expiry = threading.Timer(DECODED_HANDOFF_SECONDS, self.discard_decoded,
+                                               args=(file_hash,))
+        self._decoded_expiry.daemon = True
+        self._decoded_expiry.start()
+        return file_hash
+
+    def discard_decoded(self, content_hash: Optional[str] = None):
+        """Drop the samples kept by hash_audio (only if they have content_hash, when given)"""
+        decoded = self._last_decoded
+        if decoded is not None and content_hash in (None, decoded[1]):
+            self._last_decoded = None
+        if self._last_decoded is None and self._decoded_expiry is not None:
+            self._decoded_expiry.cancel()
+            self._decoded_expiry = None
+    
+    def load_audio_sync(self, file_path: str) -> Tuple[np.ndarray, int]:
+        """Decode an audio file (local path or http(s) URL) at its analysis rate"""
+        if is_remote(file_path):
+            # Download remote files to a temp file first; librosa only reads local paths
+            temp_path = download_to_temp_sync(file_path)
+            try:
+                return self.load_audio_sync(temp_path)
+            finally:
+                os.remove(temp_path)
         
-        # Beat and tempo analysis
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-        beat_times = librosa.frames_to_time(beats, sr=sr)
+        # Decode at the native rate and only resample when it is out of range;
+        # identical to librosa.load(sr=sample_rate) in that case
+        y, native_rate = librosa.load(file_path, sr=None)
+        sr = self.analysis_rate(native_rate)
+        if sr != native_rate:
+            y = librosa.resample(y, orig_sr=native_rate, target_sr=sr, res_type="soxr_hq")
+        return y, sr
+    
+    async def _extract_features(self, y: np.ndarray, sr: int, analysis_type: str = "full",
+                                timeline: bool = False, summarize: bool = True,
+                                progress: ProgressCallback = None) -> Dict[str, Any]:
+        """Extract comprehensive audio features.
         
-        # Onset detection
-        onset_frames = librosa.onset.onset_detect(y=y, sr=sr)
-        onset_times = librosa.frames_to_time(onset_frames, sr=sr)
+        With ``summarize=False`` the summary fields are left for a later
+        summarize() call that covers many tracks at once.
+        """
+        if self.executor is None:
+            return self.extract_features_sync(y, sr, analysis_type, timeline, summarize, progress)
+        return await self.executor.run(extract_features_job, y, sr, self.config, analysis_type,
+                                       timeline, summarize, progress)
+    
+    def extract_features_sync(self, y: np.ndarray, sr: int, analysis_type: str = "full",
+                              timeline: bool = False, summarize: bool = True,
+                              progress: ProgressCallback = None) -> Dict[str, Any]:
+        """Blocking implementation of _extract_features"""
+        fields = self._analysis_fields(analysis_type)
+        features = self._engine_features(fields, timeline)
         
-        # Rhythm features
-        rhythm_features = librosa.feature.rhythm(y=y, sr=sr)
+        # Shared STFT / mel / onset intermediates, computed once per track and
+        # only for the features the requested fields depend on
+        engine = FeatureEngine(y, sr, n_fft=self.n_fft, hop_length=self.hop_length,
+                               n_mfcc=self.n_mfcc, rhythm_sr=self.rhythm_sample_rate)
         
-        # Energy and loudness
-        rms = librosa.feature.rms(y=y)[0]
-        energy = np.mean(rms)
+        # Rhythm and RMS first: tempo, beats, energy and loudness are reported
+        # before the spectrogram-based features are computed
+        reported: Set[str] = set()
+        early = features & (set(RHYTHM_FEATURES) | {"rms"})
+        if progress:
+            progress("rhythm")
+        engine.compute(early)
+        self._report_fields(progress, "rhythm", engine, fields, len(y), early, reported)
+        if progress:
+            progress("spectral")
+        engine.compute(features - early)
         
-        # Key detection (simplified)
-        chroma_mean = np.mean(chroma, axis=1)
-        key = self._detect_key(chroma_mean)
+        if progress:
+            progress("summary")
+        self._report_fields(progress, "summary", engine, fields, len(y), features, reported)
+        result = self._build_result(engine, fields, len(y), summarize)
+        if timeline:
+            if progress:
+                progress("timeline")
+            builder = TimelineBuilder(sr, frame_size=self.chunk_size)
+            builder.feed(y)
+            result["timeline"] = builder.finish(engine.rhythm.beat_times)
+        return result
+    
+    def extract_features_streaming(self, file_path: str, analysis_type: str = "full",
+                                   timeline: bool = False, summarize: bool = True,
+                                   progress: ProgressCallback = None) -> Dict[str, Any]:
+        """Extract features block by block with memory bounded by the block size"""
+        fields = self._analysis_fields(analysis_type)
+        features = self._engine_features(fields, timeline)
         
-        # Danceability and valence (simplified calculations)
-        danceability = self._calculate_danceability(tempo, energy, spectral_centroid)
-        valence = self._calculate_valence(chroma_mean, energy)
+        sr = self.analysis_rate(audio_sample_rate(file_path))
+        engine = StreamingFeatureEngine(
+            sr,
+            features,
+            n_fft=self.n_fft, hop_length=self.hop_length, n_mfcc=self.n_mfcc,
+            rhythm_sr=self.rhythm_sample_rate
+        )
+        builder = TimelineBuilder(sr, frame_size=self.chunk_size) if timeline else None
+        # Decoding is interleaved with the frame-wise spectral features
+        if progress:
+            progress("spectral")
+        for block in iter_audio_blocks(file_path, sr):
+            engine.feed(block)
+            if builder:
+                builder.feed(block)
+        if progress:
+            progress("rhythm")
+        engine.finish()
         
-        return {
-            "bpm": float(tempo),
-            "key": key,
-            "energy": float(energy),
-            "valence": float(valence),
-            "danceability": float(danceability),
-            "tempo": float(tempo),
-            "loudness": float(np.mean(librosa.amplitude_to_db(rms))),
-            "spectral_centroid": spectral_centroid.tolist(),
-            "mfcc": mfcc.tolist(),
-            "chroma": chroma.tolist(),
-            "onset_times": onset_times.tolist(),
-            "beat_times": beat_times.tolist(),
-            "segment_timbre": mfcc.tolist(),  # Using MFCC as timbre representation
-            "segment_pitches": chroma.tolist(),  # Using chroma as pitch representation
-            "duration": float(duration),
-            "sample_rate": sr
-        }
+        if progress:
+            progress("summary")
+        self._report_fields(progress, "summary", engine, fields, engine.n_samples,
+                            features, set())
+        result = self._build_result(engine, fields, engine.n_samples, summarize)
+        if builder:
+            if progress:
+                progress("timeline")
+            result["timeline"] = builder.finish(engine.rhythm.beat_times)
+        return result
+    
+    def _analysis_fields(self, analysis_type: str) -> Tuple[str, ...]:
+        if analysis_type not in ANALYSIS_FIELDS:
+            raise ValueError(f"Unknown analysis type: {analysis_type}")
+        return ANALYSIS_FIELDS[analysis_type]
     
-    def _detect_key(self, chroma_mean: np.ndarray) -> str:
-        """Simple key detection based on chroma features"""
-        keys = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        key_index = np.argmax(chroma_mean)
-        return keys[key_index]
+    @staticmethod
+    def _engine_features(fields: Tuple[str, ...], timeline: bool) -> Set[str]:
+        features = {feature for field in fields for feature in FIELD_FEATURES[field]}
+        if timeline:
+            # Timeline beat flags come from the tracked beats
+            features.add("beat_times")
+        return features
     
-    def _calculate_danceability(self, tempo: float, energy: float, spectral_centroid: np.ndarray) -> float:
-        """Calculate danceability based on tempo, energy, and spectral features"""
-        # Normalize tempo (optimal range: 90-140 BPM)
-        tempo_score = 1.0 - abs(tempo - 115) / 115
+    def _report_fields(self, progress: ProgressCallback, stage: str, engine: FeatureEngine,
+                       fields: Tuple[str, ...], n_samples: int, computed: Set[str],
+                       reported: Set[str]):
+        """Report the scalar and event fields whose features are computed and not yet reported.
         
-        # Energy score
-        energy_score = min(energy * 2, 1.0)
+        Per-frame matrices are left to the final result.
+        """
+        if not progress:
+            return
+        ready = tuple(
+            field for field in fields
+            if field not in reported and field not in FRAME_SERIES_FIELDS
+            and set(FIELD_FEATURES[field]) <= computed
+        )
+        if ready:
+            reported.update(ready)
+            progress(stage, self._build_result(engine, ready, n_samples))
+    
+    def _build_result(self, engine: FeatureEngine, fields: Tuple[str, ...],
+                      n_samples: int, summarize: bool = True) -> Dict[str, Any]:
+        """Assemble the response fields from computed engine features"""
+        sr = engine.sr
+        rhythm = engine.rhythm
         
-        # Spectral centroid score (higher = more brightness)
-        brightness_score = np.mean(spectral_centroid) / 4000
+        builders = {
+            "bpm": lambda: rhythm.tempo,
+            "tempo": lambda: rhythm.tempo,
+            "spectral_centroid": lambda: engine.spectral_centroid.tolist(),
+            "mfcc": lambda: engine.mfcc.tolist(),
+            "chroma": lambda: engine.chroma.tolist(),
+            "onset_times": lambda: rhythm.onset_times.tolist(),
+            "beat_times": lambda: rhythm.beat_times.tolist(),
+            "segment_timbre": lambda: engine.mfcc.tolist(),  # Using MFCC as timbre representation
+            "segment_pitches": lambda: engine.chroma.tolist(),  # Using chroma as pitch representation
+            "duration": lambda: float(n_samples / sr),
+            "sample_rate": lambda: sr,
+            "frame_rate": lambda: engine.frame_rate
+        }
         
-        # Combine scores
-        danceability = (tempo_score * 0.4 + energy_score * 0.4 + brightness_score * 0.2)
-        return max(0, min(1, danceability))
-    
-    def _calculate_valence(self, chroma_mean: np.ndarray, energy: float) -> float:
-        """Calculate valence (positivity) based on chroma and energy"""
-        # Major keys tend to sound more positive
-        major_chroma = chroma_mean[[0, 2, 4, 5, 7, 9, 11]]  # C, D, E, F, G, A, B
-        minor_chroma = chroma_mean[[0, 2, 3, 5, 7, 8, 10]]  # C, D, Eb, F, G, Ab, Bb
+        # Summary fields keep their position but are filled in by summarize_tracks
+        result = {field: builders[field]() if field in builders else None for field in fields}
+        summary_fields = [field for field in fields if field in SUMMARY_FIELDS]
+        if not summary_fields:
+            return result
         
-        major_score = np.mean(major_chroma)
-        minor_score = np.mean(minor_chroma)
+        inputs: Dict[str, Any] = {"fields": summary_fields, "rms": engine.rms}
+        if "key" in summary_fields or "valence" in summary_fields:
+            inputs["chroma_mean"] = np.mean(engine.chroma, axis=1)
+        if "danceability" in summary_fields:
+            inputs["tempo"] = rhythm.tempo
+            inputs["spectral_centroid"] = engine.spectral_centroid
         
-        # Higher energy and major key = more positive
-        valence = (major_score - minor_score) * 0.5 + energy * 0.5
-        return max(0, min(1, valence))
+        if summarize:
+            result.update(summarize_tracks([inputs])[0])
+        else:
+            result["summary_inputs"] = inputs
+        return result
     
-    def start_live_analysis(self, callback_func):
-        """Start live audio analysis from microphone"""
-        try:
-            logger.info("Starting live audio analysis")
-            
-            def audio_callback(indata, frames, time, status):
-                if status:
-                    logger.warning(f"Audio callback status: {status}")
-                
-                # Convert to mono if stereo
-                if indata.ndim > 1:
-                    audio_data = np.mean(indata, axis=1)
-                else:
-                    audio_data = indata.flatten()
-                
-                # Process audio in real-time
-                asyncio.create_task(self._process_realtime_audio(audio_data, callback_func))
-            
-            # Start audio stream
-            self.stream = sd.InputStream(
-                callback=audio_callback,
-                channels=1,
-                samplerate=self.sample_rate,
-                blocksize=self.chunk_size,
-                dtype=np.float32
-            )
-            
-            self.stream.start()
-            self.is_recording = True
-            logger.info("Live audio analysis started")
-            
-        except Exception as e:
-            logger.error(f"Error starting live analysis: {str(e)}")
-            raise e
-    
-    def stop_live_analysis(self):
-        """Stop live audio analysis"""
-        try:
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-                self.stream = None
-            
-            self.is_recording = False
-            logger.info("Live audio analysis stopped")
-            
-        except Exception as e:
-            logger.error(f"Error stopping live analysis: {str(e)}")
-    
-    async def _process_realtime_audio(self, audio_data: np.ndarray, callback_func):
-        """Process real-time audio data"""
-        try:
-            # Compute FFT for frequency analysis
-            fft_data = fft(audio_data)
-            freqs = fftfreq(len(audio_data), 1/self.sample_rate)
-            
-            # Get magnitude spectrum
-            magnitude = np.abs(fft_data[:len(fft_data)//2])
-            freqs = freqs[:len(freqs)//2]
-            
-            # Apply smoothing filter
-            smoothed_magnitude = signal.savgol_filter(magnitude, window_length=11, polyorder=3)
-            
-            # Calculate frequency bands
-            bass_level = self._calculate_band_level(smoothed_magnitude, freqs, 20, 250)
-            mid_level = self._calculate_band_level(smoothed_magnitude, freqs, 250, 4000)
-            treble_level = self._calculate_band_level(smoothed_magnitude, freqs, 4000, 20000)
-            
-            # Overall volume
-            overall_volume = np.sqrt(np.mean(audio_data**2))
-            
-            # Beat detection (simplified)
-            beat_detected = self._detect_beat(audio_data)
-            
-            # Energy level
-            energy_level = np.mean(np.abs(audio_data))
-            
-            # Create real-time data structure
-            realtime_data = {
-                "timestamp": time.time(),
-                "frequency_data": magnitude.tolist(),
-                "time_domain_data": audio_data.tolist(),
-                "bass_level": float(bass_level),
-                "mid_level": float(mid_level),
-                "treble_level": float(treble_level),
-                "overall_volume": float(overall_volume),
-                "beat_detected": beat_detected,
-                "energy_level": float(energy_level)
-            }
-            
-            # Call callback function
-            await callback_func(realtime_data)
-            
-        except Exception as e:
-            logger.error(f"Error processing real-time audio: {str(e)}")
-    
-    def _calculate_band_level(self, magnitude: np.ndarray, freqs: np.ndarray, 
-                             low_freq: float, high_freq: float) -> float:
-        """Calculate energy level in a specific frequency band"""
-        mask = (freqs >= low_freq) & (freqs <= high_freq)
-        band_energy = np.sum(magnitude[mask])
-        return band_energy
-    
-    def _detect_beat(self, audio_data: np.ndarray) -> bool:
-        """Simple beat detection based on energy peaks"""
-        # Calculate energy
-        energy = np.sum(audio_data**2)
-        
-        # Simple threshold-based beat detection
-        threshold = 0.1  # Adjust based on testing
-        return energy > threshold
+    def summarize(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill in the summary fields of results extracted with summarize=False, stacked across tracks"""
+        pending = [result for result in results if "summary_inputs" in result]
+        summaries = summarize_tracks([result.pop("summary_inputs") for result in pending])
+        for result, summary in zip(pending, summaries):
+            result.update(summary)
+        return results
     
     def get_available_devices(self) -> List[Dict[str, Any]]:
         """Get list of available audio devices"""
+        if sd is None:
+            return []
         try:
             devices = sd.query_devices()
             device_list = []
@@ -277,6 +419,8 @@ class AudioAnalyzer:
     
     def set_audio_device(self, device_index: int):
         """Set the audio input device"""
+        if sd is None:
+            raise RuntimeError("Audio device input is unavailable: PortAudio library not found")
         try:
             sd.default.device[0] = device_index
             logger.info(f"Audio input device set to index: {device_index}")
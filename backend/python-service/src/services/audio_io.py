@@ -0,0 +1,128 @@
+import hashlib
+import math
+import os
+import tempfile
+from typing import AsyncIterator, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import numpy as np
+import soundfile as sf
+import soxr
+
+
+class UploadTooLargeError(Exception):
+    """An upload exceeded the size limit while it was being received"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def is_remote(file_path: str) -> bool:
+    return file_path.startswith(("http://", "https://"))
+
+
+def download_to_temp_sync(url: str) -> str:
+    """Download a remote audio file to a temp file and return its path"""
+    suffix = os.path.splitext(urlparse(url).path)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        try:
+            with httpx.stream("GET", url, follow_redirects=True, timeout=60) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    temp_file.write(chunk)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+    return temp_file.name
+
+
+async def download_to_temp(url: str) -> str:
+    """Async variant of download_to_temp_sync for use on the event loop"""
+    suffix = os.path.splitext(urlparse(url).path)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        try:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=60) as client:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        temp_file.write(chunk)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+    return temp_file.name
+
+
+async def spool_to_temp(chunks: AsyncIterator[bytes], suffix: str = "",
+                        max_bytes: Optional[int] = None) -> Tuple[str, str]:
+    """Write streamed chunks to a new temp file, hashing them on the way.
+
+    Returns (path, hex digest of the bytes). Only one chunk is held in memory;
+    the file is removed and UploadTooLargeError raised as soon as more than
+    max_bytes have arrived.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                temp_file.write(chunk)
+        except BaseException:
+            os.remove(temp_file.name)
+            raise
+    return temp_file.name, digest.hexdigest()
+
+
+def audio_duration(file_path: str) -> Optional[float]:
+    """Duration in seconds from the file header, or None if soundfile cannot read it"""
+    try:
+        return sf.info(file_path).duration
+    except Exception:
+        return None
+
+
+def audio_sample_rate(file_path: str) -> int:
+    """Native sample rate from the file header"""
+    return sf.info(file_path).samplerate
+
+
+def iter_audio_blocks(file_path: str, sr: int, block_size: int = 262144) -> Iterator[np.ndarray]:
+    """Decode a file as mono float32 blocks resampled to sr.
+
+    Mirrors librosa.load (channel mean, soxr_hq resampling, output length fixed
+    to ceil(n * sr / native_sr)) so the concatenated blocks equal the one-shot
+    decode, while only one block is held in memory at a time.
+    """
+    with sf.SoundFile(file_path) as sound_file:
+        native_sr = sound_file.samplerate
+        if native_sr == sr:
+            n_out = sound_file.frames
+            resampler = None
+        else:
+            n_out = int(math.ceil(sound_file.frames * float(sr) / native_sr))
+            resampler = soxr.ResampleStream(native_sr, sr, 1, dtype="float32", quality="HQ")
+
+        emitted = 0
+        for block in sound_file.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono, last=False)
+            mono = mono[:max(n_out - emitted, 0)]
+            if len(mono):
+                emitted += len(mono)
+                yield mono
+
+        if resampler is not None:
+            tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            tail = tail[:max(n_out - emitted, 0)]
+            if len(tail):
+                emitted += len(tail)
+                yield tail
+
+        if emitted < n_out:
+            yield np.zeros(n_out - emitted, dtype=np.float32)
@@ -0,0 +1,69 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Spacing of reduced spectrum bands: equal width in Hz, in octaves or in mels
+BAND_SCALES = ("linear", "log", "mel")
+
+
+def _hz_to_mel(freqs):
+    return 2595 * np.log10(1 + np.asarray(freqs, dtype=np.float64) / 700)
+
+
+def _mel_to_hz(mels):
+    return 700 * (10 ** (np.asarray(mels, dtype=np.float64) / 2595) - 1)
+
+
+def band_edges(n_bands: int, scale: str = "log", min_freq: float = 20.0,
+               max_freq: float = 20000.0) -> np.ndarray:
+    """n_bands + 1 band edges in Hz between min_freq and max_freq"""
+    if scale not in BAND_SCALES:
+        raise ValueError(f"band scale must be one of {BAND_SCALES}")
+    if n_bands < 1 or not 0 < min_freq < max_freq:
+        raise ValueError("need at least one band and 0 < min_freq < max_freq")
+
+    if scale == "linear":
+        return np.linspace(min_freq, max_freq, n_bands + 1)
+    if scale == "log":
+        return np.geomspace(min_freq, max_freq, n_bands + 1)
+    return _mel_to_hz(np.linspace(_hz_to_mel(min_freq), _hz_to_mel(max_freq), n_bands + 1))
+
+
+def band_matrix(freqs: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """(bands x bins) float32 matrix whose product with a magnitude spectrum is each band's mean.
+
+    Each bin covers the frequencies within half a bin of its center, and its
+    weight in a band is the fraction of the band it covers. Bands narrower
+    than a bin (the low end of log and mel scales) interpolate their bin
+    instead of coming out empty.
+    """
+    spacing = freqs[1] - freqs[0] if len(freqs) > 1 else 1.0
+    low, high = freqs - spacing / 2, freqs + spacing / 2
+    overlap = np.minimum(high, edges[1:, np.newaxis]) - np.maximum(low, edges[:-1, np.newaxis])
+    return (np.maximum(overlap, 0) / np.diff(edges)[:, np.newaxis]).astype(np.float32)
+
+
+class SpectrumBandReducer:
+    """Projects magnitude spectra onto n_bands log-, mel- or linearly spaced bands.
+
+    The projection matrix is built once per (freqs, n_bands, scale), so
+    reducing a frame is one matrix-vector product into a preallocated buffer.
+    max_freq defaults to LIVE_BAND_MAX_FREQ, capped at the highest bin.
+    """
+
+    def __init__(self, freqs: np.ndarray, n_bands: int, scale: str = "log",
+                 min_freq: Optional[float] = None, max_freq: Optional[float] = None):
+        self.n_bands = n_bands
+        self.scale = scale
+        self.min_freq = min_freq if min_freq is not None else \
+            float(os.getenv('LIVE_BAND_MIN_FREQ', 20))
+        max_freq = max_freq if max_freq is not None else float(os.getenv('LIVE_BAND_MAX_FREQ', 16000))
+        self.max_freq = min(max_freq, float(freqs[-1]))
+        self.edges = band_edges(n_bands, scale, self.min_freq, self.max_freq)
+        self.matrix = band_matrix(freqs, self.edges)
+        self.bands = np.zeros(n_bands, dtype=np.float32)
+
+    def reduce(self, magnitude: np.ndarray) -> np.ndarray:
+        """Band levels of one spectrum; the returned buffer is reused by the next call"""
+        return np.dot(self.matrix, magnitude, out=self.bands)
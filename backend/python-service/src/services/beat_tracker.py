@@ -0,0 +1,163 @@
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class StreamingBeatTracker:
+    """Incremental onset strength, tempo and beat phase for live frames.
+
+    Each update takes one frame's magnitude spectrum and does a fixed amount
+    of work: the log-spectral flux against the previous frame is written into
+    a circular history of history_seconds, and a leaky autocorrelation over
+    the lags of min_bpm..max_bpm is updated from it. The tempo is the lag with
+    the strongest autocorrelation under a log-normal prior around 120 BPM;
+    its normalized height is the confidence, and half that period wins when
+    it correlates nearly as well. A phase-locked beat clock
+    advances one period per beat and is nudged towards onsets that land near
+    a predicted beat, re-anchoring after repeated off-beat onsets. All state
+    lives in preallocated arrays. Not thread-safe; use one tracker per stream.
+    """
+
+    def __init__(self, frame_rate: float, n_bins: int, history_seconds: Optional[float] = None,
+                 min_bpm: float = 60.0, max_bpm: float = 200.0, onset_threshold: float = 1.5,
+                 min_confidence: float = 0.2, phase_gain: float = 0.2, phase_tolerance: float = 0.2,
+                 max_misses: int = 4, half_period_ratio: float = 0.5):
+        self.frame_rate = frame_rate
+        self.history_seconds = history_seconds if history_seconds is not None else \
+            float(os.getenv('LIVE_BEAT_HISTORY_SECONDS', 8))
+        self.onset_threshold = onset_threshold
+        self.min_confidence = min_confidence
+        self.phase_gain = phase_gain
+        self.phase_tolerance = phase_tolerance
+        self.max_misses = max_misses
+        self.half_period_ratio = half_period_ratio
+
+        min_lag = max(int(np.floor(60 * frame_rate / max_bpm)), 1)
+        max_lag = max(int(np.ceil(60 * frame_rate / min_bpm)), min_lag + 2)
+        self.lags = np.arange(min_lag, max_lag + 1)
+        self.history = np.zeros(max(int(round(self.history_seconds * frame_rate)), max_lag + 1))
+        # Same tempo prior as librosa.feature.tempo (start_bpm=120, std_bpm=1)
+        self.prior = np.exp(-0.5 * np.log2(60 * frame_rate / self.lags / 120) ** 2)
+
+        # Autocorrelation and onset statistics decay over the history length
+        self.decay = 0.5 ** (2 / len(self.history))
+        self.stat_decay = 0.5 ** (1 / frame_rate)
+
+        self._log_magnitude = np.zeros(n_bins, dtype=np.float32)
+        self._previous = np.zeros(n_bins, dtype=np.float32)
+        self._lag_index = np.zeros(len(self.lags), dtype=np.int64)
+        self._lagged = np.zeros(len(self.lags))
+        self._score = np.zeros(len(self.lags))
+        self._weighted = np.zeros(len(self.lags))
+        self.autocorrelation = np.zeros(len(self.lags))
+        self.reset()
+
+    def reset(self):
+        self.history[:] = 0
+        self.autocorrelation[:] = 0
+        self._previous[:] = 0
+        self._frames = 0
+        self._energy = 0.0
+        self._flux_mean = 0.0
+        self._flux_var = 0.0
+        self._above = False
+        self._misses = 0
+        self.bpm = 0.0
+        self.phase = 0.0
+        self.confidence = 0.0
+
+    def update(self, magnitude: np.ndarray) -> Dict[str, Any]:
+        """Feed one frame's magnitude spectrum; returns its beat fields"""
+        # Half-wave rectified log-spectral flux
+        np.log1p(magnitude, out=self._log_magnitude)
+        np.subtract(self._log_magnitude, self._previous, out=self._previous)
+        flux = float(np.maximum(self._previous, 0, out=self._previous).sum())
+        self._log_magnitude, self._previous = self._previous, self._log_magnitude
+        if self._frames == 0:
+            # No previous frame: the first difference is the whole spectrum
+            flux = 0.0
+
+        # Mean-removed onset strength and its running spread
+        self._flux_mean = self.stat_decay * self._flux_mean + (1 - self.stat_decay) * flux
+        onset_strength = max(flux - self._flux_mean, 0.0)
+        self._flux_var = self.stat_decay * self._flux_var + (1 - self.stat_decay) * onset_strength ** 2
+        above = bool(onset_strength > self.onset_threshold * np.sqrt(self._flux_var))
+        onset = above and not self._above
+        self._above = above
+
+        # Leaky autocorrelation at every candidate lag
+        position = self._frames % len(self.history)
+        self.history[position] = onset_strength
+        np.subtract(position, self.lags, out=self._lag_index)
+        np.mod(self._lag_index, len(self.history), out=self._lag_index)
+        np.take(self.history, self._lag_index, out=self._lagged)
+        self.autocorrelation *= self.decay
+        self.autocorrelation += np.multiply(self._lagged, onset_strength, out=self._lagged)
+        self._energy = self.decay * self._energy + onset_strength ** 2
+        self._frames += 1
+
+        self._update_tempo()
+        return {
+            "beat_detected": self._advance_phase(onset),
+            "bpm": self.bpm,
+            "beat_phase": self.phase,
+            "beat_confidence": self.confidence
+        }
+
+    def _update_tempo(self):
+        # Periods rarely fall on a whole number of frames, so each lag's score
+        # also counts its neighbours, which share the correlation
+        self._score[:] = self.autocorrelation
+        self._score[1:] += self.autocorrelation[:-1]
+        self._score[:-1] += self.autocorrelation[1:]
+        weighted = np.multiply(self._score, self.prior, out=self._weighted)
+        best = int(np.argmax(weighted))
+        if self._energy <= 0 or weighted[best] <= 0:
+            self.bpm = 0.0
+            self.confidence = 0.0
+            return
+
+        # A period of two beats correlates at least as well as one beat does
+        # when onsets straddle frame boundaries; prefer the shorter period
+        # while it keeps half_period_ratio of the longer one's correlation
+        half = int(round(self.lags[best] / 2)) - int(self.lags[0])
+        if half > 0:
+            half += int(np.argmax(self._score[half - 1:half + 2])) - 1
+            if 0 < half < best and self._score[half] >= self.half_period_ratio * self._score[best]:
+                best = half
+
+        # Parabolic interpolation between neighbouring lags
+        lag = float(self.lags[best])
+        if 0 < best < len(self.lags) - 1:
+            before, peak, after = weighted[best - 1:best + 2]
+            curvature = before - 2 * peak + after
+            if curvature < 0:
+                lag += 0.5 * (before - after) / curvature
+        self.bpm = float(60 * self.frame_rate / lag)
+        self.confidence = min(float(self._score[best] / self._energy), 1.0)
+
+    def _advance_phase(self, onset: bool) -> bool:
+        """Move the beat clock one frame; returns whether a beat falls on this frame"""
+        if self.bpm <= 0 or self.confidence < self.min_confidence:
+            # No reliable tempo yet: beats are the onsets themselves
+            return onset
+
+        self.phase += self.bpm / (60 * self.frame_rate)
+        if onset:
+            # Signed distance to the nearest predicted beat, in beats
+            error = self.phase if self.phase < 0.5 else self.phase - 1
+            if abs(error) < self.phase_tolerance:
+                self._misses = 0
+                self.phase = max(self.phase - self.phase_gain * error, 0.0)
+            else:
+                self._misses += 1
+                if self._misses >= self.max_misses:
+                    # Lost lock: take this onset as a beat
+                    self._misses = 0
+                    self.phase = 0.0
+                    return True
+        if self.phase >= 1:
+            self.phase -= 1
+            return True
+        return False
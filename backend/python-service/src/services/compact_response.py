@@ -0,0 +1,95 @@
+import base64
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.services.analysis_codec import FIELD_ALIASES, FLOAT16_FIELDS, as_numeric_array
+from src.services.feature_store import FRAME_SERIES_FIELDS
+
+# Time resolution of per-frame fields: native hop frames, fixed-length
+# segments, or beat-synchronous segments
+RESPONSE_AGGREGATES = ("frame", "segment", "beat")
+
+# How numeric arrays are written: nested JSON lists, base64 blobs inside JSON,
+# or one binary analysis payload (analysis_codec)
+ARRAY_ENCODINGS = ("json", "base64", "binary")
+
+DEFAULT_SEGMENT_SECONDS = 0.5
+
+
+def _segment_bounds(result: Dict[str, Any], n_frames: int, aggregate: str,
+                    resolution: Optional[float]) -> np.ndarray:
+    """First frame of each aggregated segment, relative to the first frame in result"""
+    frame_rate = result["frame_rate"]
+    if aggregate == "segment":
+        step = max(int(round((resolution or DEFAULT_SEGMENT_SECONDS) * frame_rate)), 1)
+        return np.arange(0, n_frames, step)
+
+    # Beat-synchronous: segments start at frame 0 and at every beat
+    start_frame = result.get("start_frame", 0)
+    beat_times = np.asarray(result.get("beat_times") if result.get("beat_times") is not None else [],
+                            dtype=np.float64)
+    beats = np.round(beat_times * frame_rate).astype(np.int64) - start_frame
+    return np.unique(np.concatenate(([0], beats[(beats > 0) & (beats < n_frames)])))
+
+
+def _aggregate_frames(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Mean of each segment of frames along the last axis"""
+    lengths = np.diff(np.append(bounds, values.shape[-1]))
+    return np.add.reduceat(values.astype(np.float64), bounds, axis=-1) / lengths
+
+
+def _encode_array(name: str, array: np.ndarray) -> Dict[str, Any]:
+    dtype = np.float16 if name in FLOAT16_FIELDS else np.float32
+    return {
+        "dtype": np.dtype(dtype).str,
+        "shape": list(array.shape),
+        "data": base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode()
+    }
+
+
+def compact_analysis(result: Dict[str, Any], aggregate: str = "frame",
+                     resolution: Optional[float] = None,
+                     encoding: str = "json") -> Dict[str, Any]:
+    """Smaller form of an analysis result.
+
+    Fields that duplicate another one (segment_timbre, segment_pitches) are
+    dropped and listed in ``aliases``. With ``aggregate`` "segment" or "beat",
+    per-frame fields are averaged over ``resolution``-second segments or
+    between beats, and ``segment_times`` gives the start of each segment.
+    With ``encoding`` "base64", numeric arrays become {dtype, shape, data}
+    objects; "binary" leaves them as arrays for encode_analysis.
+    """
+    if aggregate not in RESPONSE_AGGREGATES:
+        raise ValueError(f"aggregate must be one of {RESPONSE_AGGREGATES}")
+    if encoding not in ARRAY_ENCODINGS:
+        raise ValueError(f"encoding must be one of {ARRAY_ENCODINGS}")
+
+    compact: Dict[str, Any] = {}
+    aliases = {name: target for name, target in FIELD_ALIASES.items()
+               if name in result and target in result}
+    for name, value in result.items():
+        if name not in aliases:
+            compact[name] = value
+
+    frame_fields = [name for name in FRAME_SERIES_FIELDS if compact.get(name) is not None]
+    n_frames = np.shape(compact[frame_fields[0]])[-1] if frame_fields else 0
+    if aggregate != "frame" and n_frames and result.get("frame_rate"):
+        bounds = _segment_bounds(result, n_frames, aggregate, resolution)
+        for name in frame_fields:
+            compact[name] = _aggregate_frames(np.asarray(compact[name]), bounds)
+        compact["segment_times"] = (bounds + result.get("start_frame", 0)) / result["frame_rate"]
+    compact["aggregate"] = aggregate
+    compact["aliases"] = aliases
+
+    for name, value in compact.items():
+        array = as_numeric_array(value)
+        if array is None:
+            continue
+        if encoding == "base64":
+            compact[name] = _encode_array(name, array)
+        elif encoding == "json":
+            compact[name] = array.tolist() if isinstance(value, np.ndarray) else value
+        else:
+            compact[name] = array
+    return compact
@@ -0,0 +1,456 @@
+import math
+
+import numpy as np
+import librosa
+import scipy.fft
+import soxr
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# AudioAnalyzer output field -> FeatureEngine features it is derived from
+FIELD_FEATURES: Dict[str, Tuple[str, ...]] = {
+    "bpm": ("tempo",),
+    "key": ("chroma",),
+    "energy": ("rms",),
+    "valence": ("chroma", "rms"),
+    "danceability": ("tempo", "rms", "spectral_centroid"),
+    "tempo": ("tempo",),
+    "loudness": ("rms",),
+    "spectral_centroid": ("spectral_centroid",),
+    "mfcc": ("mfcc",),
+    "chroma": ("chroma",),
+    "onset_times": ("onset_times",),
+    "beat_times": ("beat_times",),
+    "segment_timbre": ("mfcc",),
+    "segment_pitches": ("chroma",),
+    "duration": (),
+    "sample_rate": (),
+    "frame_rate": (),
+}
+
+# Features computed on the decimated rhythm signal when one is configured
+RHYTHM_FEATURES = ("onset_envelope", "beat_envelope", "tempo", "beat_frames", "onset_frames",
+                   "beat_times", "onset_times")
+
+
+def rhythm_frame_params(sr: int, rhythm_sr: int, n_fft: int, hop_length: int) -> Tuple[int, int]:
+    """(n_fft, hop_length) at rhythm_sr covering the same time spans as at sr"""
+    ratio = rhythm_sr / sr
+    return int(2 ** round(np.log2(n_fft * ratio))), max(1, int(round(hop_length * ratio)))
+
+
+# Output fields produced by each AudioAnalysisRequest.analysis_type
+ANALYSIS_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "full": tuple(FIELD_FEATURES),
+    # Everything that does not need MFCC or chroma
+    "basic": ("bpm", "energy", "danceability", "tempo", "loudness", "spectral_centroid",
+              "onset_times", "beat_times", "duration", "sample_rate", "frame_rate"),
+    # Onset envelope and tempo estimation only
+    "tempo_only": ("bpm", "tempo", "duration", "sample_rate"),
+}
+
+
+class FeatureEngine:
+    """Per-track feature extraction built on shared spectral intermediates.
+
+    The STFT magnitude, the mel spectrogram and the onset strength envelopes are
+    each computed at most once and every spectral/rhythm feature is derived
+    from them, instead of letting each librosa call re-transform ``y``.
+
+    With the same ``n_fft``/``hop_length`` the derived features are
+    numerically identical to the individual ``librosa.feature.*(y=...)`` calls
+    up to float32 rounding (max relative error below 1e-5); beat and onset
+    frames are identical.
+
+    When ``rhythm_sr`` is below ``sr``, rhythm features (onset envelopes,
+    tempo, beats, onsets) are computed by ``self.rhythm``, a FeatureEngine over
+    the signal decimated with a fast soxr resampler and with n_fft/hop scaled
+    to keep the same frame durations. Beat and onset times are reported in
+    seconds, so both rates share one timeline.
+    """
+
+    # Feature -> intermediates/features it is derived from
+    DEPENDENCIES: Dict[str, tuple] = {
+        "magnitude": (),
+        "power": ("magnitude",),
+        "mel": ("power",),
+        "log_mel": ("mel",),
+        "onset_envelope": ("log_mel",),
+        "beat_envelope": ("log_mel",),
+        "spectral_centroid": ("magnitude",),
+        "spectral_rolloff": ("magnitude",),
+        "spectral_bandwidth": ("magnitude",),
+        "zero_crossing_rate": (),
+        "mfcc": ("log_mel",),
+        "chroma": ("power",),
+        "rms": (),
+        "tempo": ("beat_envelope",),
+        "beat_frames": ("beat_envelope", "tempo"),
+        "onset_frames": ("onset_envelope",),
+        "beat_times": ("beat_frames",),
+        "onset_times": ("onset_frames",),
+    }
+
+    def __init__(self, y: np.ndarray, sr: int, n_fft: int = 2048,
+                 hop_length: int = 512, n_mfcc: int = 13, n_mels: int = 128,
+                 rhythm_sr: Optional[int] = None):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = n_mfcc
+        self.n_mels = n_mels
+        self.rhythm_sr = rhythm_sr if rhythm_sr and rhythm_sr < sr else None
+
+    @property
+    def frame_rate(self) -> float:
+        """Frames per second of the per-frame spectral features"""
+        return self.sr / self.hop_length
+
+    @cached_property
+    def rhythm(self) -> "FeatureEngine":
+        """Engine that computes rhythm features (self unless decimating)"""
+        if self.rhythm_sr is None:
+            return self
+        y = librosa.resample(self.y, orig_sr=self.sr, target_sr=self.rhythm_sr,
+                             res_type="soxr_lq")
+        n_fft, hop_length = rhythm_frame_params(self.sr, self.rhythm_sr, self.n_fft,
+                                                self.hop_length)
+        return FeatureEngine(y, self.rhythm_sr, n_fft=n_fft, hop_length=hop_length,
+                             n_mels=self.n_mels)
+
+    @classmethod
+    def plan(cls, features: Iterable[str], available: Iterable[str] = ()) -> List[str]:
+        """Return the requested features plus their dependencies in evaluation order.
+
+        Features in ``available`` are treated as already computed, so their own
+        dependencies are not planned.
+        """
+        order: List[str] = []
+        available = set(available)
+
+        def visit(name: str):
+            if name in order or name in available:
+                return
+            if name not in cls.DEPENDENCIES:
+                raise ValueError(f"Unknown feature: {name}")
+            for dependency in cls.DEPENDENCIES[name]:
+                visit(dependency)
+            order.append(name)
+
+        for feature in features:
+            visit(feature)
+        return order
+
+    def compute(self, features: Iterable[str]) -> Dict[str, Any]:
+        """Compute only the requested features and the subgraph they depend on"""
+        features = list(features)
+        results: Dict[str, Any] = {}
+        if self.rhythm_sr is not None:
+            rhythm = [name for name in features if name in RHYTHM_FEATURES]
+            if rhythm:
+                results.update(self.rhythm.compute(rhythm))
+            features = [name for name in features if name not in RHYTHM_FEATURES]
+
+        for name in self.plan(features, available=self.__dict__):
+            getattr(self, name)
+        results.update({name: getattr(self, name) for name in features})
+        return results
+
+    # Shared intermediates
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        """STFT magnitude spectrogram"""
+        return np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        """STFT power spectrogram"""
+        return self.magnitude ** 2
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        """Mel power spectrogram"""
+        return librosa.feature.melspectrogram(S=self.power, sr=self.sr, n_mels=self.n_mels)
+
+    @cached_property
+    def log_mel(self) -> np.ndarray:
+        """Log-power (dB) mel spectrogram"""
+        return librosa.power_to_db(self.mel)
+
+    @cached_property
+    def onset_envelope(self) -> np.ndarray:
+        """Onset strength envelope"""
+        return librosa.onset.onset_strength(S=self.log_mel, sr=self.sr,
+                                            hop_length=self.hop_length)
+
+    @cached_property
+    def beat_envelope(self) -> np.ndarray:
+        """Median-aggregated onset envelope, as used internally by beat_track"""
+        return librosa.onset.onset_strength(S=self.log_mel, sr=self.sr,
+                                            hop_length=self.hop_length,
+                                            aggregate=np.median)
+
+    # Spectral features
+
+    @cached_property
+    def spectral_centroid(self) -> np.ndarray:
+        return librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sr,
+                                                 n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_rolloff(self) -> np.ndarray:
+        return librosa.feature.spectral_rolloff(S=self.magnitude, sr=self.sr,
+                                                n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_bandwidth(self) -> np.ndarray:
+        return librosa.feature.spectral_bandwidth(S=self.magnitude, sr=self.sr,
+                                                  n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def zero_crossing_rate(self) -> np.ndarray:
+        # Time-domain feature: framing only, no transform to share
+        return librosa.feature.zero_crossing_rate(self.y, frame_length=self.n_fft,
+                                                  hop_length=self.hop_length)[0]
+
+    @cached_property
+    def mfcc(self) -> np.ndarray:
+        return librosa.feature.mfcc(S=self.log_mel, sr=self.sr, n_mfcc=self.n_mfcc)
+
+    @cached_property
+    def chroma(self) -> np.ndarray:
+        return librosa.feature.chroma_stft(S=self.power, sr=self.sr, n_fft=self.n_fft,
+                                           hop_length=self.hop_length)
+
+    @cached_property
+    def rms(self) -> np.ndarray:
+        """Frame RMS, equivalent to librosa.feature.rms(y=...)
+
+        Uses a running sum of squares over the centre-padded signal instead of
+        materialising every frame, keeping librosa's rectangular framing.
+        """
+        pad = self.n_fft // 2
+        padded = np.pad(self.y.astype(np.float64) ** 2, (pad, pad), mode="constant")
+        n_frames = 1 + (len(padded) - self.n_fft) // self.hop_length
+        cumulative = np.concatenate(([0.0], np.cumsum(padded)))
+        starts = np.arange(n_frames) * self.hop_length
+        power = (cumulative[starts + self.n_fft] - cumulative[starts]) / self.n_fft
+        return np.sqrt(np.maximum(power, 0.0)).astype(self.y.dtype)
+
+    # Rhythm features
+
+    @cached_property
+    def tempo(self) -> float:
+        """Global tempo estimate (BPM) from the beat envelope"""
+        if not self.beat_envelope.any():
+            return 0.0
+        # Same 8 s autocorrelation window as librosa.feature.tempo
+        win_length = librosa.time_to_frames(8.0, sr=self.sr, hop_length=self.hop_length).item()
+        tempogram = self._mean_tempogram(self.beat_envelope, win_length)
+        return float(librosa.feature.tempo(tg=tempogram, sr=self.sr,
+                                           hop_length=self.hop_length)[0])
+
+    @staticmethod
+    def _mean_tempogram(envelope: np.ndarray, win_length: int,
+                        chunk_frames: int = 4096) -> np.ndarray:
+        """Time-averaged librosa tempogram, accumulated over column chunks.
+
+        librosa.feature.tempo materialises the full (win_length x frames)
+        autocorrelation before averaging, which dominates peak memory on long
+        tracks; summing normalised chunks gives the same mean in bounded memory.
+        """
+        n = len(envelope)
+        window = librosa.filters.get_window("hann", win_length, fftbins=True)
+        padded = np.pad(envelope, win_length // 2, mode="linear_ramp", end_values=0)
+        # (frames, lag) layout keeps each FFT over contiguous memory
+        frames = librosa.util.frame(padded, frame_length=win_length, hop_length=1, axis=0)[:n]
+
+        # Same result as librosa.autocorrelate, but padded to a fast FFT size
+        # (its 2 * win_length - 1 can be prime, e.g. 1499 at 93.75 frames/s)
+        n_pad = scipy.fft.next_fast_len(2 * win_length - 1, real=True)
+        total = np.zeros(win_length)
+        for start in range(0, n, chunk_frames):
+            block = frames[start:start + chunk_frames] * window
+            spectrum = scipy.fft.rfft(block, n=n_pad, axis=1)
+            autocorrelation = scipy.fft.irfft(np.abs(spectrum) ** 2, n=n_pad, axis=1)[:, :win_length]
+            total += librosa.util.normalize(autocorrelation, norm=np.inf, axis=1).sum(axis=0)
+        return (total / n)[:, np.newaxis]
+
+    @cached_property
+    def beat_frames(self) -> np.ndarray:
+        """Beat frames tracked at the estimated tempo"""
+        if not self.beat_envelope.any():
+            return np.array([], dtype=int)
+        _, beats = librosa.beat.beat_track(onset_envelope=self.beat_envelope, sr=self.sr,
+                                           hop_length=self.hop_length, bpm=self.tempo)
+        return beats
+
+    @cached_property
+    def onset_frames(self) -> np.ndarray:
+        return librosa.onset.onset_detect(onset_envelope=self.onset_envelope, sr=self.sr,
+                                          hop_length=self.hop_length)
+
+    @cached_property
+    def beat_times(self) -> np.ndarray:
+        return self.frames_to_time(self.beat_frames)
+
+    @cached_property
+    def onset_times(self) -> np.ndarray:
+        return self.frames_to_time(self.onset_frames)
+
+    def frames_to_time(self, frames: np.ndarray) -> np.ndarray:
+        return librosa.frames_to_time(frames, sr=self.sr, hop_length=self.hop_length)
+
+
+class StreamingFeatureEngine(FeatureEngine):
+    """FeatureEngine fed block by block, for files too long to decode at once.
+
+    Frame-local features (spectral centroid/rolloff/bandwidth, chroma, RMS and
+    the unclipped log-mel spectrogram) are computed per block of STFT frames
+    with the same centre padding as the one-shot path, then stitched in
+    ``finish()``. Track-level features (MFCC, onset envelopes, tempo, beats,
+    onsets) are then derived by FeatureEngine from the stitched log-mel, so
+    they match the one-shot results. Only one block of audio and its STFT is
+    held at a time; the STFT, power and mel spectrograms are never retained.
+
+    Chroma tuning is estimated from the first block (about 24 s at 44.1 kHz)
+    rather than the whole track; chroma is identical whenever both estimates
+    agree, which is the common case for a consistently tuned recording.
+
+    With ``rhythm_sr`` set, fed samples are also decimated through a streaming
+    soxr resampler into a second StreamingFeatureEngine for rhythm features.
+    """
+
+    # Features computed frame by frame while streaming
+    FRAME_FEATURES = ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth",
+                      "chroma", "rms", "log_mel")
+
+    def __init__(self, sr: int, features: Iterable[str], n_fft: int = 2048,
+                 hop_length: int = 512, n_mfcc: int = 13, n_mels: int = 128,
+                 block_frames: int = 2048, rhythm_sr: Optional[int] = None):
+        super().__init__(None, sr, n_fft=n_fft, hop_length=hop_length, n_mfcc=n_mfcc,
+                         n_mels=n_mels, rhythm_sr=rhythm_sr)
+        features = list(features)
+        self._rhythm_resampler = None
+        if self.rhythm_sr is not None:
+            rhythm_features = [name for name in features if name in RHYTHM_FEATURES]
+            rhythm_n_fft, rhythm_hop = rhythm_frame_params(sr, self.rhythm_sr, n_fft, hop_length)
+            self.__dict__["rhythm"] = StreamingFeatureEngine(
+                self.rhythm_sr, rhythm_features, n_fft=rhythm_n_fft, hop_length=rhythm_hop,
+                n_mels=n_mels, block_frames=block_frames
+            )
+            if rhythm_features:
+                self._rhythm_resampler = soxr.ResampleStream(sr, self.rhythm_sr, 1,
+                                                             dtype="float32", quality="LQ")
+            plan = self.plan([name for name in features if name not in RHYTHM_FEATURES])
+        else:
+            plan = self.plan(features)
+        unsupported = [name for name in ("zero_crossing_rate",) if name in plan]
+        if unsupported:
+            raise ValueError(f"Not available in streaming mode: {', '.join(unsupported)}")
+
+        self.features = features
+        self.block_frames = block_frames
+        self.n_samples = 0
+        self.tuning = None
+        self._streamed = [name for name in self.FRAME_FEATURES if name in plan]
+        self._blocks: Dict[str, List[np.ndarray]] = {name: [] for name in self._streamed}
+        # Leading centre padding, as librosa.stft(center=True, pad_mode="constant")
+        self._buffer = np.zeros(n_fft // 2, dtype=np.float32)
+
+    def feed(self, samples: np.ndarray):
+        """Append decoded samples, processing every full block of frames"""
+        self.n_samples += len(samples)
+        if self._rhythm_resampler is not None:
+            self.rhythm.feed(self._rhythm_resampler.resample_chunk(samples, last=False))
+        self._buffer = np.concatenate((self._buffer, samples.astype(np.float32, copy=False)))
+        n_ready = self._ready_frames()
+        while n_ready >= self.block_frames:
+            self._process(self.block_frames)
+            n_ready -= self.block_frames
+
+    def finish(self) -> "StreamingFeatureEngine":
+        """Flush the trailing frames and stitch the per-block features"""
+        if self._rhythm_resampler is not None:
+            # Match librosa.resample's output length of ceil(n * ratio)
+            rhythm = self.rhythm
+            n_rhythm = int(math.ceil(self.n_samples * float(self.rhythm_sr) / self.sr))
+            tail = self._rhythm_resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            tail = tail[:max(n_rhythm - rhythm.n_samples, 0)]
+            missing = n_rhythm - rhythm.n_samples - len(tail)
+            if missing > 0:
+                tail = np.concatenate((tail, np.zeros(missing, dtype=np.float32)))
+            rhythm.feed(tail)
+            rhythm.finish()
+            self._rhythm_resampler = None
+        pad = np.zeros(self.n_fft // 2, dtype=np.float32)
+        self._buffer = np.concatenate((self._buffer, pad))
+        n_ready = self._ready_frames()
+        if n_ready > 0:
+            self._process(n_ready)
+        self._buffer = np.zeros(0, dtype=np.float32)
+
+        for name, blocks in self._blocks.items():
+            stitched = np.concatenate(blocks, axis=-1) if blocks else np.zeros(0, dtype=np.float32)
+            if name == "log_mel":
+                # power_to_db's top_db clipping is relative to the track maximum
+                stitched = np.maximum(stitched, stitched.max() - 80.0)
+            self.__dict__[name] = stitched
+        self._blocks = {}
+
+        self.compute(self.features)
+        return self
+
+    def _ready_frames(self) -> int:
+        if len(self._buffer) < self.n_fft:
+            return 0
+        return 1 + (len(self._buffer) - self.n_fft) // self.hop_length
+
+    def _process(self, n_frames: int):
+        segment = self._buffer[:(n_frames - 1) * self.hop_length + self.n_fft]
+        magnitude = np.abs(librosa.stft(segment, n_fft=self.n_fft, hop_length=self.hop_length,
+                                        center=False))
+        power = magnitude ** 2
+        blocks = self._blocks
+
+        if "spectral_centroid" in blocks:
+            blocks["spectral_centroid"].append(librosa.feature.spectral_centroid(
+                S=magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0])
+        if "spectral_rolloff" in blocks:
+            blocks["spectral_rolloff"].append(librosa.feature.spectral_rolloff(
+                S=magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0])
+        if "spectral_bandwidth" in blocks:
+            blocks["spectral_bandwidth"].append(librosa.feature.spectral_bandwidth(
+                S=magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0])
+        if "chroma" in blocks:
+            if self.tuning is None:
+                self.tuning = librosa.estimate_tuning(S=power, sr=self.sr, n_fft=self.n_fft,
+                                                      bins_per_octave=12)
+            blocks["chroma"].append(librosa.feature.chroma_stft(
+                S=power, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length,
+                tuning=self.tuning))
+        if "rms" in blocks:
+            squares = segment.astype(np.float64) ** 2
+            cumulative = np.concatenate(([0.0], np.cumsum(squares)))
+            starts = np.arange(n_frames) * self.hop_length
+            frame_power = (cumulative[starts + self.n_fft] - cumulative[starts]) / self.n_fft
+            blocks["rms"].append(np.sqrt(np.maximum(frame_power, 0.0)).astype(np.float32))
+        if "log_mel" in blocks:
+            mel = librosa.feature.melspectrogram(S=power, sr=self.sr, n_mels=self.n_mels)
+            blocks["log_mel"].append(librosa.power_to_db(mel, top_db=None))
+
+        self._buffer = self._buffer[n_frames * self.hop_length:]
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        raise RuntimeError("The STFT is not retained in streaming mode")
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        raise RuntimeError("The STFT is not retained in streaming mode")
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        raise RuntimeError("The mel spectrogram is not retained in streaming mode")
@@ -0,0 +1,344 @@
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.services.analysis_codec import FIELD_ALIASES, FLOAT16_FIELDS, as_numeric_array
+from src.services.memory_cache import LRUCache
+from src.services.visual_timeline import TIMELINE_HEADER, parse_timeline_header
+
+# Per-frame fields (frames on the last axis), stored frame-major so that a
+# time window is one contiguous range of the file
+FRAME_SERIES_FIELDS = ("spectral_centroid", "mfcc", "chroma", "segment_timbre", "segment_pitches")
+
+# Event time fields in seconds, windowed by binary search
+EVENT_TIME_FIELDS = ("onset_times", "beat_times")
+
+INDEX_FILE = "index.json"
+
+
+def analysis_window(result: Dict[str, Any], fields: Optional[Iterable[str]] = None,
+                    start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+    """Project an analysis onto fields and the [start, end) seconds of its per-frame and event fields.
+
+    Values may be lists or (memory-mapped) arrays; only the selected part of
+    each array is converted to lists.
+    """
+    names = [name for name in (fields if fields is not None else result) if name in result]
+    windowed = start is not None or end is not None
+    frame_rate = result.get("frame_rate")
+    first, last = 0, None
+    if windowed and frame_rate:
+        first = max(int(math.floor((start or 0) * frame_rate)), 0)
+        last = None if end is None else max(int(math.ceil(end * frame_rate)), first)
+
+    projected = {}
+    for name in names:
+        value = result[name]
+        if windowed and frame_rate and name in FRAME_SERIES_FIELDS:
+            value = np.asarray(value)[..., first:last]
+        elif windowed and name in EVENT_TIME_FIELDS:
+            times = np.asarray(value)
+            value = times[np.searchsorted(times, start or 0):
+                          len(times) if end is None else np.searchsorted(times, end)]
+        projected[name] = value.astype(np.float64).tolist() if isinstance(value, np.ndarray) else value
+
+    if windowed and frame_rate:
+        projected["start_frame"] = first
+    return projected
+
+
+class FeatureStore:
+    """Persistent local store of analysis results and visualization timelines.
+
+    Entries are keyed like their Redis counterparts. ``analysis:{key}`` is a
+    directory with one ``.npy`` file per numeric array field (dtypes as in
+    analysis_codec, per-frame fields frame-major) and the remaining fields in
+    ``fields.json``; ``timeline:{content_hash}`` is the encoded timeline file.
+    Reads memory-map the files, so windows and field subsets never load whole
+    matrices. ``index.json`` records each entry's size and last access; least
+    recently used entries are evicted once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None, max_open: Optional[int] = None,
+                 warm_entries: Optional[int] = None):
+        self.root = root
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(os.getenv('FEATURE_STORE_MAX_BYTES', 2 * 1024 ** 3))
+        self.warm_entries = warm_entries if warm_entries is not None else \
+            int(os.getenv('FEATURE_STORE_WARM_ENTRIES', 32))
+        # Open memory maps by entry key; mappings are not heap memory, so only
+        # the number of open entries is bounded
+        self._maps = LRUCache(
+            max_entries=max_open if max_open is not None else
+            int(os.getenv('FEATURE_STORE_OPEN_ENTRIES', 256)),
+            max_bytes=2 ** 62
+        )
+        # key -> {"path", "bytes", "accessed"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Index
+
+    def load(self):
+        """Load the index, reconcile it with the files on disk and open the most recent entries"""
+        try:
+            for kind in ("analysis", "timeline"):
+                os.makedirs(os.path.join(self.root, kind), exist_ok=True)
+
+            index_path = os.path.join(self.root, INDEX_FILE)
+            try:
+                with open(index_path) as f:
+                    indexed = json.load(f)["entries"]
+            except FileNotFoundError:
+                indexed = {}
+            except (ValueError, KeyError) as e:
+                logger.error(f"Rebuilding corrupt feature store index: {str(e)}")
+                indexed = {}
+
+            with self._lock:
+                self._entries = {}
+                for key, path in self._scan():
+                    entry = indexed.get(key)
+                    if entry is None or entry.get("path") != path:
+                        full_path = os.path.join(self.root, path)
+                        entry = {"path": path, "bytes": self._disk_size(full_path),
+                                 "accessed": os.path.getmtime(full_path)}
+                    self._entries[key] = entry
+                self.bytes = sum(entry["bytes"] for entry in self._entries.values())
+                self._evict()
+                self._save_index()
+
+            warmed = 0
+            for key in sorted(self._entries, key=lambda k: self._entries[k]["accessed"],
+                              reverse=True)[:self.warm_entries]:
+                warmed += self._open(key) is not None
+            logger.info(f"Feature store loaded: {len(self._entries)} entries, {self.bytes} bytes, "
+                        f"{warmed} warmed")
+
+        except Exception as e:
+            logger.error(f"Error loading feature store: {str(e)}")
+            raise e
+
+    def flush(self):
+        """Persist access times recorded since the last index write"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "open_entries": len(self._maps),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    # Analysis results
+
+    def put_analysis(self, key: str, analysis: Dict[str, Any]):
+        """Store an analysis result under ``analysis:{key}``"""
+        def write(path: str):
+            os.makedirs(path)
+            values: Dict[str, Any] = {}
+            aliases: Dict[str, str] = {}
+            for name, value in analysis.items():
+                alias = FIELD_ALIASES.get(name)
+                if alias is not None and alias in analysis and value == analysis[alias]:
+                    aliases[name] = alias
+                    continue
+
+                array = as_numeric_array(value)
+                if array is None:
+                    values[name] = value
+                    continue
+                dtype = np.float16 if name in FLOAT16_FIELDS else np.float32
+                if name in FRAME_SERIES_FIELDS and array.ndim == 2:
+                    array = array.T
+                np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array, dtype=dtype))
+
+            with open(os.path.join(path, "fields.json"), "w") as f:
+                json.dump({"fields": list(analysis), "values": values, "aliases": aliases}, f)
+
+        self._put(f"analysis:{key}", os.path.join("analysis", key.replace(":", ".")), write)
+
+    def get_analysis(self, key: str, fields: Optional[Iterable[str]] = None,
+                     start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Stored analysis, optionally projected onto fields and a [start, end) window in seconds"""
+        track = self._read(f"analysis:{key}")
+        if track is None:
+            return None
+        return analysis_window(track, fields, start, end)
+
+    # Visualization timelines
+
+    def put_timeline(self, file_hash: str, payload: bytes):
+        """Store an encoded visualization timeline under ``timeline:{file_hash}``"""
+        def write(path: str):
+            with open(path, "wb") as f:
+                f.write(payload)
+
+        self._put(f"timeline:{file_hash}", os.path.join("timeline", f"{file_hash}.mvt"), write)
+
+    def timeline_header(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Parsed header of a stored timeline"""
+        timeline = self._read(f"timeline:{file_hash}")
+        if timeline is None:
+            return None
+        return parse_timeline_header(timeline[:TIMELINE_HEADER.size].tobytes())
+
+    def timeline_frames(self, file_hash: str, info: Dict[str, Any], start_frame: int,
+                        end_frame: int) -> Optional[bytes]:
+        """Records [start_frame, end_frame) of a stored timeline, copied from its memory map"""
+        timeline = self._read(f"timeline:{file_hash}")
+        if timeline is None:
+            return None
+        offset = TIMELINE_HEADER.size + start_frame * info["record_size"]
+        end = TIMELINE_HEADER.size + end_frame * info["record_size"]
+        return timeline[offset:max(end, offset)].tobytes()
+
+    # Internals
+
+    def _scan(self) -> Iterable[Tuple[str, str]]:
+        """(key, relative path) of every complete entry on disk; removes partial writes"""
+        for kind in ("analysis", "timeline"):
+            for name in os.listdir(os.path.join(self.root, kind)):
+                full_path = os.path.join(self.root, kind, name)
+                if ".tmp-" in name:
+                    self._remove_path(full_path)
+                elif kind == "analysis":
+                    yield f"analysis:{name.replace('.', ':')}", os.path.join(kind, name)
+                elif name.endswith(".mvt"):
+                    yield f"timeline:{name[:-4]}", os.path.join(kind, name)
+
+    def _put(self, key: str, path: str, write):
+        """Write an entry next to its final path and swap it in, then evict down to max_bytes"""
+        full_path = os.path.join(self.root, path)
+        temp_path = f"{full_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            write(temp_path)
+            size = self._disk_size(temp_path)
+
+            with self._lock:
+                self._maps.delete(key)
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.bytes -= old["bytes"]
+                    self._remove_path(full_path)
+                os.replace(temp_path, full_path)
+                self._entries[key] = {"path": path, "bytes": size, "accessed": time.time()}
+                self.bytes += size
+                self._evict(keep=key)
+                self._save_index()
+
+        except Exception as e:
+            self._remove_path(temp_path)
+            logger.error(f"Error storing {key} in feature store: {str(e)}")
+            raise e
+
+    def _read(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["accessed"] = time.time()
+            self._dirty = True
+        data = self._open(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def _open(self, key: str) -> Optional[Any]:
+        """Memory maps of an entry: a field dict for analyses, a byte array for timelines"""
+        data = self._maps.get(key)
+        if data is not None:
+            return data
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        full_path = os.path.join(self.root, entry["path"])
+        try:
+            if key.startswith("timeline:"):
+                data = np.memmap(full_path, dtype=np.uint8, mode="r")
+            else:
+                with open(os.path.join(full_path, "fields.json")) as f:
+                    meta = json.load(f)
+                arrays = {}
+                for name in os.listdir(full_path):
+                    if name.endswith(".npy"):
+                        array = np.load(os.path.join(full_path, name), mmap_mode="r")
+                        field = name[:-4]
+                        arrays[field] = array.T if field in FRAME_SERIES_FIELDS else array
+                data = {}
+                for name in meta["fields"]:
+                    source = meta["aliases"].get(name, name)
+                    data[name] = arrays[source] if source in arrays else meta["values"][source]
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Dropping unreadable feature store entry {key}: {str(e)}")
+            with self._lock:
+                self._drop(key)
+                self._save_index()
+            return None
+
+        self._maps.put(key, data, size=0)
+        return data
+
+    def _evict(self, keep: Optional[str] = None):
+        """Remove least recently used entries until the store fits (lock held)"""
+        while self.bytes > self.max_bytes:
+            candidates = [key for key in self._entries if key != keep]
+            if not candidates:
+                break
+            oldest = min(candidates, key=lambda key: self._entries[key]["accessed"])
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        """Forget an entry and delete its files (lock held); open maps stay valid until released"""
+        entry = self._entries.pop(key, None)
+        self._maps.delete(key)
+        if entry is not None:
+            self.bytes -= entry["bytes"]
+            self._remove_path(os.path.join(self.root, entry["path"]))
+
+    def _save_index(self):
+        """Atomically rewrite index.json (lock held)"""
+        index_path = os.path.join(self.root, INDEX_FILE)
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump({"entries": self._entries}, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        self._dirty = False
+
+    @staticmethod
+    def _disk_size(path: str) -> int:
+        if os.path.isdir(path):
+            return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        return os.path.getsize(path)
+
+    @staticmethod
+    def _remove_path(path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,137 @@
+import json
+import struct
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+# Versioned magic prefix for binary live frames
+FRAME_MAGIC = b"MVF2"
+
+# magic, timestamp, bass/mid/treble/overall_volume/energy_level,
+# bpm/beat_phase/beat_confidence, flags, array encoding, spectrum length,
+# waveform length, spectrum reference, waveform peak
+FRAME_HEADER = struct.Struct("<4sd5f3fBBIIff")
+
+# Version 1 frames have no beat tracking fields
+LEGACY_FRAME_MAGIC = b"MVF1"
+LEGACY_FRAME_HEADER = struct.Struct("<4sd5fBBIIff")
+
+FRAME_LEVELS = ("bass_level", "mid_level", "treble_level", "overall_volume", "energy_level")
+FRAME_BEAT = ("bpm", "beat_phase", "beat_confidence")
+FRAME_ARRAYS = ("frequency_data", "time_domain_data")
+# Reduced spectrum of sessions with spectrum bands, stored in place of frequency_data
+FRAME_BANDS = "band_data"
+FRAME_FIELDS = ("timestamp",) + FRAME_ARRAYS + (FRAME_BANDS,) + FRAME_LEVELS + \
+    ("beat_detected",) + FRAME_BEAT
+FRAME_FORMATS = ("uint8", "float16", "json")
+
+# Array encodings stored in the header
+ENCODING_FLOAT16 = 0
+ENCODING_UINT8 = 1
+
+# Dynamic range kept by uint8 spectra, below the frame's loudest bin
+SPECTRUM_DB_RANGE = 96.0
+
+FLAG_BEAT = 1
+# The spectrum array holds band_data
+FLAG_BANDS = 2
+
+
+def _quantize_spectrum(magnitude: np.ndarray):
+    reference = float(magnitude.max()) if len(magnitude) else 0.0
+    if reference <= 0:
+        return np.zeros(len(magnitude), dtype=np.uint8), 0.0
+    db = 20 * np.log10(np.maximum(magnitude, reference * 1e-10) / reference)
+    levels = np.rint((db + SPECTRUM_DB_RANGE) * (255 / SPECTRUM_DB_RANGE))
+    return np.clip(levels, 0, 255).astype(np.uint8), reference
+
+
+def _dequantize_spectrum(levels: np.ndarray, reference: float) -> np.ndarray:
+    db = levels.astype(np.float32) * (SPECTRUM_DB_RANGE / 255) - SPECTRUM_DB_RANGE
+    magnitude = reference * np.power(10, db / 20, dtype=np.float32)
+    magnitude[levels == 0] = 0
+    return magnitude
+
+
+def encode_frame(frame: Dict[str, Any], frame_format: str = "uint8",
+                 fields: Optional[Iterable[str]] = None) -> bytes:
+    """Serialize a live frame once for pub/sub and the latest-value key.
+
+    "uint8" stores the spectrum as 8-bit dB levels (0.38 dB steps over
+    SPECTRUM_DB_RANGE) and the waveform as int8 scaled by its peak; "float16"
+    stores both as half floats; "json" is the legacy float-list encoding.
+    With ``fields``, JSON frames keep only those fields (plus the timestamp)
+    and binary frames leave out the arrays not listed; the header is fixed.
+    A frame's band_data takes the place of its spectrum.
+    """
+    if fields is not None:
+        fields = set(fields) | {"timestamp"}
+
+    if frame_format == "json":
+        return json.dumps({
+            name: value.tolist() if isinstance(value, np.ndarray) else value
+            for name, value in frame.items() if fields is None or name in fields
+        }).encode()
+
+    flags = FLAG_BEAT if frame["beat_detected"] else 0
+    names = FRAME_ARRAYS
+    if FRAME_BANDS in frame:
+        flags |= FLAG_BANDS
+        names = (FRAME_BANDS,) + FRAME_ARRAYS[1:]
+    spectrum, waveform = (
+        np.asarray(frame[name] if fields is None or name in fields else (), dtype=np.float32)
+        for name in names
+    )
+
+    if frame_format == "uint8":
+        encoding = ENCODING_UINT8
+        spectrum_bytes, reference = _quantize_spectrum(spectrum)
+        peak = float(np.abs(waveform).max()) if len(waveform) else 0.0
+        scale = 127 / peak if peak > 0 else 0.0
+        waveform_bytes = np.rint(waveform * scale).astype(np.int8)
+    elif frame_format == "float16":
+        encoding = ENCODING_FLOAT16
+        spectrum_bytes, reference = spectrum.astype(np.float16), 0.0
+        waveform_bytes, peak = waveform.astype(np.float16), 0.0
+    else:
+        raise ValueError(f"Unknown frame format: {frame_format}")
+
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, frame["timestamp"], *(frame[name] for name in FRAME_LEVELS),
+        *(frame.get(name, 0.0) for name in FRAME_BEAT), flags, encoding, len(spectrum), len(waveform), reference, peak
+    )
+    return header + spectrum_bytes.tobytes() + waveform_bytes.tobytes()
+
+
+def decode_frame(payload: bytes) -> Dict[str, Any]:
+    """Decode a payload produced by encode_frame (or a legacy MVF1 or JSON frame)"""
+    if payload.startswith(FRAME_MAGIC):
+        (_, timestamp, *values, flags, encoding, n_spectrum, n_waveform,
+         reference, peak) = FRAME_HEADER.unpack_from(payload)
+        offset = FRAME_HEADER.size
+    elif payload.startswith(LEGACY_FRAME_MAGIC):
+        (_, timestamp, *values, flags, encoding, n_spectrum, n_waveform,
+         reference, peak) = LEGACY_FRAME_HEADER.unpack_from(payload)
+        values += [0.0] * len(FRAME_BEAT)
+        offset = LEGACY_FRAME_HEADER.size
+    else:
+        return json.loads(payload)
+
+    if encoding == ENCODING_UINT8:
+        levels_u8 = np.frombuffer(payload, dtype=np.uint8, count=n_spectrum, offset=offset)
+        spectrum = _dequantize_spectrum(levels_u8, reference)
+        waveform = np.frombuffer(payload, dtype=np.int8, count=n_waveform,
+                                 offset=offset + n_spectrum).astype(np.float32) * (peak / 127)
+    else:
+        spectrum = np.frombuffer(payload, dtype=np.float16, count=n_spectrum,
+                                 offset=offset).astype(np.float32)
+        waveform = np.frombuffer(payload, dtype=np.float16, count=n_waveform,
+                                 offset=offset + 2 * n_spectrum).astype(np.float32)
+
+    return {
+        "timestamp": timestamp,
+        FRAME_BANDS if flags & FLAG_BANDS else "frequency_data": spectrum,
+        "time_domain_data": waveform,
+        **dict(zip(FRAME_LEVELS + FRAME_BEAT, values)),
+        "beat_detected": bool(flags & FLAG_BEAT)
+    }
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+from src.services.frame_codec import FRAME_FIELDS, FRAME_FORMATS, encode_frame
+from src.services.live_pipeline import DropOldestQueue
+
+
+class FrameSubscriber:
+    """One client's view of a live session: format, field subset, rate cap and send queue"""
+
+    def __init__(self, frame_format: str = "uint8", fields: Optional[FrozenSet[str]] = None,
+                 max_fps: float = 0, queue_size: int = 4):
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}")
+        if fields is not None and not fields <= set(FRAME_FIELDS):
+            raise ValueError(f"Unknown frame fields: {', '.join(sorted(fields - set(FRAME_FIELDS)))}")
+
+        self.frame_format = frame_format
+        self.fields = fields
+        self.min_interval = 1 / max_fps if max_fps > 0 else 0.0
+        self.queue = DropOldestQueue(queue_size, asyncio.get_running_loop())
+        self._last_sent = 0.0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+    @property
+    def view(self) -> Tuple[str, Optional[FrozenSet[str]]]:
+        """Key shared by subscribers that receive identical payloads"""
+        return self.frame_format, self.fields
+
+    def wants_frame(self, now: float) -> bool:
+        """Apply the frame-rate cap"""
+        if now - self._last_sent < self.min_interval:
+            self.frames_skipped += 1
+            return False
+        self._last_sent = now
+        return True
+
+    async def next_payload(self) -> bytes:
+        payload = await self.queue.get()
+        self.frames_sent += 1
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.frame_format,
+            "fields": sorted(self.fields) if self.fields is not None else None,
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "frames_dropped": self.queue.dropped,
+            "queued": len(self.queue)
+        }
+
+
+class LiveBroadcaster:
+    """In-process fan-out of live frames to websocket subscribers, without the Redis hop.
+
+    Each frame is encoded at most once per distinct (format, fields) view
+    among the subscribers that accept it, and an already encoded full payload
+    is reused for matching views. Slow clients lose their oldest queued frames.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[FrameSubscriber]] = {}
+
+    def subscribe(self, session_id: str, subscriber: FrameSubscriber):
+        self.subscribers.setdefault(session_id, set()).add(subscriber)
+
+    def unsubscribe(self, session_id: str, subscriber: FrameSubscriber):
+        subscribers = self.subscribers.get(session_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[session_id]
+
+    def publish(self, session_id: str, frame: Dict[str, Any],
+                encoded: Optional[Tuple[str, bytes]] = None):
+        """Queue a frame for the session's subscribers (event loop thread).
+
+        ``encoded`` is an optional (format, payload) pair of the full frame.
+        """
+        subscribers = self.subscribers.get(session_id)
+        if not subscribers:
+            return
+
+        payloads: Dict[Tuple[str, Optional[FrozenSet[str]]], bytes] = {}
+        if encoded is not None:
+            payloads[(encoded[0], None)] = encoded[1]
+
+        now = time.monotonic()
+        for subscriber in subscribers:
+            if not subscriber.wants_frame(now):
+                continue
+            view = subscriber.view
+            payload = payloads.get(view)
+            if payload is None:
+                payload = payloads[view] = encode_frame(frame, *view)
+            subscriber.queue.put(payload)
+
+    def backlog(self, session_id: str) -> int:
+        """Frames queued for the session's least loaded subscriber.
+
+        A single slow client only loses its own oldest frames; the session is
+        only backed up when every client is.
+        """
+        subscribers = self.subscribers.get(session_id)
+        return min(len(subscriber.queue) for subscriber in subscribers) if subscribers else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            session_id: [subscriber.stats() for subscriber in subscribers]
+            for session_id, subscribers in self.subscribers.items()
+        }
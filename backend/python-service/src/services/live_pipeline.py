@@ -0,0 +1,404 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+class RingBuffer:
+    """Preallocated single-producer/single-consumer float32 ring buffer.
+
+    The producer only advances the write counter and the consumer only the
+    read counter, so neither side takes a lock; under the GIL each counter
+    update is atomic and published after the samples are copied. Writes that
+    do not fit are dropped and counted as overruns.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        # Monotonic sample counters; positions are taken modulo capacity
+        self._written = 0
+        self._read = 0
+        self.overruns = 0
+
+    def available(self) -> int:
+        return self._written - self._read
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copy samples in (producer side); returns the number written"""
+        free = self.capacity - (self._written - self._read)
+        n = len(samples)
+        if n > free:
+            self.overruns += n - free
+            n = free
+        if n == 0:
+            return 0
+
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:n]
+        self._written += n
+        return n
+
+    def peek(self, out: np.ndarray) -> bool:
+        """Copy the next len(out) samples without consuming them (consumer side)"""
+        n = len(out)
+        if self.available() < n:
+            return False
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < n:
+            out[first:] = self._data[:n - first]
+        return True
+
+    def advance(self, n: int):
+        """Consume n samples (consumer side)"""
+        self._read += min(n, self.available())
+
+
+class DropOldestQueue:
+    """Bounded queue from worker threads to the event loop that drops the oldest item when full"""
+
+    def __init__(self, maxsize: int, loop: asyncio.AbstractEventLoop):
+        self._items: deque = deque(maxlen=maxsize)
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any):
+        """Add an item from any thread"""
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+        self._items.append(item)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    async def get(self) -> Any:
+        while not self._items:
+            self._ready.clear()
+            if self._items:
+                break
+            await self._ready.wait()
+        return self._items.popleft()
+
+
+class PublishRateController:
+    """Publish rate of one live pipeline: multiplicative decrease, additive recovery.
+
+    A publish is congested when its latency (frame analyzed to published,
+    plus the consumers' delay) exceeds max_latency_ms or more than
+    max_queued frames wait to be published or sent on. The rate then drops
+    by backoff, at most once per cooldown seconds, and otherwise climbs back
+    towards max_fps by recovery_fps per second. Bounds come from
+    LIVE_MIN_PUBLISH_FPS, LIVE_PUBLISH_MAX_LATENCY_MS and LIVE_PUBLISH_MAX_QUEUED.
+    """
+
+    def __init__(self, max_fps: float, min_fps: Optional[float] = None,
+                 max_latency_ms: Optional[float] = None, max_queued: Optional[int] = None,
+                 backoff: float = 0.75, recovery_fps: float = 5.0, cooldown: float = 0.5):
+        self.max_fps = max_fps
+        min_fps = min_fps if min_fps is not None else float(os.getenv('LIVE_MIN_PUBLISH_FPS', 5))
+        self.min_fps = min(min_fps, max_fps)
+        self.max_latency_ms = max_latency_ms if max_latency_ms is not None else \
+            float(os.getenv('LIVE_PUBLISH_MAX_LATENCY_MS', 50))
+        self.max_queued = max_queued if max_queued is not None else \
+            int(os.getenv('LIVE_PUBLISH_MAX_QUEUED', 2))
+        self.backoff = backoff
+        self.recovery_fps = recovery_fps
+        self.cooldown = cooldown
+
+        self.fps = max_fps
+        self.decreases = 0
+        self._last_update = time.monotonic()
+        self._last_decrease = 0.0
+
+    def update(self, latency_ms: float, queued: int) -> float:
+        """Account for one publish; returns the new rate"""
+        now = time.monotonic()
+        if latency_ms > self.max_latency_ms or queued > self.max_queued:
+            if now - self._last_decrease >= self.cooldown and self.fps > self.min_fps:
+                self.fps = max(self.fps * self.backoff, self.min_fps)
+                self._last_decrease = now
+                self.decreases += 1
+        else:
+            self.fps = min(self.fps + self.recovery_fps * (now - self._last_update), self.max_fps)
+        self._last_update = now
+        return self.fps
+
+
+class LivePipeline:
+    """Capture -> DSP worker -> event loop pipeline for live audio.
+
+    The audio source only copies samples into a RingBuffer. A DSP thread
+    (dedicated, or shared through a DSPWorkerPool) consumes frames at a fixed
+    hop, skipping ahead when the backlog exceeds the latency bound, and hands
+    results to the event loop through a DropOldestQueue, where a single task
+    awaits the publish callback. Sizes come from LIVE_RING_SECONDS,
+    LIVE_MAX_LATENCY_MS and LIVE_RESULT_QUEUE.
+
+    Publishing is decoupled from the hop: frames analyzed since the last
+    publish are combined by ``aggregate`` (default: keep the newest) at
+    publish_fps (LIVE_PUBLISH_FPS, 0 for every hop), which a
+    PublishRateController lowers while publishing or the consumers reported
+    by ``downstream`` (delay in ms, queued frames) are congested.
+    """
+
+    def __init__(self, sample_rate: int, frame_size: int, hop_length: int,
+                 process: Callable[[np.ndarray], Dict[str, Any]],
+                 callback: Callable[[Dict[str, Any]], Awaitable[None]],
+                 ring_seconds: Optional[float] = None, max_latency_ms: Optional[float] = None,
+                 result_queue_size: Optional[int] = None, publish_fps: Optional[float] = None,
+                 aggregate: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None,
+                 downstream: Optional[Callable[[], Tuple[float, int]]] = None):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_length = hop_length
+        self.process = process
+        self.callback = callback
+        self.aggregate = aggregate
+        self.downstream = downstream
+
+        ring_seconds = ring_seconds if ring_seconds is not None else \
+            float(os.getenv('LIVE_RING_SECONDS', 2))
+        max_latency_ms = max_latency_ms if max_latency_ms is not None else \
+            float(os.getenv('LIVE_MAX_LATENCY_MS', 100))
+        self.result_queue_size = result_queue_size if result_queue_size is not None else \
+            int(os.getenv('LIVE_RESULT_QUEUE', 8))
+
+        self.ring = RingBuffer(max(int(ring_seconds * sample_rate), 2 * frame_size))
+        # Unprocessed samples allowed before the worker skips to the newest frame
+        self.max_backlog = max(int(max_latency_ms * sample_rate / 1000), frame_size)
+        self.hop_seconds = hop_length / sample_rate
+
+        publish_fps = publish_fps if publish_fps is not None else \
+            float(os.getenv('LIVE_PUBLISH_FPS', 0))
+        analysis_fps = 1 / self.hop_seconds
+        self.publish_rate = PublishRateController(
+            min(publish_fps, analysis_fps) if publish_fps > 0 else analysis_fps
+        )
+        # Frames analyzed since the last publish, and the fraction of a
+        # publish they have earned
+        self._pending: List[Dict[str, Any]] = []
+        self._credit = 0.0
+
+        self.results: Optional[DropOldestQueue] = None
+        self._pool: Optional["DSPWorkerPool"] = None
+        self._worker: Optional[threading.Thread] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._frame = np.zeros(frame_size, dtype=np.float32)
+        self._last_frame = time.monotonic()
+
+        self.frames_processed = 0
+        self.frames_published = 0
+        self.frames_aggregated = 0
+        self.underruns = 0
+        self.skipped_samples = 0
+        self.status_errors = 0
+        self.step_errors = 0
+        self.last_latency_ms = 0.0
+
+    def on_audio(self, indata: np.ndarray, status=None):
+        """Device callback body: copy the first channel into the ring buffer"""
+        if status:
+            self.status_errors += 1
+        self.ring.write(indata[:, 0] if indata.ndim > 1 else indata)
+
+    def start(self, pool: Optional["DSPWorkerPool"] = None):
+        """Start DSP work (on the pool, or a dedicated thread) and the publisher task.
+
+        Call from the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        self.results = DropOldestQueue(self.result_queue_size, loop)
+        self._stopped.clear()
+        self._last_frame = time.monotonic()
+        if pool is not None:
+            self._pool = pool
+            pool.add(self)
+        else:
+            self._worker = threading.Thread(target=self._run_worker, name="live-dsp", daemon=True)
+            self._worker.start()
+        self._publisher = loop.create_task(self._publish())
+
+    def stop(self):
+        """Stop DSP work and cancel the publisher task"""
+        self._stopped.set()
+        if self._pool is not None:
+            self._pool.remove(self)
+            self._pool = None
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+            self._worker = None
+        if self._publisher is not None:
+            self._publisher.cancel()
+            self._publisher = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered_samples": self.ring.available(),
+            "ring_capacity": self.ring.capacity,
+            "overruns": self.ring.overruns,
+            "underruns": self.underruns,
+            "skipped_samples": self.skipped_samples,
+            "status_errors": self.status_errors,
+            "step_errors": self.step_errors,
+            "frames_processed": self.frames_processed,
+            "frames_published": self.frames_published,
+            "frames_aggregated": self.frames_aggregated,
+            "publish_fps": round(self.publish_rate.fps, 2),
+            "max_publish_fps": round(self.publish_rate.max_fps, 2),
+            "publish_rate_decreases": self.publish_rate.decreases,
+            "results_queued": len(self.results) if self.results is not None else 0,
+            "results_dropped": self.results.dropped if self.results is not None else 0,
+            "last_latency_ms": round(self.last_latency_ms, 2)
+        }
+
+    def step(self) -> bool:
+        """Process at most one frame (DSP thread); returns whether a frame was processed"""
+        backlog = self.ring.available()
+        if backlog > self.max_backlog:
+            # Fell behind: drop the oldest samples so latency stays bounded
+            skip = backlog - self.frame_size
+            self.ring.advance(skip)
+            self.skipped_samples += skip
+
+        if not self.ring.peek(self._frame):
+            now = time.monotonic()
+            if now - self._last_frame > 2 * self.hop_seconds:
+                # Input starved for a whole hop beyond the expected one
+                self.underruns += 1
+                self._last_frame = now
+            return False
+
+        self.ring.advance(self.hop_length)
+        self._last_frame = time.monotonic()
+        try:
+            result = self.process(self._frame)
+        except Exception as e:
+            logger.error(f"Error processing live audio frame: {str(e)}")
+            return True
+        self.frames_processed += 1
+
+        # Publish at the current rate, in audio time; the rate is only ever
+        # written by the publisher task
+        self._pending.append(result)
+        self._credit += self.publish_rate.fps * self.hop_seconds
+        if self._credit >= 1:
+            self._credit = min(self._credit - 1, 1.0)
+            frames, self._pending = self._pending, []
+            self.frames_aggregated += len(frames) - 1
+            if self.aggregate is not None and len(frames) > 1:
+                result = self.aggregate(frames)
+            else:
+                result = frames[-1]
+            self.results.put(result)
+        return True
+
+    def guarded_step(self) -> bool:
+        """step() for DSP threads: an error is logged and counted instead of ending the thread"""
+        try:
+            return self.step()
+        except Exception as e:
+            self.step_errors += 1
+            logger.error(f"Error in live audio pipeline step: {str(e)}")
+            # Idle rather than spin on an error that repeats every step
+            return False
+
+    def _run_worker(self):
+        while not self._stopped.is_set():
+            if not self.guarded_step():
+                self._stopped.wait(self.hop_seconds / 4)
+
+    async def _publish(self):
+        while True:
+            result = await self.results.get()
+            try:
+                await self.callback(result)
+                self.frames_published += 1
+                self.last_latency_ms = (time.time() - result["timestamp"]) * 1000
+                delay_ms, queued = self.downstream() if self.downstream is not None else (0.0, 0)
+                self.publish_rate.update(self.last_latency_ms + delay_ms, len(self.results) + queued)
+            except Exception as e:
+                logger.error(f"Error publishing live audio frame: {str(e)}")
+
+
+class DSPWorkerPool:
+    """Fixed set of DSP threads shared by many live pipelines.
+
+    Each pipeline is pinned to the least-loaded thread, which steps its
+    pipelines round-robin one frame at a time so no session starves the
+    others, and idles for poll_interval when none has a full frame.
+    Sized by LIVE_DSP_WORKERS.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, poll_interval: float = 0.005):
+        self.max_workers = max_workers if max_workers is not None else \
+            int(os.getenv('LIVE_DSP_WORKERS', os.cpu_count() or 1))
+        self.poll_interval = poll_interval
+        # Per-thread pipeline tuples, replaced (never mutated) so threads can
+        # iterate them without locking
+        self._assignments: List[Tuple[LivePipeline, ...]] = [() for _ in range(max(self.max_workers, 1))]
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        self._stopped.clear()
+        for index in range(len(self._assignments)):
+            thread = threading.Thread(target=self._run, args=(index,), name=f"live-dsp-{index}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def add(self, pipeline: LivePipeline):
+        if not self._threads:
+            self.start()
+        with self._lock:
+            index = min(range(len(self._assignments)), key=lambda i: len(self._assignments[i]))
+            self._assignments[index] = self._assignments[index] + (pipeline,)
+
+    def remove(self, pipeline: LivePipeline):
+        with self._lock:
+            self._assignments = [
+                tuple(p for p in pipelines if p is not pipeline) for pipelines in self._assignments
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._assignments),
+            "pipelines_per_worker": [len(pipelines) for pipelines in self._assignments]
+        }
+
+    def _run(self, index: int):
+        while not self._stopped.is_set():
+            busy = False
+            for pipeline in self._assignments[index]:
+                # One session's failure must not stop the others sharing this thread
+                busy = pipeline.guarded_step() or busy
+            if not busy:
+                self._stopped.wait(self.poll_interval)
@@ -0,0 +1,203 @@
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.services.band_reducer import BAND_SCALES
+from src.services.live_pipeline import DSPWorkerPool, LivePipeline
+from src.services.live_sources import create_input_source
+from src.services.realtime_processor import RealtimeFrameProcessor, aggregate_frames
+
+# Sample formats accepted for PCM pushed by clients (little-endian, interleaved)
+PCM_FORMATS = {"float32": np.dtype("<f4"), "int16": np.dtype("<i2")}
+
+# Accepted sample rates and chunk sizes (powers of two); both are set by
+# clients, and a frame processor's memory grows with the chunk size
+LIVE_SAMPLE_RATES = (8000, 192000)
+LIVE_CHUNK_SIZES = (256, 8192)
+
+
+class LiveSessionLimitError(Exception):
+    """Raised when starting a session would exceed the session limit"""
+
+
+class LiveSession:
+    """One live stream (user or room) with its own pipeline, frame processor and Redis keys.
+
+    Audio comes from the input source built for ``source`` with
+    ``source_options`` (see create_input_source), or from push_pcm for
+    websocket sessions.
+    """
+
+    def __init__(self, session_id: str, source: str, sample_rate: int, chunk_size: int,
+                 publish: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 sample_format: str = "float32", channels: int = 1,
+                 spectrum_bands: Optional[int] = None, band_scale: Optional[str] = None,
+                 publish_fps: Optional[float] = None,
+                 downstream: Optional[Callable[[str], Tuple[float, int]]] = None,
+                 source_options: Optional[Dict[str, Any]] = None):
+        spectrum_bands = spectrum_bands if spectrum_bands is not None else \
+            int(os.getenv('LIVE_SPECTRUM_BANDS', 0))
+        band_scale = band_scale or os.getenv('LIVE_BAND_SCALE', 'log')
+        min_rate, max_rate = LIVE_SAMPLE_RATES
+        if not min_rate <= sample_rate <= max_rate:
+            raise ValueError(f"sample_rate must be between {min_rate} and {max_rate}")
+        min_chunk, max_chunk = LIVE_CHUNK_SIZES
+        if not min_chunk <= chunk_size <= max_chunk or chunk_size & (chunk_size - 1):
+            raise ValueError(f"chunk_size must be a power of two between {min_chunk} and {max_chunk}")
+        if channels < 1:
+            raise ValueError("channels must be at least 1")
+        if sample_format not in PCM_FORMATS:
+            raise ValueError(f"Unknown PCM format: {sample_format}")
+        if band_scale not in BAND_SCALES:
+            raise ValueError(f"Unknown band scale: {band_scale}")
+        if not 0 <= spectrum_bands <= chunk_size // 2:
+            raise ValueError(f"spectrum_bands must be between 0 and {chunk_size // 2}")
+
+        self.session_id = session_id
+        self.source = source
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.sample_format = sample_format
+        self.channels = channels
+        self.spectrum_bands = spectrum_bands
+        self.band_scale = band_scale
+        self.started_at = time.time()
+        self.bytes_received = 0
+        self.input = create_input_source(source, sample_rate, chunk_size, **(source_options or {}))
+
+        self.pipeline = LivePipeline(
+            sample_rate,
+            frame_size=chunk_size,
+            hop_length=chunk_size,
+            process=RealtimeFrameProcessor(
+                sample_rate, chunk_size, hop_length=chunk_size, spectrum_bands=spectrum_bands,
+                band_scale=band_scale
+            ).process,
+            callback=lambda frame: publish(session_id, frame),
+            publish_fps=publish_fps,
+            aggregate=aggregate_frames,
+            downstream=(lambda: downstream(session_id)) if downstream is not None else None
+        )
+
+    def start(self, pool: Optional[DSPWorkerPool] = None):
+        """Start DSP work and the input source, if any"""
+        self.pipeline.start(pool)
+        if self.input is None:
+            return
+        try:
+            self.input.start(self.pipeline.on_audio)
+        except Exception:
+            self.pipeline.stop()
+            raise
+
+    def stop(self):
+        if self.input is not None:
+            self.input.stop()
+        self.pipeline.stop()
+
+    def push_pcm(self, data: bytes):
+        """Feed interleaved PCM received from a client (event loop thread)"""
+        dtype = PCM_FORMATS[self.sample_format]
+        usable = len(data) - len(data) % (dtype.itemsize * self.channels)
+        samples = np.frombuffer(data, dtype=dtype, count=usable // dtype.itemsize)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if dtype.kind == "i":
+            samples = samples.astype(np.float32) / np.float32(2 ** (8 * dtype.itemsize - 1))
+        self.bytes_received += len(data)
+        self.pipeline.ring.write(samples)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "source": self.source,
+            "sample_rate": self.sample_rate,
+            "chunk_size": self.chunk_size,
+            "sample_format": self.sample_format,
+            "channels": self.channels,
+            "spectrum_bands": self.spectrum_bands,
+            "band_scale": self.band_scale,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "bytes_received": self.bytes_received,
+            **self.pipeline.stats()
+        }
+
+
+class LiveSessionManager:
+    """Live sessions keyed by user or room id, scheduled on a shared DSP worker pool.
+
+    Frames of each session are handed to ``publish(session_id, frame)``, and
+    ``downstream(session_id)`` reports the (delay in ms, queued frames) of
+    their consumers to each session's publish rate control. At most
+    LIVE_MAX_SESSIONS sessions run at once.
+    """
+
+    def __init__(self, publish: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 pool: Optional[DSPWorkerPool] = None, max_sessions: Optional[int] = None,
+                 downstream: Optional[Callable[[str], Tuple[float, int]]] = None):
+        self.publish = publish
+        self.downstream = downstream
+        self.pool = pool if pool is not None else DSPWorkerPool()
+        self.max_sessions = max_sessions if max_sessions is not None else \
+            int(os.getenv('LIVE_MAX_SESSIONS', 64))
+        self.sessions: Dict[str, LiveSession] = {}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        return self.sessions.get(session_id)
+
+    def start_session(self, session_id: str, source: str = "websocket", sample_rate: int = 44100,
+                      chunk_size: int = 1024, sample_format: str = "float32", channels: int = 1,
+                      device: Optional[int] = None, spectrum_bands: Optional[int] = None,
+                      band_scale: Optional[str] = None, publish_fps: Optional[float] = None,
+                      source_options: Optional[Dict[str, Any]] = None) -> LiveSession:
+        """Start a session; call from the event loop.
+
+        ``device`` selects the input of device sessions; ``source_options``
+        are passed on to create_input_source.
+        """
+        if session_id in self.sessions:
+            raise ValueError(f"Live session {session_id} already running")
+        if len(self.sessions) >= self.max_sessions:
+            raise LiveSessionLimitError(f"Live session limit ({self.max_sessions}) reached")
+
+        if device is not None:
+            source_options = {**(source_options or {}), "device": device}
+        session = LiveSession(session_id, source, sample_rate, chunk_size, self.publish,
+                              sample_format=sample_format, channels=channels,
+                              spectrum_bands=spectrum_bands, band_scale=band_scale,
+                              publish_fps=publish_fps, downstream=self.downstream,
+                              source_options=source_options)
+        session.start(self.pool)
+        self.sessions[session_id] = session
+        logger.info(f"Live session {session_id} started ({source}, {sample_rate} Hz)")
+        return session
+
+    def stop_session(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.stop()
+        logger.info(f"Live session {session_id} stopped")
+        return True
+
+    def shutdown(self):
+        """Stop every session and the worker pool"""
+        for session_id in list(self.sessions):
+            self.stop_session(session_id)
+        self.pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "pool": self.pool.stats()
+        }
+
+    def session_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {session_id: session.stats() for session_id, session in self.sessions.items()}
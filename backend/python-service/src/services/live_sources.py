@@ -0,0 +1,201 @@
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+
+from src.services.audio_io import audio_sample_rate, iter_audio_blocks
+
+try:
+    import sounddevice as sd
+except OSError:
+    # PortAudio missing (headless hosts, CI): only device input needs it
+    sd = None
+
+# Sources a live session can take audio from; websocket audio is pushed by the client
+LIVE_SOURCES = ("device", "websocket", "file", "signal")
+
+# Signals a SignalSource can generate
+LIVE_SIGNALS = ("clicks", "sine", "noise")
+
+# Called with each captured block (samples, or samples x channels) and a status
+AudioCallback = Callable[[np.ndarray, Any], None]
+
+
+class LiveInputSource:
+    """Where a live session's audio comes from.
+
+    start() begins delivering blocks to the callback, the same callback
+    path (LivePipeline.on_audio) for every source; stop() ends it.
+    """
+
+    def start(self, callback: AudioCallback):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class DeviceSource(LiveInputSource):
+    """Microphone or line input through a sounddevice input stream"""
+
+    def __init__(self, sample_rate: int, block_size: int, device: Optional[int] = None):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.device = device
+        self.stream = None
+
+    def start(self, callback: AudioCallback):
+        if sd is None:
+            raise RuntimeError("Audio device input is unavailable: PortAudio library not found")
+
+        def audio_callback(indata, frames, time, status):
+            callback(indata, status)
+
+        self.stream = sd.InputStream(
+            callback=audio_callback,
+            device=self.device,
+            channels=1,
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            dtype=np.float32
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class PacedSource(LiveInputSource):
+    """Delivers generated blocks from a thread at speed times real time.
+
+    Blocks are scheduled against the start time rather than slept for one
+    by one, so delivery does not drift; a source that falls behind catches
+    up in a burst, like a device driver would.
+    """
+
+    def __init__(self, sample_rate: int, block_size: int, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.speed = speed
+        self.blocks_sent = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        """block_size float32 sample blocks until the source ends"""
+        raise NotImplementedError
+
+    def start(self, callback: AudioCallback):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,),
+                                        name=f"live-{type(self).__name__}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self, callback: AudioCallback):
+        interval = self.block_size / (self.sample_rate * self.speed)
+        started = time.monotonic()
+        for index, block in enumerate(self.blocks()):
+            delay = started + index * interval - time.monotonic()
+            if self._stopped.wait(max(delay, 0)):
+                return
+            callback(block, None)
+            self.blocks_sent += 1
+
+
+class FileSource(PacedSource):
+    """Decoded audio file played at real time (speed 1) or accelerated, optionally looped"""
+
+    def __init__(self, file_path: str, sample_rate: int, block_size: int, speed: float = 1.0,
+                 loop: bool = True):
+        super().__init__(sample_rate, block_size, speed)
+        self.file_path = file_path
+        self.loop = loop
+        # Fail on start_session rather than in the source thread
+        audio_sample_rate(file_path)
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        # Samples carry over between passes, so a file shorter than a block
+        # still loops; an empty file ends the source instead of spinning
+        pending = np.zeros(0, dtype=np.float32)
+        while not self._stopped.is_set():
+            n_samples = 0
+            for decoded in iter_audio_blocks(self.file_path, self.sample_rate, block_size=65536):
+                n_samples += len(decoded)
+                pending = np.concatenate((pending, decoded))
+                n_blocks = len(pending) // self.block_size
+                for index in range(n_blocks):
+                    yield pending[index * self.block_size:(index + 1) * self.block_size]
+                pending = pending[n_blocks * self.block_size:]
+            if not self.loop or n_samples == 0:
+                return
+
+
+class SignalSource(PacedSource):
+    """Endless generated signal: a click track at bpm, a sine at frequency, or white noise"""
+
+    def __init__(self, sample_rate: int, block_size: int, signal: str = "clicks",
+                 speed: float = 1.0, bpm: float = 120.0, frequency: float = 440.0,
+                 amplitude: float = 0.5, seed: Optional[int] = None):
+        if signal not in LIVE_SIGNALS:
+            raise ValueError(f"Unknown live signal: {signal}")
+        super().__init__(sample_rate, block_size, speed)
+        self.signal = signal
+        self.bpm = bpm
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.seed = seed
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        offsets = np.arange(self.block_size)
+        beat_samples = 60 * self.sample_rate / self.bpm
+        click = np.sin(2 * np.pi * 1000 * np.arange(int(0.01 * self.sample_rate)) / self.sample_rate)
+        click *= np.hanning(len(click))
+        position = 0
+        while True:
+            samples = position + offsets
+            if self.signal == "sine":
+                block = self.amplitude * np.sin(2 * np.pi * self.frequency * samples / self.sample_rate)
+            elif self.signal == "noise":
+                block = self.amplitude * rng.uniform(-1, 1, self.block_size)
+            else:
+                # Clicks over a quiet noise floor; every click that overlaps this block
+                block = 0.02 * self.amplitude * rng.standard_normal(self.block_size)
+                first = max(int(np.ceil((position - len(click)) / beat_samples)), 0)
+                for beat in range(first, int(samples[-1] // beat_samples) + 1):
+                    start = int(round(beat * beat_samples)) - position
+                    lo, hi = max(start, 0), min(start + len(click), self.block_size)
+                    if lo < hi:
+                        block[lo:hi] += self.amplitude * click[lo - start:hi - start]
+            yield block.astype(np.float32)
+            position += self.block_size
+
+
+def create_input_source(source: str, sample_rate: int, block_size: int,
+                        device: Optional[int] = None, file_path: Optional[str] = None,
+                        signal: str = "clicks", speed: float = 1.0,
+                        loop: bool = True) -> Optional[LiveInputSource]:
+    """Input source of a live session; None for websocket sessions, whose client pushes PCM"""
+    if source == "device":
+        return DeviceSource(sample_rate, block_size, device)
+    if source == "file":
+        if not file_path:
+            raise ValueError("File sources need a file_path")
+        return FileSource(file_path, sample_rate, block_size, speed=speed, loop=loop)
+    if source == "signal":
+        return SignalSource(sample_rate, block_size, signal, speed=speed)
+    if source == "websocket":
+        return None
+    raise ValueError(f"Unknown live source: {source}")
@@ -0,0 +1,130 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.fft
+from scipy import signal
+
+from src.services.band_reducer import SpectrumBandReducer
+from src.services.beat_tracker import StreamingBeatTracker
+
+# (name, low Hz, high Hz) of the bands reported per live frame
+FREQUENCY_BANDS: Tuple[Tuple[str, float, float], ...] = (
+    ("bass_level", 20, 250),
+    ("mid_level", 250, 4000),
+    ("treble_level", 4000, 20000),
+)
+
+
+def aggregate_frames(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One frame standing for several consecutive ones, oldest first.
+
+    Band levels and spectra keep their peaks over the frames, volume and
+    energy are averaged and a beat on any frame is kept; the timestamp,
+    waveform and tempo fields are the newest frame's.
+    """
+    aggregated = dict(frames[-1])
+    for name, _, _ in FREQUENCY_BANDS:
+        aggregated[name] = max(frame[name] for frame in frames)
+    for name in ("overall_volume", "energy_level"):
+        aggregated[name] = sum(frame[name] for frame in frames) / len(frames)
+    for name in ("frequency_data", "band_data"):
+        if name in aggregated:
+            aggregated[name] = np.maximum.reduce([frame[name] for frame in frames])
+    aggregated["beat_detected"] = any(frame["beat_detected"] for frame in frames)
+    return aggregated
+
+
+def savgol_weights(rows: np.ndarray, window_length: int = 11, polyorder: int = 3) -> np.ndarray:
+    """rows @ M for the (n x n) matrix M with M @ x == signal.savgol_filter(x, window_length, polyorder)
+
+    Built from the filter coefficients without materialising M, so memory
+    and time grow linearly with n.
+    """
+    rows = np.atleast_2d(rows).astype(np.float64)
+    n = rows.shape[1]
+    half = window_length // 2
+    # Interior rows of M hold the centred coefficients on their diagonal band
+    inner = rows.copy()
+    inner[:, :half] = 0
+    inner[:, n - half:] = 0
+    interior = signal.savgol_coeffs(window_length, polyorder, use="dot")
+    weights = np.stack([np.convolve(row, interior, mode="same") for row in inner])
+    # mode="interp": edge rows come from the polynomial fitted to the first/last window
+    for i in range(half):
+        weights[:, :window_length] += rows[:, i, np.newaxis] * \
+            signal.savgol_coeffs(window_length, polyorder, pos=i, use="dot")
+        weights[:, n - window_length:] += rows[:, n - 1 - i, np.newaxis] * \
+            signal.savgol_coeffs(window_length, polyorder, pos=window_length - 1 - i, use="dot")
+    return weights
+
+
+class RealtimeFrameProcessor:
+    """Per-frame live analysis with everything frame-independent precomputed.
+
+    Built once per (sample_rate, frame_size): the window, frequency axis and
+    band weights are fixed, and magnitudes, band levels and scratch space are
+    written into preallocated buffers. Savitzky-Golay smoothing followed by a
+    band sum is linear, so smoothing and all three bands fold into one
+    (bands x bins) weight matrix applied with a single matrix-vector product.
+    Beats, tempo and beat phase come from a StreamingBeatTracker fed one
+    spectrum per hop. With spectrum_bands, frames carry band_data, the
+    spectrum reduced to that many band_scale bands, instead of
+    frequency_data. Not thread-safe; use one processor per stream.
+    """
+
+    def __init__(self, sample_rate: int, frame_size: int, window: Optional[str] = None,
+                 smoothing_length: int = 11, smoothing_order: int = 3,
+                 hop_length: Optional[int] = None, spectrum_bands: int = 0,
+                 band_scale: str = "log"):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_length = hop_length or frame_size
+        self.n_bins = frame_size // 2
+
+        # Rectangular by default, matching the unwindowed spectrum clients expect
+        self.window = signal.get_window(window, frame_size).astype(np.float32) if window else None
+        self.freqs = scipy.fft.rfftfreq(frame_size, 1 / sample_rate)[:self.n_bins]
+
+        band_masks = np.stack([(self.freqs >= low) & (self.freqs <= high)
+                               for _, low, high in FREQUENCY_BANDS])
+        self.band_weights = savgol_weights(band_masks, smoothing_length, smoothing_order)
+
+        self.magnitude = np.zeros(self.n_bins, dtype=np.float32)
+        self.band_levels = np.zeros(len(FREQUENCY_BANDS))
+        self._scratch = np.zeros(frame_size, dtype=np.float32)
+        self.beat_tracker = StreamingBeatTracker(sample_rate / self.hop_length, self.n_bins)
+        self.band_reducer = SpectrumBandReducer(self.freqs, spectrum_bands, band_scale) \
+            if spectrum_bands > 0 else None
+
+    def process(self, frame: np.ndarray) -> Dict[str, Any]:
+        """Analyze the next frame of frame_size samples, hop_length after the last.
+
+        frequency_data (or band_data) and time_domain_data are float32 array
+        copies, left for frame_codec to serialize once.
+        """
+        samples = frame
+        if self.window is not None:
+            samples = np.multiply(frame, self.window, out=self._scratch)
+
+        spectrum = scipy.fft.rfft(samples)
+        np.abs(spectrum[:self.n_bins], out=self.magnitude)
+        np.dot(self.band_weights, self.magnitude, out=self.band_levels)
+
+        energy = float(np.dot(frame, frame))
+        energy_level = float(np.abs(frame, out=self._scratch).mean())
+
+        if self.band_reducer is not None:
+            spectrum_data = {"band_data": self.band_reducer.reduce(self.magnitude).copy()}
+        else:
+            spectrum_data = {"frequency_data": self.magnitude.copy()}
+
+        return {
+            "timestamp": time.time(),
+            **spectrum_data,
+            "time_domain_data": frame.astype(np.float32),
+            **{name: level for (name, _, _), level in zip(FREQUENCY_BANDS, self.band_levels.tolist())},
+            "overall_volume": float(np.sqrt(energy / self.frame_size)),
+            "energy_level": energy_level,
+            **self.beat_tracker.update(self.magnitude)
+        }
@@ -1,22 +1,63 @@
 import redis.asyncio as redis
+import asyncio
 import json
-import hashlib
-from typing import Any, Dict, Optional
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 from loguru import logger
 import os
 
+from src.services.analysis_codec import decode_analysis, encode_analysis
+from src.services.frame_codec import decode_frame, encode_frame
+from src.services.memory_cache import LRUCache
+from src.services.visual_timeline import TIMELINE_HEADER, parse_timeline_header
+
 class RedisClient:
     """Redis client for caching and real-time communication"""
     
     def __init__(self):
         self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
         self.client: Optional[redis.Redis] = None
+        # Separate client for binary payloads, which must not be utf-8 decoded
+        self.binary_client: Optional[redis.Redis] = None
+        # Single connection for the blocking job queue pop, so a waiting BRPOP
+        # never takes a connection from the shared pools
+        self.queue_client: Optional[redis.Redis] = None
         self.pubsub = None
         
+        # In-process tier in front of Redis for hot analysis and realtime reads
+        self.local_cache = LRUCache(
+            max_entries=int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 256)),
+            max_bytes=int(os.getenv('LOCAL_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        )
+        self.analysis_bytes_written = 0
+        self.analysis_bytes_read = 0
+        
+        # Connection pool size per client (text and binary)
+        self.max_connections = int(os.getenv('REDIS_MAX_CONNECTIONS', 32))
+        
+        # Live frames are written in pipelined micro-batches every interval
+        # (0 writes each frame immediately, still in one round trip)
+        self.live_flush_interval = float(os.getenv('LIVE_FLUSH_INTERVAL_MS', 10)) / 1000
+        # (channel, user_id, payload, expire_seconds) waiting for the next flush
+        self._pending_frames: deque = deque(maxlen=int(os.getenv('LIVE_MAX_PENDING_FRAMES', 1024)))
+        self._flush_task: Optional[asyncio.Task] = None
+        self.live_frames_written = 0
+        self.live_frames_dropped = 0
+        self.live_flushes = 0
+        # Round trip of the last live frame flush, and start of the running one
+        self.live_flush_ms = 0.0
+        self._flush_started: Optional[float] = None
+        
     async def connect(self):
         """Connect to Redis server"""
         try:
-            self.client = redis.from_url(self.redis_url, decode_responses=True)
+            self.client = redis.from_url(self.redis_url, decode_responses=True,
+                                         max_connections=self.max_connections)
+            self.binary_client = redis.from_url(self.redis_url, decode_responses=False,
+                                                max_connections=self.max_connections)
+            self.queue_client = redis.from_url(self.redis_url, decode_responses=True,
+                                               max_connections=1)
             await self.client.ping()
             logger.info("✅ Connected to Redis")
         except Exception as e:
@@ -26,48 +67,240 @@ class RedisClient:
     async def disconnect(self):
         """Disconnect from Redis server"""
         try:
+            if self._flush_task:
+                self._flush_task.cancel()
+                self._flush_task = None
+            if self._pending_frames:
+                await self._flush_live_frames()
+            if self.binary_client:
+                await self.binary_client.close()
+            if self.queue_client:
+                await self.queue_client.close()
             if self.client:
                 await self.client.close()
                 logger.info("✅ Disconnected from Redis")
         except Exception as e:
             logger.error(f"Error disconnecting from Redis: {str(e)}")
     
-    async def set_analysis_result(self, file_url: str, analysis_data: Dict[str, Any], 
+    def cache_stats(self) -> Dict[str, Any]:
+        """Local cache counters plus analysis payload traffic"""
+        return {
+            **self.local_cache.stats(),
+            "analysis_bytes_written": self.analysis_bytes_written,
+            "analysis_bytes_read": self.analysis_bytes_read,
+            "live_frames_written": self.live_frames_written,
+            "live_frames_dropped": self.live_frames_dropped,
+            "live_flushes": self.live_flushes,
+            "live_flush_ms": round(self.live_flush_ms, 2)
+        }
+    
+    def live_write_delay_ms(self) -> float:
+        """Lag of live frame writes: the last flush's round trip, or the running one's so far"""
+        if self._flush_started is None:
+            return self.live_flush_ms
+        return max(self.live_flush_ms, (time.monotonic() - self._flush_started) * 1000)
+    
+    async def set_analysis_result(self, file_hash: str, analysis_data: Dict[str, Any], 
                                  expire_seconds: int = 3600):
-        """Cache audio analysis results"""
+        """Cache audio analysis results under their content hash"""
         try:
-            # Create hash key for the file
-            file_hash = hashlib.md5(file_url.encode()).hexdigest()
             key = f"analysis:{file_hash}"
             
-            # Store analysis data
-            await self.client.setex(key, expire_seconds, json.dumps(analysis_data))
-            logger.info(f"Cached analysis result for file: {file_url}")
+            # Store analysis data as a compressed binary payload
+            payload = encode_analysis(analysis_data)
+            await self.binary_client.setex(key, expire_seconds, payload)
+            self.analysis_bytes_written += len(payload)
+            self.local_cache.put(key, analysis_data, ttl=expire_seconds)
+            logger.info(f"Cached analysis result: {file_hash} ({len(payload)} bytes)")
             
         except Exception as e:
             logger.error(f"Error caching analysis result: {str(e)}")
             raise e
     
+    async def set_analysis_alias(self, source_hash: str, file_hash: str, 
+                                expire_seconds: int = 3600):
+        """Point a source (e.g. URL) hash at the content hash of its analysis"""
+        try:
+            key = f"analysis:source:{source_hash}"
+            await self.client.setex(key, expire_seconds, file_hash)
+            
+        except Exception as e:
+            logger.error(f"Error storing analysis alias: {str(e)}")
+    
+    async def get_analysis_alias(self, source_hash: str) -> Optional[str]:
+        """Resolve a source hash to the content hash of its analysis"""
+        try:
+            key = f"analysis:source:{source_hash}"
+            return await self.client.get(key)
+            
+        except Exception as e:
+            logger.error(f"Error retrieving analysis alias: {str(e)}")
+            return None
+    
     async def get_analysis_result(self, file_hash: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached audio analysis results"""
         try:
             key = f"analysis:{file_hash}"
-            result = await self.client.get(key)
+            result = self.local_cache.get(key)
+            if result is not None:
+                return result
+            
+            payload = await self.binary_client.get(key)
+            if payload:
+                self.analysis_bytes_read += len(payload)
+                result = decode_analysis(payload)
+                ttl = await self.binary_client.ttl(key)
+                self.local_cache.put(key, result, ttl=ttl if ttl > 0 else None)
+                return result
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error retrieving analysis result: {str(e)}")
+            return None
+    
+    async def set_timeline(self, file_hash: str, payload: bytes, expire_seconds: int = 3600):
+        """Store an encoded visualization timeline under its content hash"""
+        try:
+            key = f"timeline:{file_hash}"
+            await self.binary_client.setex(key, expire_seconds, payload)
+            self.local_cache.delete(key)
+            logger.info(f"Cached visualization timeline: {file_hash} ({len(payload)} bytes)")
+            
+        except Exception as e:
+            logger.error(f"Error caching visualization timeline: {str(e)}")
+            raise e
+    
+    async def has_timeline(self, file_hash: str) -> bool:
+        try:
+            return bool(await self.binary_client.exists(f"timeline:{file_hash}"))
+        except Exception as e:
+            logger.error(f"Error checking visualization timeline: {str(e)}")
+            return False
+    
+    async def get_timeline_header(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Parsed header of a cached timeline, without reading its frames"""
+        try:
+            key = f"timeline:{file_hash}"
+            info = self.local_cache.get(key)
+            if info is not None:
+                return info
+            
+            header = await self.binary_client.getrange(key, 0, TIMELINE_HEADER.size - 1)
+            if len(header) < TIMELINE_HEADER.size:
+                return None
+            info = parse_timeline_header(header)
+            ttl = await self.binary_client.ttl(key)
+            self.local_cache.put(key, info, ttl=ttl if ttl > 0 else None)
+            return info
+            
+        except Exception as e:
+            logger.error(f"Error retrieving visualization timeline: {str(e)}")
+            return None
+    
+    async def get_timeline_frames(self, file_hash: str, info: Dict[str, Any],
+                                  start_frame: int, end_frame: int) -> bytes:
+        """Records [start_frame, end_frame) of a cached timeline, read with one GETRANGE"""
+        offset = TIMELINE_HEADER.size + start_frame * info["record_size"]
+        end = TIMELINE_HEADER.size + end_frame * info["record_size"] - 1
+        if end < offset:
+            return b""
+        return await self.binary_client.getrange(f"timeline:{file_hash}", offset, end)
+    
+    async def enqueue_analysis_job(self, job: Dict[str, Any], expire_seconds: int = 3600):
+        """Store a job record and push its id onto the analysis job queue in one round trip"""
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.setex(f"analysis:job:{job['job_id']}", expire_seconds, json.dumps(job))
+            pipe.lpush("analysis:jobs:queue", job["job_id"])
+            await pipe.execute()
+            
+        except Exception as e:
+            logger.error(f"Error queuing analysis job: {str(e)}")
+            raise e
+    
+    async def dequeue_analysis_job(self, timeout: int = 1) -> Optional[str]:
+        """Pop the oldest queued job id, waiting up to timeout seconds.
+
+        Uses the dedicated queue connection: call from one task at a time.
+        """
+        item = await self.queue_client.brpop("analysis:jobs:queue", timeout=timeout)
+        return item[1] if item else None
+    
+    async def analysis_job_queue_length(self) -> int:
+        try:
+            return await self.client.llen("analysis:jobs:queue")
+        except Exception as e:
+            logger.error(f"Error reading analysis job queue length: {str(e)}")
+            return 0
+    
+    async def set_analysis_job(self, job: Dict[str, Any], expire_seconds: int = 3600):
+        """Store an analysis job record"""
+        try:
+            await self.client.setex(f"analysis:job:{job['job_id']}", expire_seconds, json.dumps(job))
             
+        except Exception as e:
+            logger.error(f"Error storing analysis job: {str(e)}")
+            raise e
+    
+    async def get_analysis_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an analysis job record"""
+        try:
+            result = await self.client.get(f"analysis:job:{job_id}")
             if result:
                 return json.loads(result)
             return None
             
         except Exception as e:
-            logger.error(f"Error retrieving analysis result: {str(e)}")
+            logger.error(f"Error retrieving analysis job: {str(e)}")
+            return None
+    
+    async def claim_analysis_job(self, dedup_key: str, job_id: str,
+                                 expire_seconds: int = 3600) -> Optional[str]:
+        """Register job_id as the live job for dedup_key; returns the id already registered, if any"""
+        key = f"analysis:job:dedup:{dedup_key}"
+        if await self.client.set(key, job_id, nx=True, ex=expire_seconds):
+            return None
+        return await self.client.get(key)
+    
+    async def release_analysis_job(self, dedup_key: str, job_id: str):
+        """Remove the dedup registration of job_id"""
+        try:
+            key = f"analysis:job:dedup:{dedup_key}"
+            if await self.client.get(key) == job_id:
+                await self.client.delete(key)
+                
+        except Exception as e:
+            logger.error(f"Error releasing analysis job: {str(e)}")
+    
+    async def set_analysis_job_result(self, job_id: str, result: Dict[str, Any],
+                                      expire_seconds: int = 3600):
+        """Store the result of a job whose analysis is not cached"""
+        try:
+            await self.binary_client.setex(f"analysis:job:{job_id}:result", expire_seconds,
+                                           encode_analysis(result))
+            
+        except Exception as e:
+            logger.error(f"Error storing analysis job result: {str(e)}")
+            raise e
+    
+    async def get_analysis_job_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            payload = await self.binary_client.get(f"analysis:job:{job_id}:result")
+            return decode_analysis(payload) if payload else None
+            
+        except Exception as e:
+            logger.error(f"Error retrieving analysis job result: {str(e)}")
             return None
     
     async def set_realtime_audio_data(self, user_id: str, audio_data: Dict[str, Any], 
-                                    expire_seconds: int = 5):
-        """Store real-time audio data"""
+                                    expire_seconds: int = 5, payload: Optional[bytes] = None):
+        """Store real-time audio data, reusing an already encoded frame payload if given"""
         try:
             key = f"audio:{user_id}:latest"
-            await self.client.setex(key, expire_seconds, json.dumps(audio_data))
+            if payload is None:
+                payload = encode_frame(audio_data, "json")
+            await self.binary_client.setex(key, expire_seconds, payload)
+            self.local_cache.put(key, audio_data, size=len(payload), ttl=expire_seconds)
             
         except Exception as e:
             logger.error(f"Error storing real-time audio data: {str(e)}")
@@ -76,34 +309,88 @@ class RedisClient:
         """Retrieve real-time audio data"""
         try:
             key = f"audio:{user_id}:latest"
-            result = await self.client.get(key)
+            result = self.local_cache.get(key)
+            if result is not None:
+                return result
             
-            if result:
-                return json.loads(result)
+            payload = await self.binary_client.get(key)
+            if payload:
+                return decode_frame(payload)
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving real-time audio data: {str(e)}")
             return None
     
-    async def publish_audio_data(self, channel: str, audio_data: Dict[str, Any]):
-        """Publish audio data to Redis channel"""
+    async def publish_audio_data(self, channel: str, audio_data: Dict[str, Any],
+                                 payload: Optional[bytes] = None):
+        """Publish audio data to Redis channel, reusing an already encoded frame payload if given"""
         try:
-            await self.client.publish(channel, json.dumps(audio_data))
+            if payload is None:
+                payload = encode_frame(audio_data, "json")
+            await self.binary_client.publish(channel, payload)
             
         except Exception as e:
             logger.error(f"Error publishing audio data: {str(e)}")
     
+    async def write_live_frame(self, channel: str, user_id: str, audio_data: Dict[str, Any],
+                               payload: bytes, expire_seconds: int = 5):
+        """Publish a live frame and store it as the user's latest, batched with other frames"""
+        key = f"audio:{user_id}:latest"
+        self.local_cache.put(key, audio_data, size=len(payload), ttl=expire_seconds)
+        
+        if len(self._pending_frames) == self._pending_frames.maxlen:
+            self.live_frames_dropped += 1
+        self._pending_frames.append((channel, key, payload, expire_seconds))
+        
+        if self.live_flush_interval <= 0:
+            await self._flush_live_frames()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._run_live_flush())
+    
+    async def _run_live_flush(self):
+        while True:
+            await asyncio.sleep(self.live_flush_interval)
+            if self._pending_frames:
+                await self._flush_live_frames()
+    
+    async def _flush_live_frames(self):
+        """Write all pending frames in one pipelined round trip"""
+        batch: List[Tuple[str, str, bytes, int]] = []
+        while self._pending_frames:
+            batch.append(self._pending_frames.popleft())
+        
+        self._flush_started = time.monotonic()
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            latest: Dict[str, Tuple[bytes, int]] = {}
+            for channel, key, payload, expire_seconds in batch:
+                pipe.publish(channel, payload)
+                latest[key] = (payload, expire_seconds)
+            # Only the newest frame per key matters for the latest-value keys
+            for key, (payload, expire_seconds) in latest.items():
+                pipe.setex(key, expire_seconds, payload)
+            await pipe.execute()
+            self.live_frames_written += len(batch)
+            self.live_flushes += 1
+            
+        except Exception as e:
+            self.live_frames_dropped += len(batch)
+            logger.error(f"Error writing live frames: {str(e)}")
+        finally:
+            self.live_flush_ms = (time.monotonic() - self._flush_started) * 1000
+            self._flush_started = None
+    
     async def subscribe_to_audio_channel(self, channel: str, callback_func):
-        """Subscribe to audio data channel"""
+        """Subscribe to audio data channel (binary or JSON frames)"""
         try:
-            self.pubsub = self.client.pubsub()
+            self.pubsub = self.binary_client.pubsub()
             await self.pubsub.subscribe(channel)
             
             async for message in self.pubsub.listen():
                 if message['type'] == 'message':
                     try:
-                        audio_data = json.loads(message['data'])
+                        audio_data = decode_frame(message['data'])
                         await callback_func(audio_data)
                     except Exception as e:
                         logger.error(f"Error processing audio message: {str(e)}")
@@ -181,14 +468,19 @@ class RedisClient:
         try:
             key = f"chat:{room_id}:history"
             
+            # Add, trim and expire in a single round trip
+            pipe = self.client.pipeline(transaction=True)
+            
             # Add message to list
-            await self.client.lpush(key, json.dumps(message))
+            pipe.lpush(key, json.dumps(message))
             
             # Trim to max messages
-            await self.client.ltrim(key, 0, max_messages - 1)
+            pipe.ltrim(key, 0, max_messages - 1)
             
             # Set expiration (24 hours)
-            await self.client.expire(key, 86400)
+            pipe.expire(key, 86400)
+            
+            await pipe.execute()
             
         except Exception as e:
             logger.error(f"Error storing chat message: {str(e)}")
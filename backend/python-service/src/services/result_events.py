@@ -0,0 +1,45 @@
+import json
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from src.services.analysis_cache import RESULT_METADATA
+
+# Array fields sent as their own events, smallest first; every other result
+# field is a scalar sent in "scalars" events ahead of them
+ARRAY_EVENT_GROUPS = (
+    ("events", ("onset_times", "beat_times")),
+    ("spectral_centroid", ("spectral_centroid",)),
+    ("chroma", ("chroma",)),
+    ("segment_pitches", ("segment_pitches",)),
+    ("mfcc", ("mfcc",)),
+    ("segment_timbre", ("segment_timbre",)),
+)
+
+# Sent with the final "done" event
+DONE_FIELDS = RESULT_METADATA + ("timeline_fps", "timeline_frames")
+
+_ARRAY_FIELDS = {field for _, fields in ARRAY_EVENT_GROUPS for field in fields}
+
+
+def result_events(values: Dict[str, Any], sent: Set[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(event, fields) groups of the result fields not in sent, scalars first and matrices last.
+
+    The fields yielded are added to sent, so partial results followed by the
+    full result send every field once.
+    """
+    scalars = {
+        field: value for field, value in values.items()
+        if field not in sent and field not in _ARRAY_FIELDS and field not in DONE_FIELDS
+    }
+    groups = [("scalars", scalars)] + [
+        (event, {field: values[field] for field in fields if field in values and field not in sent})
+        for event, fields in ARRAY_EVENT_GROUPS
+    ]
+    for event, group in groups:
+        if group:
+            sent.update(group)
+            yield event, group
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Track-level values derived from per-frame features; computed for many
+# tracks at once by summarize_tracks
+SUMMARY_FIELDS = ("key", "energy", "valence", "danceability", "loudness")
+
+KEY_NAMES = np.array(['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'])
+
+# Chroma bins of the C major and C minor scales
+MAJOR_BINS = [0, 2, 4, 5, 7, 9, 11]  # C, D, E, F, G, A, B
+MINOR_BINS = [0, 2, 3, 5, 7, 8, 10]  # C, D, Eb, F, G, Ab, Bb
+
+
+def _segment_reduce(ufunc: np.ufunc, flat: np.ndarray, offsets: np.ndarray, lengths: np.ndarray,
+                    empty: float = 0.0) -> np.ndarray:
+    """ufunc.reduceat over consecutive segments of flat; empty segments give ``empty``.
+
+    reduceat cannot express an empty segment: it returns the next element
+    instead, or fails when the segment is at the end, so only the non-empty
+    segments are reduced.
+    """
+    result = np.full(len(lengths), empty, dtype=np.float64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        result[nonempty] = ufunc.reduceat(flat, offsets[nonempty])
+    return result
+
+
+def _segment_means(arrays: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Mean of each array (0 if empty) in one reduction, plus (concatenation, offsets, lengths)"""
+    lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    flat = np.concatenate(arrays).astype(np.float64)
+    return _segment_reduce(np.add, flat, offsets, lengths) / np.maximum(lengths, 1), flat, offsets, lengths
+
+
+def summarize_tracks(inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Key, energy, valence, danceability and loudness of many tracks as stacked array operations.
+
+    Each input holds a track's frame "rms", and when needed its "chroma_mean"
+    (12 bins), "tempo" and frame "spectral_centroid"; "fields" lists the
+    summary fields to return for it. Ragged per-frame arrays are reduced with
+    one segmented reduction over their concatenation; a track without frames
+    is summarized as silence.
+    """
+    if not inputs:
+        return []
+
+    # Energy: mean frame RMS
+    energy, rms, offsets, lengths = _segment_means([item["rms"] for item in inputs])
+
+    # Loudness: mean frame level in dB, floored 80 dB below the loudest frame
+    # (librosa.amplitude_to_db with ref=1.0, amin=1e-5, top_db=80); a track
+    # without frames is as quiet as silence
+    db = 20 * np.log10(np.maximum(rms, 1e-5))
+    floor = _segment_reduce(np.maximum, db, offsets, lengths) - 80.0
+    loudness = _segment_reduce(np.add, np.maximum(db, np.repeat(floor, lengths)), offsets, lengths,
+                               empty=-100.0) / np.maximum(lengths, 1)
+
+    summaries: List[Dict[str, Any]] = [{} for _ in inputs]
+    tonal = [i for i, item in enumerate(inputs) if item.get("chroma_mean") is not None]
+    if tonal:
+        chroma_mean = np.stack([inputs[i]["chroma_mean"] for i in tonal])
+        keys = KEY_NAMES[np.argmax(chroma_mean, axis=1)]
+        # Higher energy and major key = more positive
+        mode = chroma_mean[:, MAJOR_BINS].mean(axis=1) - chroma_mean[:, MINOR_BINS].mean(axis=1)
+        valence = np.clip(mode * 0.5 + energy[tonal] * 0.5, 0, 1)
+        for row, i in enumerate(tonal):
+            summaries[i]["key"] = str(keys[row])
+            summaries[i]["valence"] = float(valence[row])
+
+    danceable = [i for i, item in enumerate(inputs) if item.get("spectral_centroid") is not None]
+    if danceable:
+        tempo = np.array([inputs[i]["tempo"] for i in danceable], dtype=np.float64)
+        brightness, _, _, _ = _segment_means([inputs[i]["spectral_centroid"] for i in danceable])
+        # Tempo score peaks at 115 BPM; brightness is the mean centroid over 4 kHz
+        danceability = np.clip(
+            (1.0 - np.abs(tempo - 115) / 115) * 0.4
+            + np.minimum(energy[danceable] * 2, 1.0) * 0.4
+            + brightness / 4000 * 0.2,
+            0, 1
+        )
+        for row, i in enumerate(danceable):
+            summaries[i]["danceability"] = float(danceability[row])
+
+    for i, item in enumerate(inputs):
+        summaries[i]["energy"] = float(energy[i])
+        summaries[i]["loudness"] = float(loudness[i])
+        summaries[i] = {field: summaries[i][field] for field in item["fields"] if field in summaries[i]}
+    return summaries
@@ -0,0 +1,219 @@
+import math
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.fft
+
+from src.services.frame_codec import SPECTRUM_DB_RANGE
+from src.services.realtime_processor import FREQUENCY_BANDS, RealtimeFrameProcessor
+
+# Versioned magic prefix for binary visualization timelines
+TIMELINE_MAGIC = b"MVT2"
+
+# Timelines cached before records carried the beat clock; still read, without it
+LEGACY_TIMELINE_MAGIC = b"MVT1"
+
+# Beat clock fields of each record, as in live frames
+TIMELINE_BEAT_FIELDS = ("bpm", "beat_phase", "beat_confidence")
+
+# magic, sample rate, frames per second, hop length, first frame index, frame
+# count, spectrum bins and waveform points per record
+TIMELINE_HEADER = struct.Struct("<4sIfIIIII")
+
+
+def timeline_record_dtype(spectrum_bins: int, waveform_points: int,
+                          beat_clock: bool = True) -> np.dtype:
+    """Fixed-stride record for one frame; frame i starts at header + i * itemsize.
+
+    Legacy MVT1 records have no beat clock fields.
+    """
+    return np.dtype([
+        *((name, "<f4") for name, _, _ in FREQUENCY_BANDS),
+        ("overall_volume", "<f4"),
+        ("energy_level", "<f4"),
+        ("beat_detected", "u1"),
+        *((name, "<f4") for name in (TIMELINE_BEAT_FIELDS if beat_clock else ())),
+        # Loudest spectrum bin and waveform peak the quantized arrays are relative to
+        ("spectrum_reference", "<f4"),
+        ("waveform_peak", "<f4"),
+        ("spectrum", "u1", (spectrum_bins,)),
+        ("waveform", "i1", (waveform_points,)),
+    ])
+
+
+def parse_timeline_header(header: bytes) -> Dict[str, Any]:
+    (magic, sample_rate, fps, hop_length, start_frame, n_frames, spectrum_bins,
+     waveform_points) = TIMELINE_HEADER.unpack_from(header)
+    if magic not in (TIMELINE_MAGIC, LEGACY_TIMELINE_MAGIC):
+        raise ValueError("Not a visualization timeline")
+    beat_clock = magic == TIMELINE_MAGIC
+    return {
+        "sample_rate": sample_rate,
+        "fps": fps,
+        "hop_length": hop_length,
+        "start_frame": start_frame,
+        "n_frames": n_frames,
+        "spectrum_bins": spectrum_bins,
+        "waveform_points": waveform_points,
+        "beat_clock": beat_clock,
+        "record_size": timeline_record_dtype(spectrum_bins, waveform_points, beat_clock).itemsize
+    }
+
+
+def pack_timeline_header(info: Dict[str, Any], start_frame: int, n_frames: int) -> bytes:
+    """Header for a window of n_frames records starting at start_frame"""
+    return TIMELINE_HEADER.pack(
+        TIMELINE_MAGIC if info.get("beat_clock", True) else LEGACY_TIMELINE_MAGIC,
+        info["sample_rate"], info["fps"], info["hop_length"], start_frame, n_frames,
+        info["spectrum_bins"], info["waveform_points"]
+    )
+
+
+def timeline_window(info: Dict[str, Any], start: float = 0,
+                    duration: Optional[float] = None) -> Tuple[int, int]:
+    """[start_frame, end_frame) of the records covering a window in seconds"""
+    start_frame = min(max(int(start * info["fps"]), 0), info["n_frames"])
+    end_frame = info["n_frames"] if duration is None else \
+        min(max(math.ceil((start + duration) * info["fps"]), start_frame), info["n_frames"])
+    return start_frame, end_frame
+
+
+def decode_timeline(payload: bytes) -> List[Dict[str, Any]]:
+    """Frames of a timeline (or window) in the RealtimeAudioData layout"""
+    info = parse_timeline_header(payload)
+    records = np.frombuffer(
+        payload,
+        dtype=timeline_record_dtype(info["spectrum_bins"], info["waveform_points"], info["beat_clock"]),
+        count=info["n_frames"], offset=TIMELINE_HEADER.size
+    )
+
+    db = records["spectrum"].astype(np.float32) * (SPECTRUM_DB_RANGE / 255) - SPECTRUM_DB_RANGE
+    spectrum = records["spectrum_reference"][:, np.newaxis] * np.power(10, db / 20)
+    spectrum[records["spectrum"] == 0] = 0
+    waveform = records["waveform"].astype(np.float32) * (records["waveform_peak"][:, np.newaxis] / 127)
+
+    frames = []
+    for i, record in enumerate(records):
+        frame = {
+            "timestamp": (info["start_frame"] + i) / info["fps"],
+            "frequency_data": spectrum[i].tolist(),
+            "time_domain_data": waveform[i].tolist(),
+            **{name: float(record[name]) for name, _, _ in FREQUENCY_BANDS},
+            "overall_volume": float(record["overall_volume"]),
+            "beat_detected": bool(record["beat_detected"]),
+            "energy_level": float(record["energy_level"])
+        }
+        if info["beat_clock"]:
+            frame.update((name, float(record[name])) for name in TIMELINE_BEAT_FIELDS)
+        frames.append(frame)
+    return frames
+
+
+class TimelineBuilder:
+    """Dense per-frame visualization timeline of a decoded track.
+
+    Frames are the live analysis frames (frame_size samples every hop_length)
+    with the same band weights, volume and energy definitions as
+    RealtimeFrameProcessor, computed for all frames of a block at once. The
+    spectrum is pooled to spectrum_bins and stored as 8-bit dB levels, the
+    waveform subsampled to waveform_points int8 values, and beat_detected
+    marks frames containing a tracked beat. The beat clock fields of live
+    frames come from the tracked beats: bpm from the surrounding beat
+    interval, beat_phase as the fraction of it elapsed, and beat_confidence
+    1 between the first and last beat (0 outside, where the nearest interval
+    is extrapolated). Feed samples in order, then call finish() for the
+    encoded timeline.
+    """
+
+    def __init__(self, sr: int, frame_size: int = 1024, hop_length: Optional[int] = None,
+                 spectrum_bins: int = 64, waveform_points: int = 64):
+        self.sr = sr
+        self.frame_size = frame_size
+        self.hop_length = hop_length or frame_size
+        self.processor = RealtimeFrameProcessor(sr, frame_size)
+        self.spectrum_bins = min(spectrum_bins, self.processor.n_bins)
+        self.waveform_points = min(waveform_points, frame_size)
+        self.dtype = timeline_record_dtype(self.spectrum_bins, self.waveform_points)
+
+        # Pooling edges over the live spectrum bins and waveform sample positions
+        self._bin_edges = np.linspace(0, self.processor.n_bins, self.spectrum_bins + 1).astype(int)
+        self._wave_index = np.linspace(0, frame_size, self.waveform_points, endpoint=False).astype(int)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._records: List[np.ndarray] = []
+        self.n_samples = 0
+
+    @property
+    def fps(self) -> float:
+        return self.sr / self.hop_length
+
+    def feed(self, samples: np.ndarray):
+        self.n_samples += len(samples)
+        self._pending = np.concatenate((self._pending, samples.astype(np.float32, copy=False)))
+        n_frames = (len(self._pending) - self.frame_size) // self.hop_length + 1
+        if n_frames <= 0:
+            return
+        self._records.append(self._analyze(self._pending, n_frames))
+        self._pending = self._pending[n_frames * self.hop_length:]
+
+    def finish(self, beat_times: Optional[np.ndarray] = None) -> bytes:
+        """Flush the zero-padded tail frames, mark beats and encode the timeline"""
+        total = int(np.ceil(self.n_samples / self.hop_length))
+        done = sum(len(records) for records in self._records)
+        if total > done:
+            tail = np.zeros((total - done - 1) * self.hop_length + self.frame_size, dtype=np.float32)
+            tail[:len(self._pending)] = self._pending[:len(tail)]
+            self._records.append(self._analyze(tail, total - done))
+        self._pending = np.zeros(0, dtype=np.float32)
+
+        records = np.concatenate(self._records) if self._records else np.zeros(0, dtype=self.dtype)
+        if beat_times is not None and len(records):
+            beat_frames = np.floor(np.asarray(beat_times) * self.fps).astype(int)
+            records["beat_detected"][beat_frames[(beat_frames >= 0) & (beat_frames < len(records))]] = 1
+            self._beat_clock(records, np.asarray(beat_times, dtype=np.float64))
+
+        header = TIMELINE_HEADER.pack(
+            TIMELINE_MAGIC, self.sr, self.fps, self.hop_length, 0, len(records),
+            self.spectrum_bins, self.waveform_points
+        )
+        return header + records.tobytes()
+
+    def _beat_clock(self, records: np.ndarray, beat_times: np.ndarray):
+        if len(beat_times) < 2:
+            return
+        t = np.arange(len(records)) / self.fps
+        index = np.clip(np.searchsorted(beat_times, t, side="right") - 1, 0, len(beat_times) - 2)
+        period = beat_times[index + 1] - beat_times[index]
+        records["bpm"] = 60 / period
+        records["beat_phase"] = np.mod((t - beat_times[index]) / period, 1.0)
+        records["beat_confidence"] = (t >= beat_times[0]) & (t < beat_times[-1])
+
+    def _analyze(self, samples: np.ndarray, n_frames: int) -> np.ndarray:
+        frames = np.lib.stride_tricks.as_strided(
+            samples, shape=(n_frames, self.frame_size),
+            strides=(samples.strides[0] * self.hop_length, samples.strides[0])
+        )
+        records = np.zeros(n_frames, dtype=self.dtype)
+
+        magnitude = np.abs(scipy.fft.rfft(frames, axis=1)[:, :self.processor.n_bins])
+        band_levels = magnitude @ self.processor.band_weights.T
+        for index, (name, _, _) in enumerate(FREQUENCY_BANDS):
+            records[name] = band_levels[:, index]
+        energy = np.einsum("ij,ij->i", frames, frames)
+        records["overall_volume"] = np.sqrt(energy / self.frame_size)
+        records["energy_level"] = np.abs(frames).mean(axis=1)
+
+        pooled = np.add.reduceat(magnitude, self._bin_edges[:-1], axis=1) / np.diff(self._bin_edges)
+        reference = pooled.max(axis=1)
+        safe_reference = np.where(reference > 0, reference, 1)[:, np.newaxis]
+        db = 20 * np.log10(np.maximum(pooled, safe_reference * 1e-10) / safe_reference)
+        levels = np.clip(np.rint((db + SPECTRUM_DB_RANGE) * (255 / SPECTRUM_DB_RANGE)), 0, 255)
+        levels[reference <= 0] = 0
+        records["spectrum"] = levels
+        records["spectrum_reference"] = reference
+
+        waveform = frames[:, self._wave_index]
+        peak = np.abs(waveform).max(axis=1)
+        records["waveform"] = np.rint(waveform * (127 / np.where(peak > 0, peak, 1))[:, np.newaxis])
+        records["waveform_peak"] = peak
+        return records
@@ -7,7 +7,9 @@ Run this to test the audio analysis capabilities
 import asyncio
 import numpy as np
 import librosa
+from src.services.analysis_cache import content_hash
 from src.services.audio_analyzer import AudioAnalyzer
+from src.services.live_sessions import LiveSessionManager
 from src.services.redis_client import RedisClient
 import time
 
@@ -60,44 +62,39 @@ async def test_audio_analysis():
         
         # Test 4: Test Redis caching
         print("\n💾 Testing Redis caching...")
-        test_url = "test://audio/sample.wav"
-        await redis_client.set_analysis_result(test_url, features)
+        test_hash = content_hash(test_signal, sample_rate, audio_analyzer.config)
+        await redis_client.set_analysis_result(test_hash, features)
         
         # Retrieve from cache
-        cached_result = await redis_client.get_analysis_result(test_url)
+        cached_result = await redis_client.get_analysis_result(test_hash)
         if cached_result:
             print("✅ Successfully cached and retrieved analysis result")
         else:
             print("❌ Failed to retrieve cached result")
         
-        # Test 5: Test real-time audio processing (if microphone available)
+        # Test 5: Test real-time audio processing on a generated click track
         print("\n🎤 Testing real-time audio processing...")
-        if devices:
-            print("Starting live analysis for 5 seconds...")
-            
-            realtime_data_received = []
-            
-            async def test_callback(audio_data):
-                realtime_data_received.append(audio_data)
-                print(f"📊 Received audio data: Bass={audio_data['bass_level']:.3f}, "
-                      f"Mid={audio_data['mid_level']:.3f}, Treble={audio_data['treble_level']:.3f}")
-            
-            try:
-                # Start live analysis
-                audio_analyzer.start_live_analysis(test_callback)
-                
-                # Wait for 5 seconds
-                await asyncio.sleep(5)
-                
-                # Stop analysis
-                audio_analyzer.stop_live_analysis()
-                
-                print(f"✅ Received {len(realtime_data_received)} audio samples")
-                
-            except Exception as e:
-                print(f"⚠️ Live analysis test skipped (no microphone or permission issue): {e}")
-        else:
-            print("⚠️ No audio devices available for live testing")
+        print("Starting a live session on a 120 BPM click track for 5 seconds...")
+        
+        realtime_data_received = []
+        
+        async def test_callback(session_id, audio_data):
+            realtime_data_received.append(audio_data)
+            print(f"📊 Received audio data: Bass={audio_data['bass_level']:.3f}, "
+                  f"Mid={audio_data['mid_level']:.3f}, Treble={audio_data['treble_level']:.3f}, "
+                  f"BPM={audio_data['bpm']:.1f}")
+        
+        live_sessions = LiveSessionManager(test_callback)
+        try:
+            live_sessions.start_session("test", source="signal", sample_rate=sample_rate,
+                                        source_options={"signal": "clicks"})
+            await asyncio.sleep(5)
+        finally:
+            live_sessions.shutdown()
+        
+        if not realtime_data_received:
+            raise RuntimeError("No live frames received")
+        print(f"✅ Received {len(realtime_data_received)} audio samples")
         
         print("\n🎉 All tests completed successfully!")
         
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_track, write_wav
+
+SAMPLE_RATE = 22050
+
+
+@pytest.fixture(scope="session")
+def track() -> np.ndarray:
+    """Ten seconds of the deterministic 120 BPM benchmark signal"""
+    return synthetic_track(10.0, SAMPLE_RATE)
+
+
+@pytest.fixture
+def track_file(tmp_path, track) -> str:
+    path = str(tmp_path / "track.wav")
+    write_wav(path, track, SAMPLE_RATE)
+    return path
+
+
+class MemoryRedis:
+    """The RedisClient methods AnalysisCache uses, over dicts"""
+
+    def __init__(self):
+        self.results = {}
+        self.aliases = {}
+
+    async def get_analysis_result(self, key):
+        return self.results.get(key)
+
+    async def set_analysis_result(self, key, result, expire_seconds):
+        self.results[key] = result
+
+    async def get_analysis_alias(self, alias):
+        return self.aliases.get(alias)
+
+    async def set_analysis_alias(self, alias, file_hash, expire_seconds):
+        self.aliases[alias] = file_hash
+
+    async def has_timeline(self, file_hash):
+        return False
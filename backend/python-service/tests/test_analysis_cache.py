@@ -0,0 +1,164 @@
+import asyncio
+import os
+
+import pytest
+
+from src.services.analysis_cache import AnalysisCache, SharedTempFile, SingleFlight, source_hash
+from tests.conftest import MemoryRedis
+
+
+class StubAnalyzer:
+    """Counts decodes and analyses; every path has the same content unless listed in hashes"""
+
+    def __init__(self, delay=0.05, hashes=None):
+        self.delay = delay
+        self.hashes = hashes or {}
+        self.decoded = []
+        self.analyzed = []
+        self.discarded = []
+
+    async def hash_audio(self, file_path, progress=None):
+        self.decoded.append(file_path)
+        await asyncio.sleep(self.delay)
+        return self.hashes.get(file_path, "content")
+
+    async def analyze_file(self, file_path, analysis_type, timeline, summarize, progress,
+                           content_hash=None):
+        self.analyzed.append((file_path, content_hash))
+        await asyncio.sleep(self.delay)
+        return {"bpm": 120.0}
+
+    def discard_decoded(self, content_hash=None):
+        self.discarded.append(content_hash)
+
+
+def test_single_flight_coalesces():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+        assert results == [1] * 5
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+        assert await flight.do("key", compute) == 2
+
+    asyncio.run(main())
+
+
+def test_single_flight_survives_cancelled_caller():
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("key", lambda: asyncio.sleep(0.05, "done")))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await flight.do("key", lambda: asyncio.sleep(0, "restarted")) == "done"
+        assert flight.coalesced == 1
+
+    asyncio.run(main())
+
+
+def test_concurrent_requests_analyze_once():
+    async def main():
+        cache, analyzer = AnalysisCache(MemoryRedis()), StubAnalyzer()
+        results = await asyncio.gather(
+            cache.analyze(analyzer, "/tmp/a.wav", source="https://example.com/a.mp3"),
+            cache.analyze(analyzer, "/tmp/a.wav", source="https://example.com/a.mp3"),
+            cache.analyze(analyzer, "/tmp/b.wav")
+        )
+        assert all(result["content_hash"] == "content" for result in results)
+        # Same source coalesces the decode; same content coalesces the analysis
+        assert len(analyzer.decoded) == 2
+        assert analyzer.analyzed == [("/tmp/a.wav", "content")]
+        assert cache.stats()["coalesced"] == 3
+
+    asyncio.run(main())
+
+
+def test_alias_hit_skips_decode():
+    async def main():
+        redis = MemoryRedis()
+        cache, analyzer = AnalysisCache(redis), StubAnalyzer(delay=0)
+        source = "https://example.com/a.mp3"
+        first = await cache.analyze(analyzer, "/tmp/a.wav", source=source)
+        assert redis.aliases == {source_hash(source): "content"}
+
+        second = await cache.analyze(analyzer, "/tmp/other.wav", source=source)
+        assert second == first
+        assert analyzer.decoded == ["/tmp/a.wav"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # A projected analysis type is served from the cached full result
+        tempo = await cache.analyze(analyzer, "/tmp/a.wav", source=source, analysis_type="tempo_only")
+        assert tempo["analysis_type"] == "tempo_only"
+        assert len(analyzer.analyzed) == 1
+
+    asyncio.run(main())
+
+
+def test_content_hit_discards_decoded_samples():
+    async def main():
+        cache, analyzer = AnalysisCache(MemoryRedis()), StubAnalyzer(delay=0)
+        await cache.analyze(analyzer, "/tmp/a.wav")
+        assert analyzer.discarded == []
+        # Same content under another path: decoded to hash it, then served from the cache
+        result = await cache.analyze(analyzer, "/tmp/copy.wav")
+        assert result["content_hash"] == "content"
+        assert analyzer.discarded == ["content"]
+        assert len(analyzer.analyzed) == 1
+
+    asyncio.run(main())
+
+
+def test_uncached_results_skip_alias():
+    async def main():
+        redis = MemoryRedis()
+        cache = AnalysisCache(redis)
+        await cache.analyze(StubAnalyzer(delay=0), "/tmp/a.wav", source="a.mp3", cache_result=False)
+        assert redis.results == {} and redis.aliases == {}
+
+    asyncio.run(main())
+
+
+def test_temp_file_outlives_cancelled_request(tmp_path):
+    path = tmp_path / "upload.wav"
+    path.write_bytes(b"RIFF")
+
+    async def main():
+        cache, analyzer = AnalysisCache(MemoryRedis()), StubAnalyzer(delay=0)
+        decoding = asyncio.Event()
+        hash_audio = analyzer.hash_audio
+
+        async def gated_hash_audio(file_path, progress=None):
+            await decoding.wait()
+            return await hash_audio(file_path, progress)
+
+        analyzer.hash_audio = gated_hash_audio
+        temp = SharedTempFile(str(path))
+        request = asyncio.ensure_future(cache.analyze(analyzer, str(path), temp=temp))
+        await asyncio.sleep(0)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        temp.release()
+        # The shielded decode flight still reads the file
+        assert path.exists()
+
+        decoding.set()
+        await asyncio.wait_for(asyncio.gather(*cache._decodes._calls.values()), 1)
+        await asyncio.sleep(0)
+        assert not path.exists()
+
+    asyncio.run(main())
+
+
+def test_temp_file_released_without_flights(tmp_path):
+    path = tmp_path / "upload.wav"
+    path.write_bytes(b"RIFF")
+    SharedTempFile(str(path)).release()
+    assert not os.path.exists(path)
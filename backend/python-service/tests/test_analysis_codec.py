@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.services.analysis_codec import ANALYSIS_MAGIC, decode_analysis, encode_analysis
+
+
+@pytest.fixture
+def analysis():
+    rng = np.random.default_rng(0)
+    mfcc = rng.standard_normal((13, 40)).tolist()
+    chroma = rng.uniform(0, 1, (12, 40)).tolist()
+    return {
+        "bpm": 120.5,
+        "key": "A minor",
+        "beat_times": [0.5, 1.0, 1.5],
+        "mfcc": mfcc,
+        "chroma": chroma,
+        "segment_timbre": mfcc,
+        "segment_pitches": chroma,
+        "ragged": [[1, 2], [3]],
+    }
+
+
+def test_round_trip(analysis):
+    payload = encode_analysis(analysis)
+    assert payload.startswith(ANALYSIS_MAGIC)
+
+    decoded = decode_analysis(payload)
+    assert decoded.keys() == analysis.keys()
+    assert decoded["bpm"] == analysis["bpm"]
+    assert decoded["key"] == analysis["key"]
+    assert decoded["ragged"] == analysis["ragged"]
+    np.testing.assert_allclose(decoded["beat_times"], analysis["beat_times"], rtol=1e-7)
+    np.testing.assert_allclose(decoded["mfcc"], analysis["mfcc"], rtol=1e-6)
+    # float16 fields are bounded to [0, 1]
+    np.testing.assert_allclose(decoded["chroma"], analysis["chroma"], atol=1e-3)
+
+
+def test_aliases_stored_once(analysis):
+    distinct = {**analysis, "segment_timbre": (np.asarray(analysis["mfcc"]) + 1).tolist()}
+    assert len(encode_analysis(analysis)) < len(encode_analysis(distinct))
+
+    decoded = decode_analysis(encode_analysis(analysis))
+    assert decoded["segment_timbre"] == decoded["mfcc"]
+    assert decoded["segment_pitches"] == decoded["chroma"]
+
+
+def test_differing_alias_is_stored():
+    analysis = {"mfcc": [[1.0, 2.0]], "segment_timbre": [[3.0, 4.0]]}
+    assert decode_analysis(encode_analysis(analysis)) == analysis
+
+
+def test_int_and_bool_fields_keep_their_type():
+    analysis = {
+        "beat_frames": [12, 34, 56],
+        "large": [2 ** 40, -(2 ** 40)],
+        "segment_counts": np.array([[1, 2], [3, 4]], dtype=np.uint16),
+        "voiced": [True, False, True],
+        "mask": np.array([[False, True]]),
+    }
+    decoded = decode_analysis(encode_analysis(analysis))
+    assert decoded == {
+        "beat_frames": [12, 34, 56],
+        "large": [2 ** 40, -(2 ** 40)],
+        "segment_counts": [[1, 2], [3, 4]],
+        "voiced": [True, False, True],
+        "mask": [[False, True]],
+    }
+    assert all(type(value) is int for value in decoded["beat_frames"] + decoded["large"])
+    assert all(type(value) is bool for value in decoded["voiced"] + decoded["mask"][0])
+
+
+def test_float_fields_decode_as_float():
+    decoded = decode_analysis(encode_analysis({"rms": [0.5, 1.0], "onset_strength": [[1.0, 2.0]]}))
+    assert decoded == {"rms": [0.5, 1.0], "onset_strength": [[1.0, 2.0]]}
+    assert all(type(value) is float for value in decoded["rms"] + decoded["onset_strength"][0])
+
+
+def test_legacy_json_payload():
+    assert decode_analysis(b'{"bpm": 99.0}') == {"bpm": 99.0}
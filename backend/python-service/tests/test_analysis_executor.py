@@ -0,0 +1,104 @@
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+
+from src.services.analysis_executor import AnalysisExecutor, AnalysisQueueFullError, AnalysisTimeoutError
+
+
+async def wait_idle(executor, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while executor.stats()["in_flight"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return executor.stats()["in_flight"]
+
+
+def test_queue_full_rejects_with_retry_after():
+    release = threading.Event()
+
+    async def main():
+        executor = AnalysisExecutor(max_workers=0, max_queued=1, job_timeout=5, retry_after=7)
+        jobs = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(AnalysisQueueFullError) as error:
+                await executor.run(release.wait)
+            assert error.value.retry_after == 7
+            assert executor.stats()["rejected"] == 1
+        finally:
+            release.set()
+        assert await asyncio.gather(*jobs) == [True, True]
+        assert await wait_idle(executor) == 0
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_queue_full_is_503_with_retry_after(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    async def busy(*args, **kwargs):
+        raise AnalysisQueueFullError(7)
+
+    monkeypatch.setattr(main.analysis_cache, "analyze", busy)
+    response = TestClient(main.app).post("/analyze", json={"file_url": "https://example.com/a.mp3"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_thread_timeout_holds_slot_until_job_returns():
+    release = threading.Event()
+
+    async def main():
+        executor = AnalysisExecutor(max_workers=0, max_queued=0, job_timeout=0.1)
+        try:
+            with pytest.raises(AnalysisTimeoutError):
+                await executor.run(release.wait)
+            # The thread is still running, so its slot stays taken
+            await asyncio.sleep(0.05)
+            assert executor.stats()["in_flight"] == 1
+            with pytest.raises(AnalysisQueueFullError):
+                await executor.run(release.wait)
+        finally:
+            release.set()
+
+        assert await wait_idle(executor) == 0
+        assert await executor.run(math.sqrt, 16) == 4.0
+        stats = executor.stats()
+        assert (stats["timed_out"], stats["completed"], stats["rejected"]) == (1, 1, 1)
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_process_timeout_recycles_pool():
+    async def main():
+        executor = AnalysisExecutor(max_workers=1, max_queued=2, job_timeout=3.0)
+        executor.start()
+        first_pool = executor._pool
+        try:
+            slow = asyncio.ensure_future(executor.run(time.sleep, 60))
+            await asyncio.sleep(2.0)
+            # Queued behind the slow job on the only worker
+            queued = asyncio.ensure_future(executor.run(math.factorial, 10))
+            workers = list(first_pool._processes.values())
+            with pytest.raises(AnalysisTimeoutError):
+                await slow
+
+            # The hung worker was killed: its slot is free and a fresh pool runs the rest
+            assert executor._pool is not first_pool
+            for process in workers:
+                process.join(timeout=1.0)
+                assert not process.is_alive()
+            assert await queued == 3628800
+            assert await wait_idle(executor) == 0
+            stats = executor.stats()
+            assert (stats["timed_out"], stats["failed"], stats["completed"]) == (1, 0, 1)
+        finally:
+            executor.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.analysis_cache import AnalysisCache
+from src.services.analysis_jobs import JOB_STAGES, AnalysisJobManager, MemoryJobBackend
+from tests.conftest import MemoryRedis
+
+URL = "/media/song.wav"
+
+
+class StubExecutor:
+    """Stage event queue of AnalysisExecutor, filled in-process"""
+
+    def __init__(self):
+        self.events = []
+        self.listeners = {}
+
+    def add_progress_listener(self, job_id, listener):
+        self.listeners[job_id] = listener
+
+    def remove_progress_listener(self, job_id):
+        self.listeners.pop(job_id, None)
+
+    def dispatch_progress(self):
+        events, self.events = self.events, []
+        for job_id, stage, timestamp, values in events:
+            if job_id in self.listeners:
+                self.listeners[job_id](stage, timestamp, values)
+
+
+class StubAnalyzer:
+    """Reports the stages of a streaming analysis, which runs spectral before rhythm"""
+
+    def __init__(self, delay=0.02, error=None):
+        self.executor = StubExecutor()
+        self.delay = delay
+        self.error = error
+        self.analyzed = 0
+
+    async def report(self, progress, stage):
+        self.executor.events.append((progress.job_id, stage, time.time(), None))
+        await asyncio.sleep(self.delay)
+
+    async def hash_audio(self, file_path, progress=None):
+        await self.report(progress, "decode")
+        return "content"
+
+    async def analyze_file(self, file_path, analysis_type, timeline, summarize, progress,
+                           content_hash=None):
+        self.analyzed += 1
+        for stage in ("spectral", "rhythm", "summary"):
+            await self.report(progress, stage)
+        if self.error:
+            raise self.error
+        return {"bpm": 120.0}
+
+
+def job_manager(analyzer, concurrency=2):
+    return AnalysisJobManager(MemoryJobBackend(), AnalysisCache(MemoryRedis()), analyzer,
+                              concurrency=concurrency, poll_interval=0.01)
+
+
+async def wait_finished(manager, job_id, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await manager.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_duplicate_submissions_join_live_job():
+    async def main():
+        manager = job_manager(StubAnalyzer())
+        first = await manager.submit(URL)
+        second = await manager.submit(URL)
+        other_type = await manager.submit(URL, analysis_type="tempo_only")
+        assert second["job_id"] == first["job_id"]
+        assert other_type["job_id"] != first["job_id"]
+        stats = await manager.stats()
+        assert (stats["queued"], stats["submitted"], stats["deduplicated"]) == (2, 3, 1)
+
+    asyncio.run(main())
+
+
+def test_cached_source_finishes_immediately():
+    async def main():
+        analyzer = StubAnalyzer()
+        manager = job_manager(analyzer)
+        manager.start()
+        try:
+            job = await wait_finished(manager, (await manager.submit(URL))["job_id"])
+            assert job["status"] == "done"
+            again = await manager.submit(URL)
+        finally:
+            await manager.stop()
+        assert again["job_id"] != job["job_id"]
+        assert again["status"] == "done" and again["content_hash"] == "content"
+        assert analyzer.analyzed == 1
+        job, result = await manager.result(again["job_id"])
+        assert result["bpm"] == 120.0
+
+    asyncio.run(main())
+
+
+def test_stage_reporting():
+    async def main():
+        manager = job_manager(StubAnalyzer())
+        manager.start()
+        try:
+            job = await wait_finished(manager, (await manager.submit(URL))["job_id"])
+            stats = await manager.stats()
+        finally:
+            await manager.stop()
+        assert job["status"] == "done" and job["progress"] == 1.0
+        assert set(job["stages"]) == {"queued", "decode", "spectral", "rhythm", "summary"}
+        assert all(seconds >= 0 for seconds in job["stages"].values())
+        assert job["stages"]["summary"] >= 0.015
+        assert "stage_started_at" not in job
+        assert set(stats["stage_seconds"]) == set(job["stages"])
+        assert stats["stage_seconds"]["decode"]["count"] == 1
+        assert (stats["completed"], stats["failed"], stats["running"]) == (1, 0, 0)
+
+    asyncio.run(main())
+
+
+def test_progress_never_goes_back():
+    manager = job_manager(StubAnalyzer())
+    job = {"job_id": "job", "stage": "queued", "progress": 0.0, "stages": {},
+           "stage_started_at": 100.0}
+    manager._on_progress(job, "spectral", 101.0, None)
+    spectral = job["progress"]
+    assert spectral == pytest.approx(JOB_STAGES.index("spectral") / (len(JOB_STAGES) - 1), abs=1e-3)
+    manager._on_progress(job, "rhythm", 103.0, None)
+    assert job["progress"] == spectral
+    # Early result fields and repeated stages are not stage changes
+    manager._on_progress(job, "rhythm", 104.0, {"bpm": 120.0})
+    manager._on_progress(job, "rhythm", 105.0, None)
+    assert job["stages"] == {"queued": 1.0, "spectral": 2.0}
+    assert job["stage_started_at"] == 103.0
+
+
+def test_failed_job_releases_dedup_claim():
+    async def main():
+        manager = job_manager(StubAnalyzer(delay=0, error=ValueError("bad audio")))
+        manager.start()
+        try:
+            job = await wait_finished(manager, (await manager.submit(URL))["job_id"])
+            retry = await manager.submit(URL)
+        finally:
+            await manager.stop()
+        assert job["status"] == "failed" and job["error"] == "bad audio"
+        assert retry["job_id"] != job["job_id"] and retry["status"] == "queued"
+        assert manager.failed == 1
+
+    asyncio.run(main())
+
+
+def test_same_content_at_two_urls_analyzed_once():
+    async def main():
+        analyzer = StubAnalyzer()
+        manager = job_manager(analyzer)
+        first = await manager.submit(URL)
+        second = await manager.submit("/media/copy-of-song.wav")
+        manager.start()
+        try:
+            jobs = [await wait_finished(manager, job["job_id"]) for job in (first, second)]
+        finally:
+            await manager.stop()
+        # Deduplicated by URL at submission, by content hash in the cache
+        assert first["job_id"] != second["job_id"]
+        assert [job["content_hash"] for job in jobs] == ["content", "content"]
+        assert analyzer.analyzed == 1
+
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from src.services import audio_analyzer as audio_analyzer_module
+from src.services.audio_analyzer import AudioAnalyzer
+from tests.conftest import SAMPLE_RATE
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    analyzer = AudioAnalyzer(sample_rate=SAMPLE_RATE)
+    analyzer.stream_min_seconds = -1
+    decodes = []
+    load_audio_sync = analyzer.load_audio_sync
+
+    def counting_load(file_path):
+        decodes.append(file_path)
+        return load_audio_sync(file_path)
+
+    monkeypatch.setattr(analyzer, "load_audio_sync", counting_load)
+    analyzer.decodes = decodes
+    return analyzer
+
+
+def test_analysis_reuses_hashed_samples(analyzer, track_file):
+    file_hash = analyzer.hash_audio_sync(track_file)
+    result = analyzer.analyze_file_sync(track_file, "tempo_only", content_hash=file_hash)
+    assert result["bpm"] == pytest.approx(120, abs=3)
+    assert analyzer.decodes == [track_file]
+    assert analyzer._last_decoded is None
+
+    # Without a matching hash the file is decoded again
+    analyzer.analyze_file_sync(track_file, "tempo_only", content_hash="other")
+    assert len(analyzer.decodes) == 2
+
+
+def test_discard_only_matching_samples(analyzer, track_file):
+    file_hash = analyzer.hash_audio_sync(track_file)
+    analyzer.discard_decoded("other")
+    assert analyzer._last_decoded is not None
+    analyzer.discard_decoded(file_hash)
+    assert analyzer._last_decoded is None
+    assert analyzer._decoded_expiry is None
+
+
+def test_unclaimed_samples_expire(analyzer, track_file, monkeypatch):
+    monkeypatch.setattr(audio_analyzer_module, "DECODED_HANDOFF_SECONDS", 0.05)
+    file_hash = analyzer.hash_audio_sync(track_file)
+    assert analyzer._last_decoded[1] == file_hash
+    time.sleep(0.2)
+    assert analyzer._last_decoded is None
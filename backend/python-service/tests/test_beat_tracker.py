@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from src.services.live_sources import SignalSource
+from src.services.realtime_processor import RealtimeFrameProcessor
+
+SAMPLE_RATE = 44100
+CHUNK_SIZE = 1024
+FRAME_RATE = SAMPLE_RATE / CHUNK_SIZE
+# Beats fall on whole frames, so they are held to the usual 70 ms
+# beat-tracking tolerance around each click, in frames
+BEAT_TOLERANCE = 0.07 * FRAME_RATE
+
+
+def click_samples(bpm, seconds):
+    blocks = SignalSource(SAMPLE_RATE, CHUNK_SIZE, "clicks", bpm=bpm, seed=0).blocks()
+    return np.concatenate(list(itertools.islice(blocks, int(seconds * FRAME_RATE) + 1)))
+
+
+def track(samples):
+    """Beat fields of every whole frame of samples, as a live session computes them"""
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE)
+    return [processor.process(samples[start:start + CHUNK_SIZE])
+            for start in range(0, len(samples) - CHUNK_SIZE + 1, CHUNK_SIZE)]
+
+
+def click_distance(beat_frames, click_frames):
+    """Distance in frames from each beat to its nearest click"""
+    return np.abs(beat_frames[:, None] - click_frames[None, :]).min(axis=1)
+
+
+@pytest.mark.parametrize("bpm", [90, 120, 174])
+def test_click_track_tempo_and_beat_spacing(bpm):
+    # Slow tempi take longer to settle, so only the last 10 seconds are checked
+    frames = track(click_samples(bpm, 30))
+    settled = int(20 * FRAME_RATE)
+    period = 60 * FRAME_RATE / bpm
+
+    for frame in frames[settled:]:
+        assert frame["bpm"] == pytest.approx(bpm, abs=2)
+        assert frame["beat_confidence"] >= 0.2
+
+    beats = np.array([i for i, frame in enumerate(frames) if frame["beat_detected"] and i >= settled])
+    intervals = np.diff(beats)
+    assert len(beats) >= 10 * bpm / 60 - 1
+    assert intervals.mean() == pytest.approx(period, abs=0.5)
+    assert np.all(np.abs(intervals - period) < 1.5)
+
+    clicks = np.arange(0, 31, 60 / bpm) * FRAME_RATE
+    assert click_distance(beats, clicks).max() <= BEAT_TOLERANCE
+
+
+def test_lost_lock_reanchors_on_shifted_clicks():
+    bpm = 120
+    beat_samples = 60 * SAMPLE_RATE / bpm
+    switch = int(10 * FRAME_RATE) * CHUNK_SIZE
+    shift = int(beat_samples / 2)
+    # Ten seconds of clicks, then the same click track half a beat later
+    samples = click_samples(bpm, 21)
+    frames = track(np.concatenate([samples[:switch], samples[switch + shift:]])[:20 * SAMPLE_RATE])
+
+    switch_frame = switch // CHUNK_SIZE
+    first_click = np.ceil(switch / beat_samples) * beat_samples - shift
+    new_clicks = (first_click + np.arange(25) * beat_samples) / CHUNK_SIZE
+    old_clicks = np.arange(25) * beat_samples / CHUNK_SIZE
+    beats = np.array([i for i, frame in enumerate(frames) if frame["beat_detected"]])
+    before, after = beats[beats < switch_frame], beats[beats >= switch_frame]
+    assert click_distance(before[before > 5 * FRAME_RATE], old_clicks).max() <= BEAT_TOLERANCE
+
+    # The clock keeps the old phase through max_misses off-beat onsets...
+    tracker = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE).beat_tracker
+    held = after[:tracker.max_misses]
+    assert click_distance(held, old_clicks).max() <= BEAT_TOLERANCE
+    assert click_distance(held, new_clicks).min() > 5
+
+    # ...then takes the next onset as a beat and follows the new clicks
+    reanchored = after[tracker.max_misses:]
+    assert reanchored[0] <= switch_frame + (tracker.max_misses + 1) * 60 * FRAME_RATE / bpm
+    assert click_distance(reanchored, new_clicks).max() <= BEAT_TOLERANCE
+    assert np.diff(reanchored).mean() == pytest.approx(60 * FRAME_RATE / bpm, abs=0.5)
+    for frame in frames[switch_frame:]:
+        assert frame["bpm"] == pytest.approx(bpm, abs=2)
+
+
+def test_silence_has_no_tempo_and_reset_clears_lock():
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE)
+    silence = np.zeros(CHUNK_SIZE, dtype=np.float32)
+    for _ in range(50):
+        frame = processor.process(silence)
+        assert not frame["beat_detected"]
+        assert frame["bpm"] == 0.0
+        assert frame["beat_confidence"] == 0.0
+
+    samples = click_samples(120, 10)
+    for start in range(0, len(samples) - CHUNK_SIZE + 1, CHUNK_SIZE):
+        frame = processor.process(samples[start:start + CHUNK_SIZE])
+    assert frame["bpm"] == pytest.approx(120, abs=2)
+
+    processor.beat_tracker.reset()
+    frame = processor.process(silence)
+    assert frame["bpm"] == 0.0
+    assert frame["beat_phase"] == 0.0
+    assert not frame["beat_detected"]
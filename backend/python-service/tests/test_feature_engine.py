@@ -0,0 +1,83 @@
+import librosa
+import numpy as np
+import pytest
+
+from src.services.feature_engine import FeatureEngine, StreamingFeatureEngine
+from tests.conftest import SAMPLE_RATE
+
+SPECTRAL_FEATURES = ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth", "chroma",
+                     "mfcc", "rms", "zero_crossing_rate")
+STREAMED_FEATURES = ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth", "chroma",
+                     "mfcc", "rms", "tempo", "beat_frames", "onset_frames")
+
+
+def assert_close(actual, expected, rtol=1e-5):
+    actual, expected = np.asarray(actual), np.asarray(expected)
+    assert actual.shape == expected.shape
+    # Relative to the feature's scale, so near-zero frames do not dominate
+    assert np.max(np.abs(actual - expected)) <= rtol * np.max(np.abs(expected))
+
+
+@pytest.fixture(scope="module")
+def features(track):
+    return FeatureEngine(track, SAMPLE_RATE).compute(SPECTRAL_FEATURES + (
+        "onset_envelope", "tempo", "beat_frames", "onset_frames", "beat_times"
+    ))
+
+
+def test_spectral_parity(track, features):
+    y, sr = track, SAMPLE_RATE
+    assert_close(features["spectral_centroid"], librosa.feature.spectral_centroid(y=y, sr=sr)[0])
+    assert_close(features["spectral_rolloff"], librosa.feature.spectral_rolloff(y=y, sr=sr)[0])
+    assert_close(features["spectral_bandwidth"], librosa.feature.spectral_bandwidth(y=y, sr=sr)[0])
+    assert_close(features["chroma"], librosa.feature.chroma_stft(y=y, sr=sr))
+    assert_close(features["mfcc"], librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13))
+    assert_close(features["rms"], librosa.feature.rms(y=y)[0])
+    assert_close(features["zero_crossing_rate"], librosa.feature.zero_crossing_rate(y)[0])
+
+
+def test_rhythm_parity(track, features):
+    y, sr = track, SAMPLE_RATE
+    assert_close(features["onset_envelope"], librosa.onset.onset_strength(y=y, sr=sr))
+    tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
+    assert features["tempo"] == pytest.approx(float(np.atleast_1d(tempo)[0]))
+    np.testing.assert_array_equal(features["beat_frames"], beats)
+    np.testing.assert_array_equal(features["onset_frames"], librosa.onset.onset_detect(y=y, sr=sr))
+    assert features["tempo"] == pytest.approx(120, abs=3)
+    np.testing.assert_allclose(features["beat_times"], librosa.frames_to_time(beats, sr=sr))
+
+
+def test_plan_orders_dependencies():
+    assert FeatureEngine.plan(["mfcc"]) == ["magnitude", "power", "mel", "log_mel", "mfcc"]
+    assert FeatureEngine.plan(["mfcc"], available=["log_mel"]) == ["mfcc"]
+    with pytest.raises(ValueError):
+        FeatureEngine.plan(["loudness"])
+
+
+def test_compute_only_requested(track):
+    engine = FeatureEngine(track, SAMPLE_RATE)
+    engine.compute(["rms", "spectral_centroid"])
+    assert "magnitude" in engine.__dict__
+    assert "mel" not in engine.__dict__
+
+
+@pytest.mark.parametrize("block_size", [4096, 44100])
+def test_streaming_matches_one_shot(track, block_size):
+    one_shot = FeatureEngine(track, SAMPLE_RATE).compute(STREAMED_FEATURES)
+    streaming = StreamingFeatureEngine(SAMPLE_RATE, STREAMED_FEATURES, block_frames=64)
+    for start in range(0, len(track), block_size):
+        streaming.feed(track[start:start + block_size])
+    streamed = streaming.finish().compute(STREAMED_FEATURES)
+
+    for name in STREAMED_FEATURES:
+        if name in ("beat_frames", "onset_frames"):
+            np.testing.assert_array_equal(streamed[name], one_shot[name])
+        elif name == "tempo":
+            assert streamed[name] == pytest.approx(one_shot[name])
+        else:
+            assert_close(streamed[name], one_shot[name])
+
+
+def test_streaming_rejects_time_domain_features():
+    with pytest.raises(ValueError):
+        StreamingFeatureEngine(SAMPLE_RATE, ["zero_crossing_rate"])
@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.services.frame_codec import (
+    ENCODING_FLOAT16, FLAG_BEAT, FRAME_BEAT, FRAME_LEVELS, LEGACY_FRAME_HEADER, LEGACY_FRAME_MAGIC,
+    SPECTRUM_DB_RANGE, decode_frame, encode_frame
+)
+from src.services.realtime_processor import RealtimeFrameProcessor
+
+SAMPLE_RATE = 44100
+FRAME_SIZE = 1024
+
+
+def live_frame(spectrum_bands=0):
+    t = np.arange(FRAME_SIZE) / SAMPLE_RATE
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 3000 * t)).astype(np.float32)
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, FRAME_SIZE, spectrum_bands=spectrum_bands)
+    return processor.process(samples)
+
+
+def assert_header_fields(decoded, frame):
+    assert decoded["timestamp"] == frame["timestamp"]
+    for name in FRAME_LEVELS + FRAME_BEAT:
+        assert decoded[name] == pytest.approx(frame[name], rel=1e-6)
+    assert decoded["beat_detected"] == frame["beat_detected"]
+
+
+@pytest.mark.parametrize("beat", [False, True])
+def test_uint8_round_trip(beat):
+    frame = {**live_frame(), "beat_detected": beat, "bpm": 128.0, "beat_phase": 0.25,
+             "beat_confidence": 0.75}
+    decoded = decode_frame(encode_frame(frame, "uint8"))
+    assert_header_fields(decoded, frame)
+
+    spectrum = np.asarray(frame["frequency_data"])
+    loud = spectrum > spectrum.max() * 10 ** (-SPECTRUM_DB_RANGE / 20)
+    # 8-bit dB levels: at most half a 0.38 dB step off within the range
+    error_db = 20 * np.abs(np.log10(decoded["frequency_data"][loud] / spectrum[loud]))
+    assert error_db.max() <= SPECTRUM_DB_RANGE / 255 / 2 + 1e-3
+    waveform = np.asarray(frame["time_domain_data"])
+    np.testing.assert_allclose(decoded["time_domain_data"], waveform,
+                               atol=np.abs(waveform).max() / 127)
+
+
+def test_float16_round_trip():
+    frame = live_frame()
+    decoded = decode_frame(encode_frame(frame, "float16"))
+    assert_header_fields(decoded, frame)
+    np.testing.assert_allclose(decoded["frequency_data"], frame["frequency_data"], rtol=1e-3)
+    np.testing.assert_allclose(decoded["time_domain_data"], frame["time_domain_data"], atol=1e-3)
+
+
+def test_json_round_trip():
+    frame = live_frame()
+    decoded = decode_frame(encode_frame(frame, "json"))
+    assert_header_fields(decoded, frame)
+    np.testing.assert_allclose(decoded["frequency_data"], frame["frequency_data"])
+
+
+def test_band_frames_keep_band_data():
+    frame = live_frame(spectrum_bands=32)
+    assert "frequency_data" not in frame
+    decoded = decode_frame(encode_frame(frame, "uint8"))
+    assert "frequency_data" not in decoded
+    assert len(decoded["band_data"]) == 32
+    np.testing.assert_allclose(decoded["band_data"], frame["band_data"], rtol=0.05)
+
+
+def test_fields_leave_out_arrays():
+    frame = live_frame()
+    decoded = decode_frame(encode_frame(frame, "uint8", fields=("bass_level",)))
+    assert len(decoded["frequency_data"]) == 0
+    assert len(decoded["time_domain_data"]) == 0
+    assert_header_fields(decoded, frame)
+
+    subset = json.loads(encode_frame(frame, "json", fields=("bass_level",)))
+    assert set(subset) == {"timestamp", "bass_level"}
+
+
+def test_legacy_mvf1_frame():
+    frame = live_frame()
+    spectrum = np.asarray(frame["frequency_data"], dtype=np.float32).astype(np.float16)
+    waveform = np.asarray(frame["time_domain_data"], dtype=np.float32).astype(np.float16)
+    payload = LEGACY_FRAME_HEADER.pack(
+        LEGACY_FRAME_MAGIC, frame["timestamp"], *(frame[name] for name in FRAME_LEVELS),
+        FLAG_BEAT, ENCODING_FLOAT16, len(spectrum), len(waveform), 0.0, 0.0
+    ) + spectrum.tobytes() + waveform.tobytes()
+
+    decoded = decode_frame(payload)
+    assert decoded["beat_detected"]
+    for name in FRAME_BEAT:
+        assert decoded[name] == 0.0
+    np.testing.assert_allclose(decoded["frequency_data"], spectrum.astype(np.float32))
@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from src.services.live_pipeline import DSPWorkerPool, DropOldestQueue, LivePipeline, PublishRateController
+from src.services.live_sources import SignalSource
+from src.services.realtime_processor import FREQUENCY_BANDS, RealtimeFrameProcessor, aggregate_frames
+
+SAMPLE_RATE = 44100
+CHUNK_SIZE = 1024
+
+
+def click_pipeline(publish_fps, callback=None):
+    """LivePipeline set up like a live session, recording every analyzed frame"""
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE, hop_length=CHUNK_SIZE, spectrum_bands=16)
+    analyzed = []
+
+    def process(samples):
+        frame = processor.process(samples)
+        analyzed.append(frame)
+        return frame
+
+    async def record(frame):
+        if callback is not None:
+            callback(frame)
+
+    pipeline = LivePipeline(SAMPLE_RATE, CHUNK_SIZE, CHUNK_SIZE, process, record,
+                            publish_fps=publish_fps, aggregate=aggregate_frames)
+    return pipeline, analyzed
+
+
+def test_rate_controller_backs_off_and_recovers():
+    controller = PublishRateController(40.0, min_fps=10.0, max_latency_ms=50.0, max_queued=2,
+                                       cooldown=0.0)
+    assert controller.update(10.0, 0) == 40.0
+    assert controller.update(80.0, 0) == 30.0
+    assert controller.update(10.0, 5) == 22.5
+    for _ in range(5):
+        controller.update(500.0, 0)
+    assert controller.fps == 10.0
+    assert controller.decreases == 5
+
+    # Additive recovery at recovery_fps per second, capped at max_fps
+    controller._last_update -= 1.0
+    assert controller.update(10.0, 0) == pytest.approx(15.0, abs=0.1)
+    controller._last_update -= 60.0
+    assert controller.update(10.0, 0) == 40.0
+
+
+def test_rate_controller_cooldown():
+    controller = PublishRateController(40.0, min_fps=10.0, max_latency_ms=50.0, max_queued=2,
+                                       cooldown=60.0)
+    controller.update(80.0, 0)
+    controller.update(80.0, 0)
+    assert (controller.fps, controller.decreases) == (30.0, 1)
+
+
+def test_aggregate_frames():
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, CHUNK_SIZE, spectrum_bands=16)
+    rng = np.random.default_rng(0)
+    frames = [processor.process((amplitude * rng.uniform(-1, 1, CHUNK_SIZE)).astype(np.float32))
+              for amplitude in (0.1, 0.8, 0.3)]
+    frames[1]["beat_detected"] = True
+    frames[2]["beat_detected"] = False
+
+    aggregated = aggregate_frames(frames)
+    for name, _, _ in FREQUENCY_BANDS:
+        assert aggregated[name] == max(frame[name] for frame in frames)
+    assert aggregated["overall_volume"] == pytest.approx(np.mean([f["overall_volume"] for f in frames]))
+    assert aggregated["energy_level"] == pytest.approx(np.mean([f["energy_level"] for f in frames]))
+    np.testing.assert_array_equal(aggregated["band_data"],
+                                  np.maximum.reduce([f["band_data"] for f in frames]))
+    assert aggregated["beat_detected"]
+    assert aggregated["timestamp"] == frames[-1]["timestamp"]
+
+
+def test_stepped_pipeline_aggregates_clicks():
+    async def main():
+        pipeline, analyzed = click_pipeline(publish_fps=10.0)
+        pipeline.results = DropOldestQueue(1000, asyncio.get_running_loop())
+        source = SignalSource(SAMPLE_RATE, CHUNK_SIZE, signal="clicks", bpm=120.0, seed=0)
+        for block in itertools.islice(source.blocks(), int(5 * SAMPLE_RATE / CHUNK_SIZE)):
+            pipeline.on_audio(block)
+            while pipeline.step():
+                pass
+        published = [await pipeline.results.get() for _ in range(len(pipeline.results))]
+        return pipeline, analyzed, published
+
+    pipeline, analyzed, published = asyncio.run(main())
+    assert pipeline.frames_processed == len(analyzed) == int(5 * SAMPLE_RATE / CHUNK_SIZE)
+    assert pipeline.skipped_samples == 0
+    # About 10 of the ~43 analyzed frames per second, the rest folded into them
+    assert len(published) == pytest.approx(50, abs=1)
+    assert pipeline.frames_aggregated == len(analyzed) - len(published) - len(pipeline._pending)
+
+    # A beat on any folded frame survives aggregation
+    groups, start = [], 0
+    for frame in published:
+        end = next(i for i in range(start, len(analyzed)) if analyzed[i]["timestamp"] == frame["timestamp"])
+        groups.append(analyzed[start:end + 1])
+        start = end + 1
+    assert sum(len(group) for group in groups) == start
+    assert [frame["beat_detected"] for frame in published] == \
+        [any(f["beat_detected"] for f in group) for group in groups]
+    assert sum(frame["beat_detected"] for frame in published) >= 8
+
+
+def test_every_hop_published_without_publish_fps():
+    async def main():
+        pipeline, analyzed = click_pipeline(publish_fps=0)
+        pipeline.results = DropOldestQueue(1000, asyncio.get_running_loop())
+        source = SignalSource(SAMPLE_RATE, CHUNK_SIZE, signal="sine")
+        for block in itertools.islice(source.blocks(), 20):
+            pipeline.on_audio(block)
+            pipeline.step()
+        return pipeline, analyzed
+
+    pipeline, analyzed = asyncio.run(main())
+    assert len(pipeline.results) == len(analyzed) == 20
+    assert pipeline.frames_aggregated == 0
+
+
+def test_signal_source_drives_running_pipeline():
+    async def main():
+        published = []
+        pipeline, analyzed = click_pipeline(publish_fps=10.0, callback=published.append)
+        pool = DSPWorkerPool(1)
+        source = SignalSource(SAMPLE_RATE, CHUNK_SIZE, signal="clicks", speed=4.0, seed=0)
+        pipeline.start(pool)
+        source.start(pipeline.on_audio)
+        try:
+            await asyncio.sleep(1.0)
+        finally:
+            source.stop()
+            pipeline.stop()
+            pool.shutdown()
+        return pipeline, source, analyzed, published
+
+    started = time.monotonic()
+    pipeline, source, analyzed, published = asyncio.run(main())
+    assert time.monotonic() - started < 3.0
+    assert source.blocks_sent > 0 and pipeline.frames_processed > 0
+    assert 0 < len(published) < len(analyzed)
+    assert pipeline.frames_published == len(published)
+    assert pipeline.frames_aggregated > 0
+    assert any(frame["beat_detected"] for frame in published)
+
+
+def test_failing_pipeline_does_not_stop_shared_worker():
+    def broken_aggregate(frames):
+        raise RuntimeError("aggregate failed")
+
+    async def main():
+        healthy_frames = []
+        broken, _ = click_pipeline(publish_fps=10.0)
+        broken.aggregate = broken_aggregate
+        healthy, _ = click_pipeline(publish_fps=10.0, callback=healthy_frames.append)
+        pool = DSPWorkerPool(1)
+        broken.start(pool)
+        healthy.start(pool)
+        blocks = SignalSource(SAMPLE_RATE, CHUNK_SIZE, signal="clicks", seed=0).blocks()
+        try:
+            for block in itertools.islice(blocks, 80):
+                broken.on_audio(block)
+                healthy.on_audio(block)
+                await asyncio.sleep(CHUNK_SIZE / SAMPLE_RATE / 4)
+            await asyncio.sleep(0.1)
+        finally:
+            broken.stop()
+            healthy.stop()
+            pool.shutdown()
+        return broken, healthy, healthy_frames
+
+    broken, healthy, healthy_frames = asyncio.run(main())
+    assert broken.step_errors > 0
+    assert broken.frames_published == 0
+    assert healthy.step_errors == 0
+    assert healthy.frames_processed == 80
+    assert len(healthy_frames) >= 15
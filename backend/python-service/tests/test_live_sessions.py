@@ -0,0 +1,43 @@
+import pytest
+
+from src.services.live_sessions import LiveSession
+
+
+async def publish(session_id, frame):
+    pass
+
+
+def websocket_session(**options):
+    return LiveSession("test", "websocket", publish=publish,
+                       **{"sample_rate": 44100, "chunk_size": 1024, **options})
+
+
+@pytest.mark.parametrize("options", [
+    {"sample_rate": 0},
+    {"sample_rate": 4000},
+    {"sample_rate": 384000},
+    {"chunk_size": 0},
+    {"chunk_size": 128},
+    {"chunk_size": 1000},
+    {"chunk_size": 16384},
+    {"channels": 0},
+    {"sample_format": "int24"},
+    {"spectrum_bands": 1024},
+])
+def test_rejects_client_parameters(options):
+    with pytest.raises(ValueError):
+        websocket_session(**options)
+
+
+@pytest.mark.parametrize("sample_rate, chunk_size", [(8000, 256), (48000, 2048), (192000, 8192)])
+def test_accepts_bounds(sample_rate, chunk_size):
+    session = websocket_session(sample_rate=sample_rate, chunk_size=chunk_size)
+    assert session.pipeline.hop_seconds == chunk_size / sample_rate
+    assert session.input is None
+
+
+def test_push_pcm_mixes_channels():
+    session = websocket_session(sample_format="int16", channels=2)
+    session.push_pcm(b"\x00\x40\x00\xc0" * 4 + b"\x00")
+    assert session.pipeline.ring.available() == 4
+    assert session.bytes_received == 17
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from src.services.realtime_processor import FREQUENCY_BANDS, RealtimeFrameProcessor, savgol_weights
+
+
+def dense_savgol_matrix(n, window_length=11, polyorder=3):
+    """The (n x n) smoothing matrix the band weights used to be summed from"""
+    half = window_length // 2
+    matrix = np.zeros((n, n))
+    interior = signal.savgol_coeffs(window_length, polyorder, use="dot")
+    for i in range(half, n - half):
+        matrix[i, i - half:i + half + 1] = interior
+    for i in range(half):
+        matrix[i, :window_length] = signal.savgol_coeffs(window_length, polyorder, pos=i, use="dot")
+        matrix[n - 1 - i, n - window_length:] = signal.savgol_coeffs(
+            window_length, polyorder, pos=window_length - 1 - i, use="dot"
+        )
+    return matrix
+
+
+@pytest.mark.parametrize("window_length, polyorder", [(11, 3), (7, 2)])
+def test_savgol_weights_match_dense_matrix(window_length, polyorder):
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(64)
+    matrix = dense_savgol_matrix(64, window_length, polyorder)
+    np.testing.assert_allclose(matrix @ x, signal.savgol_filter(x, window_length, polyorder), atol=1e-12)
+
+    rows = rng.standard_normal((3, 64))
+    np.testing.assert_allclose(savgol_weights(rows, window_length, polyorder), rows @ matrix, atol=1e-12)
+
+
+def test_band_weights_match_dense_construction():
+    processor = RealtimeFrameProcessor(8000, 256)
+    smoothing = dense_savgol_matrix(processor.n_bins)
+    expected = np.stack([
+        smoothing[(processor.freqs >= low) & (processor.freqs <= high)].sum(axis=0)
+        for _, low, high in FREQUENCY_BANDS
+    ])
+    np.testing.assert_allclose(processor.band_weights, expected, atol=1e-12)
+
+    frame = np.random.default_rng(1).uniform(-1, 1, 256).astype(np.float32)
+    result = processor.process(frame)
+    magnitude = np.abs(np.fft.rfft(frame))[:processor.n_bins]
+    for (name, _, _), weights in zip(FREQUENCY_BANDS, expected):
+        assert result[name] == pytest.approx(float(weights @ magnitude), rel=1e-5)
+
+
+def test_large_frames_build_linear_weights():
+    processor = RealtimeFrameProcessor(44100, 65536)
+    assert processor.band_weights.shape == (len(FREQUENCY_BANDS), 32768)
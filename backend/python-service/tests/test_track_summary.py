@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_wav
+from src.services.track_summary import SUMMARY_FIELDS, summarize_tracks
+from tests.conftest import SAMPLE_RATE, MemoryRedis
+
+
+def summary_input(n_frames, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "fields": SUMMARY_FIELDS + ("danceability",),
+        "rms": rng.uniform(0, 0.5, n_frames).astype(np.float32),
+        "chroma_mean": rng.uniform(0, 1, 12),
+        "tempo": 120.0,
+        "spectral_centroid": rng.uniform(500, 3000, n_frames)
+    }
+
+
+def test_stacked_summaries_match_single_tracks():
+    inputs = [summary_input(n, seed) for seed, n in enumerate((300, 1, 57))]
+    stacked = summarize_tracks(inputs)
+    for item, summary in zip(inputs, stacked):
+        assert summary == pytest.approx(summarize_tracks([item])[0])
+        assert summary["energy"] == pytest.approx(float(np.mean(item["rms"])))
+
+
+@pytest.mark.parametrize("position", [0, 1, 2])
+def test_track_without_frames(position):
+    inputs = [summary_input(200, 0), summary_input(80, 1)]
+    empty = {**summary_input(0, 2), "chroma_mean": np.zeros(12)}
+    inputs.insert(position, empty)
+    summaries = summarize_tracks(inputs)
+
+    assert summaries[position]["energy"] == 0.0
+    assert summaries[position]["loudness"] == -100.0
+    assert summaries[position]["danceability"] == pytest.approx((1 - 5 / 115) * 0.4)
+    others = [summary for index, summary in enumerate(summaries) if index != position]
+    assert others == pytest.approx(summarize_tracks([summary_input(200, 0), summary_input(80, 1)]))
+
+
+def test_batch_upload_with_empty_track(monkeypatch, tmp_path, track):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main.audio_analyzer, "executor", None)
+    monkeypatch.setattr(main.analysis_cache, "redis_client", MemoryRedis())
+    paths = {"empty.wav": np.zeros(0, dtype=np.float32), "track.wav": track[:5 * SAMPLE_RATE]}
+    files = []
+    for name, samples in paths.items():
+        write_wav(str(tmp_path / name), samples, SAMPLE_RATE)
+        files.append(("files", (name, (tmp_path / name).read_bytes(), "audio/wav")))
+
+    response = TestClient(main.app).post("/analyze-upload/batch", files=files,
+                                         params={"analysis_type": "basic"})
+    assert response.status_code == 200
+    lines = {line["source"]: line for line in map(json.loads, response.text.splitlines())}
+    assert lines["empty.wav"]["status"] == "ok"
+    assert lines["empty.wav"]["result"]["energy"] == 0.0
+    assert lines["empty.wav"]["result"]["duration"] == 0.0
+    assert lines["track.wav"]["status"] == "ok"
+    assert lines["track.wav"]["result"]["bpm"] == pytest.approx(120, abs=3)
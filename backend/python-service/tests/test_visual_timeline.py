@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from src.services.realtime_processor import FREQUENCY_BANDS, RealtimeFrameProcessor
+from src.services.visual_timeline import (
+    LEGACY_TIMELINE_MAGIC, TIMELINE_BEAT_FIELDS, TIMELINE_HEADER, TIMELINE_MAGIC, TimelineBuilder,
+    decode_timeline, pack_timeline_header, parse_timeline_header, timeline_record_dtype,
+    timeline_window
+)
+from tests.conftest import SAMPLE_RATE
+
+FRAME_SIZE = 1024
+BEAT_TIMES = np.arange(0.0, 10.0, 0.5)
+
+
+@pytest.fixture(scope="module")
+def timeline(track):
+    builder = TimelineBuilder(SAMPLE_RATE, frame_size=FRAME_SIZE)
+    # Fed in uneven blocks, as the streaming analysis does
+    for start in range(0, len(track), 10000):
+        builder.feed(track[start:start + 10000])
+    return builder.finish(BEAT_TIMES)
+
+
+def test_header(timeline, track):
+    info = parse_timeline_header(timeline)
+    assert timeline.startswith(TIMELINE_MAGIC)
+    assert info["beat_clock"]
+    assert info["n_frames"] == int(np.ceil(len(track) / FRAME_SIZE))
+    assert info["fps"] == pytest.approx(SAMPLE_RATE / FRAME_SIZE)
+    assert len(timeline) == TIMELINE_HEADER.size + info["n_frames"] * info["record_size"]
+
+
+def test_frames_match_live_processor(timeline, track):
+    frames = decode_timeline(timeline)
+    processor = RealtimeFrameProcessor(SAMPLE_RATE, FRAME_SIZE)
+    for index in (0, 57, 140):
+        live = processor.process(track[index * FRAME_SIZE:(index + 1) * FRAME_SIZE])
+        for name, _, _ in FREQUENCY_BANDS:
+            assert frames[index][name] == pytest.approx(live[name], rel=1e-4)
+        assert frames[index]["overall_volume"] == pytest.approx(live["overall_volume"], rel=1e-4)
+        assert frames[index]["energy_level"] == pytest.approx(live["energy_level"], rel=1e-4)
+
+
+def test_beat_clock(timeline):
+    frames = decode_timeline(timeline)
+    fps = parse_timeline_header(timeline)["fps"]
+    beat_frames = {int(np.floor(t * fps)) for t in BEAT_TIMES}
+    assert {i for i, frame in enumerate(frames) if frame["beat_detected"]} == beat_frames
+
+    inside = [frame for i, frame in enumerate(frames) if i / fps < BEAT_TIMES[-1]]
+    assert all(frame["bpm"] == pytest.approx(120.0) for frame in inside)
+    assert all(frame["beat_confidence"] == 1.0 for frame in inside)
+    assert frames[-1]["beat_confidence"] == 0.0
+    phases = np.array([frame["beat_phase"] for frame in inside])
+    assert phases.min() >= 0 and phases.max() < 1
+    np.testing.assert_allclose(phases, np.mod(np.arange(len(inside)) / fps / 0.5, 1.0), atol=1e-5)
+
+
+def test_window_round_trip(timeline):
+    info = parse_timeline_header(timeline)
+    start_frame, end_frame = timeline_window(info, start=2.0, duration=1.0)
+    assert (start_frame, end_frame) == (int(2.0 * info["fps"]), int(np.ceil(3.0 * info["fps"])))
+
+    records = timeline[TIMELINE_HEADER.size + start_frame * info["record_size"]:
+                       TIMELINE_HEADER.size + end_frame * info["record_size"]]
+    window = decode_timeline(pack_timeline_header(info, start_frame, end_frame - start_frame) + records)
+    full = decode_timeline(timeline)
+    assert len(window) == end_frame - start_frame
+    assert window[0]["timestamp"] == pytest.approx(start_frame / info["fps"])
+    assert window[0]["bass_level"] == full[start_frame]["bass_level"]
+    assert window[-1]["beat_phase"] == full[end_frame - 1]["beat_phase"]
+
+
+def test_legacy_mvt1(timeline):
+    info = parse_timeline_header(timeline)
+    records = np.frombuffer(
+        timeline, dtype=timeline_record_dtype(info["spectrum_bins"], info["waveform_points"]),
+        offset=TIMELINE_HEADER.size
+    )
+    legacy_dtype = timeline_record_dtype(info["spectrum_bins"], info["waveform_points"], False)
+    legacy = np.zeros(len(records), dtype=legacy_dtype)
+    for name in legacy_dtype.names:
+        legacy[name] = records[name]
+    payload = LEGACY_TIMELINE_MAGIC + timeline[4:TIMELINE_HEADER.size] + legacy.tobytes()
+
+    legacy_info = parse_timeline_header(payload)
+    assert not legacy_info["beat_clock"]
+    assert legacy_info["record_size"] == legacy_dtype.itemsize
+    assert pack_timeline_header(legacy_info, 0, 1).startswith(LEGACY_TIMELINE_MAGIC)
+
+    frames = decode_timeline(payload)
+    assert not any(name in frames[0] for name in TIMELINE_BEAT_FIELDS)
+    assert frames[10]["bass_level"] == decode_timeline(timeline)[10]["bass_level"]
+
+
+def test_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        parse_timeline_header(b"MVF2" + bytes(TIMELINE_HEADER.size))